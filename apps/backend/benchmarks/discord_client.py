@@ -0,0 +1,127 @@
+"""
+Compares a fresh httpx client per Discord call (the old behaviour) with the
+pooled clients held by DiscordService, against a local mock of the Discord API.
+
+Run from apps/backend with the usual environment variables set:
+
+    python -m benchmarks.discord_client --requests 200
+
+The mock server is plain HTTP on localhost, so the numbers only include the
+TCP handshake saved by keep-alive; against discord.com the TLS handshake on
+every new connection makes the gap considerably larger.
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+from services.discord_service import DiscordService
+
+CHANNELS = json.dumps([{"id": str(i), "name": f"channel-{i}", "type": 0, "position": i} for i in range(20)]).encode()
+MESSAGE = json.dumps({"id": "1"}).encode()
+
+class MockDiscordHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so the server honours keep-alive like discord.com does.
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without this, Nagle plus delayed
+    # ACKs add ~40 ms to every response on a reused connection.
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self._reply(CHANNELS)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self._reply(MESSAGE)
+
+    def _reply(self, body: bytes):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_mock_server() -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockDiscordHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def report(label: str, requests: int, elapsed: float):
+    print(f"{label:<32} {elapsed * 1000:8.1f} ms total  {elapsed / requests * 1000:6.2f} ms/request")
+
+def timed(label: str, requests: int, func):
+    started = time.perf_counter()
+    func()
+    report(label, requests, time.perf_counter() - started)
+
+def bench_sync(service: DiscordService, requests: int):
+    url = f"{service.BASE_URL}/guilds/1/channels"
+
+    def per_call_client():
+        for _ in range(requests):
+            with httpx.Client() as client:
+                client.get(url, headers=service.headers).raise_for_status()
+
+    def pooled_client():
+        for _ in range(requests):
+            service.get_guild_channels("1")
+
+    timed("sync, new client per call", requests, per_call_client)
+    timed("sync, pooled client", requests, pooled_client)
+
+def bench_async(service: DiscordService, requests: int, concurrency: int):
+    url = f"{service.BASE_URL}/channels/1/messages"
+    payload = {"content": "benchmark"}
+
+    async def per_call_client():
+        async with httpx.AsyncClient() as client:
+            (await client.post(url, headers=service.headers, json=payload)).raise_for_status()
+
+    async def pooled_client():
+        await service.post_message("1", payload)
+
+    async def run(send):
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def limited():
+            async with semaphore:
+                await send()
+
+        await asyncio.gather(*(limited() for _ in range(requests)))
+
+    async def main():
+        for label, send in (("async, new client per call", per_call_client), ("async, pooled client", pooled_client)):
+            started = time.perf_counter()
+            await run(send)
+            report(label, requests, time.perf_counter() - started)
+        # The async client is bound to this event loop.
+        await service.aclose()
+
+    asyncio.run(main())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=5)
+    args = parser.parse_args()
+
+    server = start_mock_server()
+    service = DiscordService()
+    service.BASE_URL = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        bench_sync(service, args.requests)
+        bench_async(service, args.requests, args.concurrency)
+    finally:
+        service.client.close()
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
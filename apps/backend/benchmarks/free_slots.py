@@ -0,0 +1,71 @@
+"""
+Benchmarks the free-slots engine: 500 users with busy blocks over a quarter,
+stored in an in-memory SQLite database.
+
+Run from apps/backend with the usual environment variables set:
+
+    python -m benchmarks.free_slots --users 500 --days 91
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlmodel import Session, SQLModel, create_engine
+from sqlalchemy.pool import StaticPool
+
+from models import User, UserUnavailability
+from services.availability_service import AvailabilityService, sweep_free_slots
+
+def seed(session: Session, users: int, days: int, blocks_per_week: int, start: datetime) -> int:
+    session.add_all(User(discord_id=str(i), username=f"user{i}") for i in range(users))
+    session.commit()
+    rng = random.Random(42)
+    blocks = []
+    for user_id in range(1, users + 1):
+        for _ in range(blocks_per_week * days // 7):
+            block_start = start + timedelta(days=rng.uniform(0, days))
+            blocks.append({
+                "user_id": user_id,
+                "start_time": block_start.replace(minute=0, second=0, microsecond=0),
+                "end_time": block_start.replace(minute=0, second=0, microsecond=0) + timedelta(hours=rng.choice([1, 2, 4, 8, 24]))
+            })
+    session.execute(UserUnavailability.__table__.insert(), blocks)
+    session.commit()
+    return len(blocks)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--days", type=int, default=91)
+    parser.add_argument("--blocks-per-week", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    start = datetime(2030, 1, 1)
+    end = start + timedelta(days=args.days)
+
+    with Session(engine) as session:
+        block_count = seed(session, args.users, args.days, args.blocks_per_week, start)
+        print(f"{args.users} users, {block_count} busy blocks over {args.days} days")
+
+        service = AvailabilityService(session)
+        user_ids = service.all_user_ids()
+        for min_free in (args.users, int(args.users * 0.9), args.users // 2):
+            load_times, sweep_times = [], []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                busy = service.load_busy(user_ids, start, end)
+                loaded = time.perf_counter()
+                slots = sweep_free_slots(busy, len(user_ids), start, end, min_free)
+                load_times.append(loaded - started)
+                sweep_times.append(time.perf_counter() - loaded)
+            print(
+                f"min_free={min_free:<4} slots={len(slots):<5} "
+                f"load {min(load_times) * 1000:7.1f} ms  sweep {min(sweep_times) * 1000:7.1f} ms"
+            )
+
+if __name__ == "__main__":
+    main()
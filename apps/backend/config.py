@@ -1,3 +1,4 @@
+from pydantic import Field
 from pydantic_settings import BaseSettings
 import sys
 
@@ -11,6 +12,93 @@ class Settings(BaseSettings):
     FRONTEND_URL: str = "http://localhost:5173"  # Default for local dev
     DB_PATH: str = "/data/app.db"
 
+    # Discord HTTP client: one pooled client per process, reused across
+    # requests so connections to discord.com are kept alive between calls.
+    # HTTP/2 needs the optional h2 package (pip install "httpx[http2]").
+    DISCORD_HTTP2: bool = False
+    DISCORD_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    DISCORD_READ_TIMEOUT_SECONDS: float = 10.0
+    DISCORD_POOL_TIMEOUT_SECONDS: float = 5.0
+    DISCORD_MAX_CONNECTIONS: int = 20
+    DISCORD_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    DISCORD_KEEPALIVE_EXPIRY_SECONDS: float = 60.0
+
+    # Discord rate limits: requests are paced from the X-RateLimit-* headers,
+    # and a request that still gets a 429 is retried this many times.
+    DISCORD_GLOBAL_RATE_LIMIT: int = 50
+    DISCORD_RATE_LIMIT_RETRIES: int = 3
+
+    # Guild channel list cache: served from memory for the TTL, then served
+    # stale while one background refresh runs.
+    DISCORD_CHANNELS_TTL_SECONDS: int = 10 * 60
+    DISCORD_CHANNELS_STALE_SECONDS: int = 24 * 60 * 60
+
+    # Guild member directory: kept in memory and re-paged from Discord in the
+    # background once it is older than this.
+    DISCORD_MEMBERS_TTL_SECONDS: int = 15 * 60
+    # After a failed pass, no new pass starts until this much time has passed.
+    DISCORD_MEMBERS_RETRY_SECONDS: int = 60
+
+    # Guild members are copied into the user table by a background job.
+    MEMBER_SYNC_INTERVAL_SECONDS: int = 15 * 60
+
+    # Mention typeahead index: updated in place by member sync and logins in
+    # this process, and fully reloaded this often to see other processes' writes.
+    TYPEAHEAD_RELOAD_SECONDS: int = 5 * 60
+
+    # Per-option unavailability and option recommendations of a poll. Cached
+    # entries are checked against the poll and availability versions on every
+    # read; the TTL is only a backstop.
+    POLL_UNAVAILABILITY_CACHE_SECONDS: int = 60 * 60
+
+    # Option recommendation: score = votes
+    #   - RECOMMENDATION_UNAVAILABLE_WEIGHT per voter or mentioned user who is unavailable
+    #   + RECOMMENDATION_PROXIMITY_WEIGHT, halving for every
+    #     RECOMMENDATION_PROXIMITY_HALF_LIFE_DAYS the option starts after the deadline.
+    RECOMMENDATION_UNAVAILABLE_WEIGHT: float = 1.0
+    RECOMMENDATION_PROXIMITY_WEIGHT: float = 0.5
+    RECOMMENDATION_PROXIMITY_HALF_LIFE_DAYS: float = 7
+
+    # Mention affinity: each mention counts 1, halving every this many days.
+    # Stored weights are rebased every 256 half-lives, so at least a day.
+    MENTION_AFFINITY_HALF_LIFE_DAYS: float = Field(default=30, ge=1)
+
+    # Leader election: background jobs run only in the worker holding the
+    # lease. It is renewed every LEADER_RENEW_SECONDS and another worker takes
+    # over once it has not been renewed for LEADER_LEASE_SECONDS.
+    LEADER_LEASE_SECONDS: int = 15
+    LEADER_RENEW_SECONDS: int = 5
+
+    # Deadline checker: the heap is resynced with the database at least this
+    # often, and due deadlines that failed to send are retried after a delay.
+    # Polls changed in this process are pushed to the heap directly; changes
+    # made by other workers are noticed within DEADLINE_WATCH_SECONDS.
+    DEADLINE_RESYNC_SECONDS: int = 60 * 60
+    DEADLINE_RETRY_SECONDS: int = 60
+    DEADLINE_WATCH_SECONDS: int = 60
+
+    # Outbox delivery: messages are sent in batches with at most
+    # OUTBOX_CONCURRENCY in flight, retried with exponential backoff and
+    # dead-lettered after OUTBOX_MAX_ATTEMPTS. Messages queued in this process
+    # wake delivery at once; those queued by other workers wait for the
+    # OUTBOX_POLL_SECONDS idle check.
+    OUTBOX_BATCH_SIZE: int = 50
+    OUTBOX_CONCURRENCY: int = 5
+    OUTBOX_MAX_ATTEMPTS: int = 8
+    OUTBOX_BACKOFF_BASE_SECONDS: int = 5
+    OUTBOX_BACKOFF_MAX_SECONDS: int = 60 * 60
+    OUTBOX_POLL_SECONDS: int = 30
+
+    # Retention: polls whose last option ended more than this many days ago
+    # are moved into the archive tables.
+    ARCHIVE_AFTER_DAYS: int = 180
+    ARCHIVE_BATCH_SIZE: int = 100
+    ARCHIVE_INTERVAL_SECONDS: int = 24 * 60 * 60
+
+    # Purge of soft-deleted polls, in chunks of rows per transaction.
+    PURGE_CHUNK_SIZE: int = 500
+    PURGE_INTERVAL_SECONDS: int = 5 * 60
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -2,10 +2,11 @@ from fastapi import FastAPI
 from sqlmodel import SQLModel
 from database import engine
 from sqlalchemy import text
+from datetime import datetime
 # Import models to ensure they are registered with SQLModel
-from models import User, Poll, PollOption, Vote, UserMention
+from models import User, Poll, PollOption, Vote, UserMention, ArchivedPoll, ArchivedPollOption, ArchivedVote, OutboxMessage, Lease, AffinityEpoch
 
-from routers import auth, polls, votes, discord, users, profile
+from routers import auth, polls, votes, discord, users, profile, availability, calendar
 
 print("Initializing FastAPI app...")
 app = FastAPI()
@@ -16,6 +17,8 @@ app.include_router(votes.router, prefix="/api")
 app.include_router(discord.router, prefix="/api")
 app.include_router(users.router, prefix="/api")
 app.include_router(profile.router, prefix="/api")
+app.include_router(availability.router, prefix="/api")
+app.include_router(calendar.router, prefix="/api")
 
 def create_db_and_tables():
     print("Creating database tables...")
@@ -95,6 +98,30 @@ def create_db_and_tables():
         except Exception:
             pass
 
+        try:
+            conn.execute(text("ALTER TABLE poll ADD COLUMN deleted_at TIMESTAMP"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_poll_deleted_at ON poll (deleted_at)"))
+            conn.commit()
+            print("Added deleted_at column to poll table.")
+        except Exception:
+            pass
+
+        try:
+            conn.execute(text("ALTER TABLE poll ADD COLUMN updated_at TIMESTAMP"))
+            conn.execute(text("UPDATE poll SET updated_at = created_at"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_poll_updated_at ON poll (updated_at)"))
+            conn.commit()
+            print("Added updated_at column to poll table.")
+        except Exception:
+            pass
+
+        try:
+            conn.execute(text("ALTER TABLE poll ADD COLUMN version INTEGER DEFAULT 1"))
+            conn.commit()
+            print("Added version column to poll table.")
+        except Exception:
+            pass
+
         # Migration for PollOption notification
         try:
             conn.execute(text("ALTER TABLE polloption ADD COLUMN notification_sent BOOLEAN DEFAULT 0"))
@@ -103,6 +130,12 @@ def create_db_and_tables():
         except Exception:
             pass
 
+        try:
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_polloption_start_time ON polloption (start_time)"))
+            conn.commit()
+        except Exception:
+            pass
+
         # Migration for User guild_joined_at
         try:
             conn.execute(text("ALTER TABLE user ADD COLUMN guild_joined_at TIMESTAMP"))
@@ -111,16 +144,123 @@ def create_db_and_tables():
         except Exception:
             pass
 
+        try:
+            conn.execute(text("ALTER TABLE user ADD COLUMN profile_hash VARCHAR"))
+            conn.commit()
+            print("Added profile_hash column to user table.")
+        except Exception:
+            pass
+
+        try:
+            conn.execute(text("ALTER TABLE user ADD COLUMN availability_version INTEGER DEFAULT 0"))
+            conn.commit()
+            print("Added availability_version column to user table.")
+        except Exception:
+            pass
+
+        try:
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_user_username_nocase ON user (username COLLATE NOCASE)"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_user_display_name_nocase ON user (display_name COLLATE NOCASE)"))
+            conn.commit()
+        except Exception:
+            pass
+
+        try:
+            conn.execute(text("ALTER TABLE usermention ADD COLUMN affinity FLOAT DEFAULT 0"))
+            # Seed existing pairs with the weight of their last mention.
+            from services.mention_service import mention_service
+            rows = conn.execute(text("SELECT id, last_mentioned_at FROM usermention")).all()
+            for mention_id, last_mentioned_at in rows:
+                if isinstance(last_mentioned_at, str):
+                    last_mentioned_at = datetime.fromisoformat(last_mentioned_at)
+                conn.execute(
+                    text("UPDATE usermention SET affinity = :affinity WHERE id = :id"),
+                    {"affinity": mention_service.mention_weight(last_mentioned_at), "id": mention_id}
+                )
+            conn.commit()
+            print("Added affinity column to usermention table.")
+        except Exception:
+            pass
+
+        try:
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_userunavailability_user_end_start ON userunavailability (user_id, end_time, start_time)"))
+            conn.commit()
+        except Exception:
+            pass
+
+        try:
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_usermention_creator_affinity ON usermention (creator_id, affinity)"))
+            conn.commit()
+        except Exception:
+            pass
+
+        # Archived rows keep their ids; rebuild the hot tables with AUTOINCREMENT
+        # so SQLite stops reusing the ids of rows that were moved to the archive.
+        for model, archive in ((Poll, ArchivedPoll), (PollOption, ArchivedPollOption), (Vote, ArchivedVote)):
+            try:
+                if rebuild_with_autoincrement(conn, model.__table__, archive.__table__):
+                    print(f"Rebuilt {model.__tablename__} table with AUTOINCREMENT.")
+            except Exception as e:
+                conn.rollback()
+                print(f"Failed to rebuild {model.__tablename__} table with AUTOINCREMENT: {e}")
+
     print("Database tables created.")
 
+def rebuild_with_autoincrement(conn, table, archive_table) -> bool:
+    """
+    SQLite cannot add AUTOINCREMENT to an existing table, so the table is
+    renamed, recreated from the model and copied back. The id sequence starts
+    above the highest archived id. Returns False if nothing had to be done.
+    """
+    sql = conn.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": table.name}).scalar()
+    if sql is None or "AUTOINCREMENT" in sql.upper():
+        return False
+
+    legacy = f"{table.name}_legacy"
+    # pysqlite does not open a transaction for DDL by itself; make the whole
+    # rebuild one, so a failure leaves the original table in place.
+    conn.commit()
+    conn.exec_driver_sql("BEGIN")
+    # Keep other tables' foreign keys pointing at the original name.
+    conn.execute(text("PRAGMA legacy_alter_table = ON"))
+    conn.execute(text(f"ALTER TABLE {table.name} RENAME TO {legacy}"))
+    conn.execute(text("PRAGMA legacy_alter_table = OFF"))
+    # The indexes moved with the rename; drop them so create() can recreate them.
+    indexes = conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :name AND sql IS NOT NULL"), {"name": legacy}).scalars().all()
+    for index in indexes:
+        conn.execute(text(f"DROP INDEX {index}"))
+    table.create(conn)
+
+    legacy_columns = {row[1] for row in conn.execute(text(f"PRAGMA table_info({legacy})")).all()}
+    columns = ", ".join(column.name for column in table.columns if column.name in legacy_columns)
+    conn.execute(text(f"INSERT INTO {table.name} ({columns}) SELECT {columns} FROM {legacy}"))
+    conn.execute(text(f"DROP TABLE {legacy}"))
+
+    highest = conn.execute(text(
+        f"SELECT max(coalesce((SELECT max(id) FROM {table.name}), 0), coalesce((SELECT max(id) FROM {archive_table.name}), 0))"
+    )).scalar()
+    conn.execute(text("DELETE FROM sqlite_sequence WHERE name = :name"), {"name": table.name})
+    conn.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES (:name, :seq)"), {"name": table.name, "seq": highest})
+    conn.commit()
+    return True
+
 import asyncio
-from tasks import check_deadlines
+from tasks import run_background_jobs, release_leadership
+from services.discord_service import discord_service
 
 @app.on_event("startup")
 def on_startup():
     print("Startup event triggered.")
     create_db_and_tables()
-    asyncio.create_task(check_deadlines())
+    discord_service.open()
+    # Every worker campaigns for the lease; only the leader runs the jobs.
+    asyncio.create_task(run_background_jobs())
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    # Hand the lease over right away instead of waiting for it to expire.
+    release_leadership()
+    await discord_service.aclose()
 
 @app.get("/api/health")
 def read_root():
@@ -1,15 +1,22 @@
 from typing import Optional, List, Dict
 from datetime import datetime
 from sqlmodel import Field, SQLModel, UniqueConstraint, Relationship
-from sqlalchemy import Column, JSON
+from sqlalchemy import Column, JSON, Index, text
 
 class User(SQLModel, table=True):
+    # Case-insensitive indexes for prefix search (see MentionService.get_ranked_mentions)
+    __table_args__ = (
+        Index("ix_user_username_nocase", text("username COLLATE NOCASE")),
+        Index("ix_user_display_name_nocase", text("display_name COLLATE NOCASE")),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     discord_id: str = Field(index=True, unique=True)
     username: str
     display_name: Optional[str] = None
     avatar_url: Optional[str] = None
     guild_joined_at: Optional[datetime] = None
+    profile_hash: Optional[str] = None # Hash of the Discord profile fields, see MemberSyncService
+    availability_version: int = Field(default=0) # Bumped on every change to the user's unavailability
 
     polls: List["Poll"] = Relationship(back_populates="creator")
     votes: List["Vote"] = Relationship(back_populates="user")
@@ -18,6 +25,12 @@ class User(SQLModel, table=True):
     unavailability: List["UserUnavailability"] = Relationship(back_populates="user", sa_relationship_kwargs={"cascade": "all, delete-orphan"})
 
 class UserUnavailability(SQLModel, table=True):
+    # Overlap reads (end_time > window start AND start_time < window end) for a
+    # user scan only the blocks ending after the window starts, and filter on
+    # start_time without touching the table.
+    __table_args__ = (
+        Index("ix_userunavailability_user_end_start", "user_id", "end_time", "start_time"),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(foreign_key="user.id")
     start_time: datetime
@@ -26,16 +39,25 @@ class UserUnavailability(SQLModel, table=True):
     user: Optional[User] = Relationship(back_populates="unavailability")
 
 class UserMention(SQLModel, table=True):
-    __table_args__ = (UniqueConstraint("creator_id", "target_user_id"),)
+    __table_args__ = (
+        UniqueConstraint("creator_id", "target_user_id"),
+        Index("ix_usermention_creator_affinity", "creator_id", "affinity"),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     creator_id: int = Field(foreign_key="user.id")
     target_user_id: int = Field(foreign_key="user.id")
     last_mentioned_at: datetime = Field(default_factory=datetime.utcnow)
+    # Exponentially decayed mention count, stored relative to an epoch so it
+    # only grows on writes; see MentionService.mention_weight.
+    affinity: float = 0.0
 
     creator: Optional[User] = Relationship(back_populates="mentions_created", sa_relationship_kwargs={"foreign_keys": "UserMention.creator_id"})
     target_user: Optional[User] = Relationship(back_populates="mentions_received", sa_relationship_kwargs={"foreign_keys": "UserMention.target_user_id"})
 
 class Poll(SQLModel, table=True):
+    # Archived rows keep their ids, so ids must never be handed out again once
+    # the highest one has moved to the archive (see RetentionService).
+    __table_args__ = {"sqlite_autoincrement": True}
     id: Optional[int] = Field(default=None, primary_key=True)
     title: str
     description: Optional[str] = None
@@ -55,14 +77,26 @@ class Poll(SQLModel, table=True):
     deadline_mention_ids: List[int] = Field(default_factory=list, sa_column=Column(JSON)) # Store list of user IDs
     deadline_notification_sent: bool = Field(default=False) # For one-time polls
 
+    # Bumped on every change to the poll or its options; the leader watches it
+    # to pick up deadline changes made in other worker processes.
+    updated_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+    # Bumped on every change to the poll, its options or its votes. Together with
+    # User.availability_version it keys the cached conflict annotation.
+    version: int = Field(default=1)
+
+    # Soft delete tombstone. Deleted polls are hidden from every read and their
+    # rows are removed later by the background purger.
+    deleted_at: Optional[datetime] = Field(default=None, index=True)
+
     creator: Optional[User] = Relationship(back_populates="polls")
     options: List["PollOption"] = Relationship(back_populates="poll", sa_relationship_kwargs={"cascade": "all, delete-orphan"})
 
 class PollOption(SQLModel, table=True):
+    __table_args__ = {"sqlite_autoincrement": True} # See Poll
     id: Optional[int] = Field(default=None, primary_key=True)
     poll_id: int = Field(foreign_key="poll.id")
     label: str
-    start_time: datetime
+    start_time: datetime = Field(index=True) # Range scans for the calendar density aggregates
     end_time: datetime
 
     notification_sent: bool = Field(default=False) # For recurring instances
@@ -70,8 +104,43 @@ class PollOption(SQLModel, table=True):
     poll: Optional[Poll] = Relationship(back_populates="options")
     votes: List["Vote"] = Relationship(back_populates="poll_option", sa_relationship_kwargs={"cascade": "all, delete-orphan"})
 
+class OutboxMessage(SQLModel, table=True):
+    """
+    A Discord message waiting to be delivered. Rows are written in the same
+    transaction as the state change that produced them and drained by the
+    background delivery worker.
+    """
+    id: Optional[int] = Field(default=None, primary_key=True)
+    idempotency_key: str = Field(index=True, unique=True)
+    channel_id: str
+    payload: Dict = Field(default_factory=dict, sa_column=Column(JSON))
+    status: str = Field(default="pending", index=True) # pending, sent or dead
+    attempts: int = Field(default=0)
+    next_attempt_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+    last_error: Optional[str] = None
+    discord_message_id: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    sent_at: Optional[datetime] = None
+
+class Lease(SQLModel, table=True):
+    """
+    A named, time-limited lock held by one process. Used for leader election
+    so background jobs run in exactly one uvicorn worker.
+    """
+    name: str = Field(primary_key=True)
+    holder: str
+    expires_at: datetime
+
+class AffinityEpoch(SQLModel, table=True):
+    """
+    The instant UserMention.affinity weights are relative to, once it has been
+    moved past mention_service.AFFINITY_EPOCH. A single row with id 1.
+    """
+    id: Optional[int] = Field(default=None, primary_key=True)
+    epoch: datetime
+
 class Vote(SQLModel, table=True):
-    __table_args__ = (UniqueConstraint("poll_option_id", "user_id"),)
+    __table_args__ = (UniqueConstraint("poll_option_id", "user_id"), {"sqlite_autoincrement": True}) # See Poll
     id: Optional[int] = Field(default=None, primary_key=True)
     poll_option_id: int = Field(foreign_key="polloption.id")
     user_id: int = Field(foreign_key="user.id")
@@ -79,3 +148,50 @@ class Vote(SQLModel, table=True):
 
     poll_option: Optional[PollOption] = Relationship(back_populates="votes")
     user: Optional[User] = Relationship(back_populates="votes")
+
+# Archive (cold) tables. Polls whose last option ended long ago are moved here
+# by the retention job so the hot tables and their indexes stay small. Rows keep
+# their original primary keys so links to archived polls keep working.
+class ArchivedPoll(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    title: str
+    description: Optional[str] = None
+    creator_id: int = Field(foreign_key="user.id")
+    created_at: datetime
+
+    is_recurring: bool = Field(default=False)
+    recurrence_pattern: Optional[str] = None
+    recurrence_end_date: Optional[datetime] = None
+
+    deadline_date: Optional[datetime] = None
+    deadline_offset_minutes: Optional[int] = None
+    deadline_channel_id: Optional[str] = None
+    deadline_message: Optional[str] = None
+    deadline_mention_ids: List[int] = Field(default_factory=list, sa_column=Column(JSON))
+    deadline_notification_sent: bool = Field(default=False)
+
+    archived_at: datetime = Field(default_factory=datetime.utcnow)
+
+    creator: Optional[User] = Relationship()
+    options: List["ArchivedPollOption"] = Relationship(back_populates="poll")
+
+class ArchivedPollOption(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    poll_id: int = Field(foreign_key="archivedpoll.id", index=True)
+    label: str
+    start_time: datetime
+    end_time: datetime
+
+    notification_sent: bool = Field(default=False)
+
+    poll: Optional[ArchivedPoll] = Relationship(back_populates="options")
+    votes: List["ArchivedVote"] = Relationship(back_populates="poll_option")
+
+class ArchivedVote(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    poll_option_id: int = Field(foreign_key="archivedpolloption.id", index=True)
+    user_id: int = Field(foreign_key="user.id")
+    created_at: datetime
+
+    poll_option: Optional[ArchivedPollOption] = Relationship(back_populates="votes")
+    user: Optional[User] = Relationship()
@@ -10,6 +10,9 @@ from config import settings
 from models import User
 from dependencies import get_session, get_current_user
 from services.discord_service import discord_service
+from services.member_directory import member_directory
+from services.typeahead_index import typeahead_index
+from schemas import UserRead
 from security import create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
 
 router = APIRouter()
@@ -109,6 +112,14 @@ def callback(code: str, response: Response, session: Session = Depends(get_sessi
         session.commit()
         session.refresh(db_user)
 
+        typeahead_index.upsert([UserRead.model_validate(db_user, from_attributes=True)])
+        member_directory.upsert(settings.DISCORD_GUILD_ID, {
+            "id": discord_id,
+            "username": username,
+            "display_name": display_name,
+            "avatar": user_data.get("avatar")
+        })
+
         # Create JWT
         access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
         jwt_token = create_access_token(data={"sub": discord_id}, expires_delta=access_token_expires)
@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlmodel import Session
+from typing import List, Optional
+from datetime import datetime, timedelta
+
+from dependencies import get_session, get_current_user
+from models import User
+from schemas import FreeSlotsRead
+from services.availability_service import AvailabilityService, to_utc
+
+router = APIRouter()
+
+MAX_WINDOW = timedelta(days=366)
+
+@router.get("/availability/free-slots", response_model=FreeSlotsRead)
+def get_free_slots(
+    start: datetime,
+    end: datetime,
+    user_ids: Optional[List[int]] = Query(None),
+    min_free: Optional[int] = Query(None, ge=1),
+    min_duration_minutes: int = Query(0, ge=0),
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Time ranges between start and end in which at least min_free of the given
+    users (default: all users) are free. min_free defaults to every user.
+    """
+    start = to_utc(start)
+    end = to_utc(end)
+    if end <= start:
+        raise HTTPException(status_code=400, detail="End time must be after start time")
+    if end - start > MAX_WINDOW:
+        raise HTTPException(status_code=400, detail="Window must be at most a year")
+
+    service = AvailabilityService(session)
+    if user_ids is None:
+        user_ids = service.all_user_ids()
+    user_ids = list(dict.fromkeys(user_ids))
+    if min_free is None:
+        min_free = len(user_ids)
+    if min_free > len(user_ids):
+        raise HTTPException(status_code=400, detail="min_free is larger than the number of users")
+
+    slots = service.free_slots(start, end, user_ids, min_free, timedelta(minutes=min_duration_minutes))
+    return FreeSlotsRead(user_count=len(user_ids), min_free=min_free, slots=slots)
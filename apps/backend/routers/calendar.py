@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlmodel import Session
+from datetime import datetime, timedelta
+
+from dependencies import get_session
+from schemas import CalendarDensityRead
+from services.availability_service import to_utc
+from services.calendar_service import CalendarService, GRANULARITIES
+
+router = APIRouter()
+
+MAX_WINDOW = timedelta(days=3 * 366)
+
+@router.get("/calendar/density", response_model=CalendarDensityRead)
+def get_calendar_density(
+    start: datetime,
+    end: datetime,
+    granularity: str = Query("day", pattern="^(" + "|".join(GRANULARITIES) + ")$"),
+    tz_offset_minutes: int = Query(0, ge=-14 * 60, le=14 * 60),
+    session: Session = Depends(get_session)
+):
+    """
+    Number of polls, options and votes per day or week for the options
+    starting between start and end, for the month and year heatmaps.
+    tz_offset_minutes (minutes east of UTC) sets where days begin.
+    """
+    start = to_utc(start)
+    end = to_utc(end)
+    if end <= start:
+        raise HTTPException(status_code=400, detail="End time must be after start time")
+    if end - start > MAX_WINDOW:
+        raise HTTPException(status_code=400, detail="Window must be at most three years")
+
+    buckets = CalendarService(session).density(start, end, granularity, tz_offset_minutes)
+    return CalendarDensityRead(start=start, end=end, granularity=granularity, tz_offset_minutes=tz_offset_minutes, buckets=buckets)
@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException, Body
+import uuid
+from fastapi import APIRouter, Depends, HTTPException, Body, Header
 from sqlmodel import Session, select
 from typing import List, Dict, Optional
 from pydantic import BaseModel
@@ -8,6 +9,9 @@ from dependencies import get_session, get_current_user
 from models import User, Poll
 from services.discord_service import discord_service
 from services.mention_service import mention_service
+from services.member_directory import member_directory
+from services.outbox_service import outbox_service
+from services.rate_limiter import RateLimitMetrics
 
 router = APIRouter()
 
@@ -31,6 +35,17 @@ def get_discord_channels(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.delete("/discord/channels/cache")
+def invalidate_discord_channels(
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Drop the cached channel list so the next request fetches it from Discord,
+    e.g. right after a channel was added.
+    """
+    discord_service.invalidate_guild_channels(settings.DISCORD_GUILD_ID)
+    return {"message": "Channel cache cleared"}
+
 @router.get("/discord/members", response_model=List[Dict])
 def get_discord_members(
     current_user: User = Depends(get_current_user)
@@ -40,51 +55,64 @@ def get_discord_members(
     User must be authenticated.
     """
     try:
-        members = discord_service.get_guild_members(settings.DISCORD_GUILD_ID)
+        members = member_directory.get_members(settings.DISCORD_GUILD_ID)
         return members
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/discord/rate-limits", response_model=RateLimitMetrics)
+def get_discord_rate_limits(
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Current state of the Discord rate limit buckets seen by this worker.
+    """
+    return discord_service.rate_limiter.metrics()
+
 @router.post("/discord/share")
 def share_poll_to_discord(
     share_request: SharePollRequest,
     current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_session),
+    idempotency_key: Optional[str] = Header(None)
 ):
     """
     Share a poll to a specific Discord channel.
+    The message is written to the outbox and delivered in the background, so
+    this returns as soon as it is queued. Clients may send an Idempotency-Key
+    header to make retried requests queue the message only once.
     """
+    share_key = idempotency_key or uuid.uuid4().hex
+
     # Special case for Profile Sharing
     if share_request.poll_id == 0:
         try:
-             # Record mentions if any
-            if share_request.mentioned_user_ids:
-                mention_service.record_mentions(session, current_user.id, share_request.mentioned_user_ids)
-
-            result = discord_service.send_profile_share_message(
-                channel_id=share_request.channel_id,
+            payload = discord_service.build_profile_share_message(
                 file_owner=current_user,
                 frontend_url=settings.FRONTEND_URL,
                 custom_message=share_request.custom_message,
                 mentioned_user_ids=share_request.mentioned_user_ids,
                 db_session=session
             )
-            return {"message": "Profile shared successfully", "discord_message_id": result.get("id")}
+            outbox_id = outbox_service.enqueue(session, f"share:profile:{current_user.id}:{share_key}", share_request.channel_id, payload)
+
+            # Record mentions if any
+            if share_request.mentioned_user_ids:
+                mention_service.record_mentions(session, current_user.id, share_request.mentioned_user_ids)
+
+            session.commit()
+            outbox_service.wake()
+            return {"message": "Profile share queued", "outbox_message_id": outbox_id}
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
 
     # Verify Poll exists
     poll = session.get(Poll, share_request.poll_id)
-    if not poll:
+    if not poll or poll.deleted_at is not None:
         raise HTTPException(status_code=404, detail="Poll not found")
 
     try:
-        # Record mentions if any
-        if share_request.mentioned_user_ids:
-            mention_service.record_mentions(session, current_user.id, share_request.mentioned_user_ids)
-
-        result = discord_service.send_poll_share_message(
-            channel_id=share_request.channel_id,
+        payload = discord_service.build_poll_share_message(
             poll=poll,
             creator=poll.creator,
             frontend_url=settings.FRONTEND_URL,
@@ -92,6 +120,14 @@ def share_poll_to_discord(
             mentioned_user_ids=share_request.mentioned_user_ids,
             db_session=session
         )
-        return {"message": "Shared successfully", "discord_message_id": result.get("id")}
+        outbox_id = outbox_service.enqueue(session, f"share:poll:{poll.id}:{current_user.id}:{share_key}", share_request.channel_id, payload)
+
+        # Record mentions if any
+        if share_request.mentioned_user_ids:
+            mention_service.record_mentions(session, current_user.id, share_request.mentioned_user_ids)
+
+        session.commit()
+        outbox_service.wake()
+        return {"message": "Share queued", "outbox_message_id": outbox_id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
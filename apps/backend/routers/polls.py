@@ -1,24 +1,29 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlmodel import Session
-from typing import List
+from typing import List, Optional
+from datetime import timedelta
 
 from models import User
-from schemas import PollCreate, PollRead, PollReadWithDetails, PollUpdate, PollOptionCreate, PollOptionRead
+from schemas import PollCreate, PollRead, PollReadWithDetails, PollUpdate, PollOptionCreate, PollOptionRead, PollResultsRead, PollConflictsRead, PollUnavailabilityRead, PollRecommendationRead
 from dependencies import get_session, get_current_user
 from services.poll_service import PollService
+from services.heatmap_service import HeatmapService, UNAVAILABILITY_SCOPES
+from services.recommendation_service import RecommendationService
 from services.notification import NoOpNotificationService
 
 router = APIRouter()
 
 @router.get("/polls", response_model=List[PollReadWithDetails])
 def list_polls(
+    include_archived: bool = False,
     session: Session = Depends(get_session)
 ):
     """
     List all polls with details.
+    Archived polls are only included when include_archived is set.
     """
     poll_service = PollService(session)
-    return poll_service.list_polls()
+    return poll_service.list_polls(include_archived=include_archived)
 
 @router.post("/polls", response_model=PollRead)
 def create_poll(
@@ -36,13 +41,65 @@ def create_poll(
 @router.get("/polls/{poll_id}", response_model=PollReadWithDetails)
 def get_poll(
     poll_id: int,
+    include_archived: bool = False,
     session: Session = Depends(get_session)
 ):
     """
     Get a poll by ID.
+    Archived polls are only returned when include_archived is set.
     """
     poll_service = PollService(session)
-    return poll_service.get_poll(poll_id)
+    return poll_service.get_poll(poll_id, include_archived=include_archived)
+
+@router.get("/polls/{poll_id}/results", response_model=PollResultsRead)
+def get_poll_results(
+    poll_id: int,
+    session: Session = Depends(get_session)
+):
+    """
+    Get the vote tally and the leading options of a poll.
+    """
+    poll_service = PollService(session)
+    return poll_service.results(poll_id)
+
+@router.get("/polls/{poll_id}/conflicts", response_model=PollConflictsRead)
+def get_poll_conflicts(
+    poll_id: int,
+    user_ids: Optional[List[int]] = Query(None),
+    bucket_minutes: int = Query(15, ge=1, le=24 * 60),
+    session: Session = Depends(get_session)
+):
+    """
+    For every option, how many participants (default: the poll's voters and
+    creator) are unavailable.
+    """
+    heatmap_service = HeatmapService(session)
+    return heatmap_service.poll_conflicts(poll_id, user_ids, timedelta(minutes=bucket_minutes))
+
+@router.get("/polls/{poll_id}/unavailability", response_model=PollUnavailabilityRead)
+def get_poll_unavailability(
+    poll_id: int,
+    scope: str = Query("voters", pattern="^(" + "|".join(UNAVAILABILITY_SCOPES) + ")$"),
+    session: Session = Depends(get_session)
+):
+    """
+    For every option, the users who are unavailable: the poll's voters and
+    creator, or every guild member with scope=members.
+    """
+    heatmap_service = HeatmapService(session)
+    return heatmap_service.option_unavailability(poll_id, scope)
+
+@router.get("/polls/{poll_id}/recommendation", response_model=PollRecommendationRead)
+def get_poll_recommendation(
+    poll_id: int,
+    session: Session = Depends(get_session)
+):
+    """
+    Rank the options of a poll, best first, by votes, the unavailability of
+    voters and mentioned users, and how soon after the deadline they start.
+    """
+    recommendation_service = RecommendationService(session)
+    return recommendation_service.recommend(poll_id)
 
 @router.put("/polls/{poll_id}", response_model=PollRead)
 def update_poll(
@@ -1,11 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlmodel import Session
+from typing import List, Optional, Tuple, Union
 from datetime import datetime, timezone
 from pydantic import BaseModel
 
 from dependencies import get_session, get_current_user
 from models import User, UserUnavailability
+from services.availability_service import AvailabilityService, expand_rrule, to_utc
 
 router = APIRouter()
 
@@ -18,15 +19,56 @@ class UnavailabilityRead(BaseModel):
     start_time: datetime
     end_time: datetime
 
-@router.get("/profile/unavailability", response_model=List[UnavailabilityRead])
+class UnavailabilityRecurrence(BaseModel):
+    # The first occurrence; later ones follow the rule.
+    start_time: datetime
+    end_time: datetime
+    rrule: str # e.g. "FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR;UNTIL=20260131" (UNTIL in the rule's time zone)
+    timezone: Optional[str] = None # IANA name the rule repeats in; UTC when omitted
+
+class UnavailabilityBulkCreate(BaseModel):
+    blocks: List[UnavailabilityCreate] = []
+    recurrence: Optional[UnavailabilityRecurrence] = None
+
+class UnavailabilityCompactRead(BaseModel):
+    # [id, start, end] per block, times in seconds since the Unix epoch (UTC).
+    blocks: List[Tuple[int, int, int]]
+
+def epoch_seconds(dt: datetime) -> int:
+    return int(dt.replace(tzinfo=timezone.utc).timestamp())
+
+def as_utc(block: UserUnavailability) -> UnavailabilityRead:
+    # Stored as naive UTC; attach UTC so Pydantic serializes it with an offset for the frontend.
+    return UnavailabilityRead(
+        id=block.id,
+        start_time=block.start_time.replace(tzinfo=timezone.utc),
+        end_time=block.end_time.replace(tzinfo=timezone.utc)
+    )
+
+@router.get("/profile/unavailability", response_model=Union[List[UnavailabilityRead], UnavailabilityCompactRead])
 def get_unavailability(
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    format: str = Query("full", pattern="^(full|compact)$"),
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
     """
-    Get all unavailability blocks for the current user.
+    Get the current user's unavailability blocks, optionally only those
+    overlapping [from, to). format=compact returns [id, start, end] triples
+    in epoch seconds instead of objects.
     """
-    return current_user.unavailability
+    start = to_utc(start) if start is not None else None
+    end = to_utc(end) if end is not None else None
+    if start is not None and end is not None and end <= start:
+        raise HTTPException(status_code=400, detail="to must be after from")
+    blocks = AvailabilityService(session).user_blocks(current_user.id, start, end)
+    if format == "compact":
+        return UnavailabilityCompactRead(blocks=[
+            (block.id, epoch_seconds(block.start_time), epoch_seconds(block.end_time))
+            for block in blocks
+        ])
+    return [as_utc(block) for block in blocks]
 
 @router.post("/profile/unavailability", response_model=UnavailabilityRead)
 def create_unavailability(
@@ -38,64 +80,26 @@ def create_unavailability(
     Create a new unavailability block, merging with overlapping existing blocks.
     Enforces UTC storage.
     """
-    # 1. Normalize to UTC (Naive for DB storage compatibility if needed, but explicit is better)
-    start = data.start_time
-    end = data.end_time
-
-    if start.tzinfo is not None:
-        start = start.astimezone(timezone.utc).replace(tzinfo=None)
-    if end.tzinfo is not None:
-        end = end.astimezone(timezone.utc).replace(tzinfo=None)
-
-    # Validation: Ensure end_time > start_time
-    if end <= start:
-        raise HTTPException(status_code=400, detail="End time must be after start time")
-
-    # 2. Find overlapping blocks for this user
-    # Overlap if: (ExistingStart <= NewEnd) AND (ExistingEnd >= NewStart)
-    statement = select(UserUnavailability).where(
-        UserUnavailability.user_id == current_user.id,
-        UserUnavailability.start_time <= end,
-        UserUnavailability.end_time >= start
-    )
-    overlapping_blocks = session.exec(statement).all()
-
-    # 3. Merge logic
-    final_start = start
-    final_end = end
+    blocks = AvailabilityService(session).add_blocks(current_user.id, [(data.start_time, data.end_time)])
+    return as_utc(blocks[0])
 
-    for block in overlapping_blocks:
-        # Normalize block times to naive UTC (assuming they are stored as such) for comparison
-        b_start = block.start_time
-        b_end = block.end_time
-        
-        # If DB returns aware (unlikely with basic setup), normalize. 
-        # But usually SQLModel/date types return naive.
-        
-        if b_start < final_start:
-            final_start = b_start
-        if b_end > final_end:
-            final_end = b_end
-        
-        # Mark old block for deletion
-        session.delete(block)
-
-    # 4. Create new merged block
-    unavailability = UserUnavailability(
-        user_id=current_user.id,
-        start_time=final_start,
-        end_time=final_end
-    )
-    session.add(unavailability)
-    session.commit()
-    session.refresh(unavailability)
-    
-    # 5. Return with explicit UTC timezone to help frontend
-    # Since we stored naive UTC, we attach UTC info so Pydantic serializes it with Z (or +00:00)
-    unavailability.start_time = unavailability.start_time.replace(tzinfo=timezone.utc)
-    unavailability.end_time = unavailability.end_time.replace(tzinfo=timezone.utc)
-
-    return unavailability
+@router.post("/profile/unavailability/bulk", response_model=List[UnavailabilityRead])
+def create_unavailability_bulk(
+    data: UnavailabilityBulkCreate,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Create many unavailability blocks at once: explicit intervals, a recurrence
+    rule, or both. Everything is merged with the existing blocks in one pass and
+    written in one transaction. Returns the blocks that were written.
+    """
+    intervals = [(block.start_time, block.end_time) for block in data.blocks]
+    if data.recurrence:
+        rule = data.recurrence
+        intervals.extend(expand_rrule(rule.rrule, rule.start_time, rule.end_time, rule.timezone))
+    blocks = AvailabilityService(session).add_blocks(current_user.id, intervals)
+    return [as_utc(block) for block in blocks]
 
 @router.delete("/profile/unavailability/{block_id}")
 def delete_unavailability(
@@ -114,5 +118,6 @@ def delete_unavailability(
         raise HTTPException(status_code=403, detail="Not authorized to delete this block")
 
     session.delete(block)
+    AvailabilityService(session).bump_version(current_user.id)
     session.commit()
     return {"ok": True}
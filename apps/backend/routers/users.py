@@ -1,18 +1,26 @@
 from fastapi import APIRouter, Depends, Query
-from typing import List
+from typing import List, Optional
 from sqlmodel import Session
 from dependencies import get_session, get_current_user
 from models import User
+from schemas import MentionCandidateRead
 from services.mention_service import mention_service
 
 router = APIRouter()
 
-@router.get("/users/ranked", response_model=List[User])
+@router.get("/users/ranked", response_model=List[MentionCandidateRead])
 def get_ranked_users(
+    q: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    ids: Optional[List[int]] = Query(None, max_length=100),
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
     """
-    Returns users ranked by how recently the current user mentioned them.
+    Returns users ranked by how recently the current user mentioned them,
+    optionally filtered by a username / display name prefix. With ids, returns
+    exactly those users instead (e.g. already selected mentions).
     """
-    return mention_service.get_ranked_mentions(session, current_user.id)
+    if ids:
+        return mention_service.get_candidates(session, current_user.id, ids)
+    return mention_service.get_ranked_mentions(session, current_user.id, query=q, limit=limit)
@@ -1,5 +1,5 @@
 from typing import List, Optional, Any
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
 from sqlmodel import SQLModel
 from pydantic import validator, field_serializer
 
@@ -40,6 +40,10 @@ class UserRead(UTCModel):
     display_name: Optional[str] = None
     avatar_url: Optional[str] = None
 
+class MentionCandidateRead(UserRead):
+    last_mentioned_at: Optional[datetime] = None # When the requesting user last mentioned them
+    affinity: float = 0.0 # Decayed mention count as of now; 1.0 = one mention just now
+
 class PollOptionBase(SQLModel):
     label: str
     start_time: datetime
@@ -125,6 +129,7 @@ class PollRead(UTCModel):
     deadline_channel_id: Optional[str] = None
     deadline_message: Optional[str] = None
     deadline_mention_ids: Optional[List[int]] = None
+    archived_at: Optional[datetime] = None # Set only for polls read from the archive
     options: List[PollOptionRead]
 
 class VoteCreate(SQLModel):
@@ -134,9 +139,86 @@ class VoteRead(UTCModel):
     poll_option_id: int
     user: UserRead
 
+class PollOptionTally(UTCModel):
+    option_id: int
+    label: str
+    start_time: datetime
+    end_time: datetime
+    votes: int
+
+class PollResultsRead(UTCModel):
+    poll_id: int
+    total_votes: int
+    voter_count: int
+    tally: List[PollOptionTally] # Sorted by votes, most first
+    top_options: List[PollOptionTally] # Options tied for the most votes; empty if nobody voted
+
+class PollResults(PollResultsRead):
+    # Internal only (deadline notifications); not part of the HTTP response.
+    voter_discord_ids: List[str] = []
+
 class PollOptionReadWithVotes(PollOptionRead):
     votes: List[VoteRead] = []
 
 class PollReadWithDetails(PollRead):
     creator: UserRead
     options: List[PollOptionReadWithVotes]
+
+class FreeSlotRead(UTCModel):
+    start_time: datetime
+    end_time: datetime
+    free_count: int # Fewest users free at any point of the slot
+
+class FreeSlotsRead(UTCModel):
+    user_count: int
+    min_free: int
+    slots: List[FreeSlotRead]
+
+class OptionConflictRead(UTCModel):
+    option_id: int
+    unavailable_count: int
+    unavailable_user_ids: List[int]
+
+class PollConflictsRead(UTCModel):
+    poll_id: int
+    participant_count: int
+    bucket_minutes: int
+    options: List[OptionConflictRead]
+
+class PollUnavailabilityRead(UTCModel):
+    poll_id: int
+    scope: str # "voters" (voters and creator) or "members" (every known guild member)
+    poll_version: int
+    availability_version: int
+    options: List[OptionConflictRead]
+
+class OptionRecommendationRead(UTCModel):
+    option_id: int
+    label: str
+    start_time: datetime
+    end_time: datetime
+    votes: int
+    unavailable_count: int # Voters and mentioned users who are unavailable
+    proximity: float # 1 when the option starts at the deadline, halving with distance; 0 without a deadline
+    starts_before_deadline: bool # Ranked last: it may be over by the time the poll closes
+    score: float
+
+class PollRecommendationRead(UTCModel):
+    poll_id: int
+    poll_version: int
+    availability_version: int
+    deadline_date: Optional[datetime] = None
+    options: List[OptionRecommendationRead] # Best first
+
+class CalendarDensityBucket(SQLModel):
+    day: date # The day, or the Monday starting the week
+    events: int # Polls with at least one option starting in the bucket
+    options: int
+    votes: int
+
+class CalendarDensityRead(UTCModel):
+    start: datetime
+    end: datetime
+    granularity: str # "day" or "week"
+    tz_offset_minutes: int
+    buckets: List[CalendarDensityBucket] # Only buckets with options, in date order
@@ -0,0 +1,267 @@
+import heapq
+import itertools
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from dateutil import rrule
+from fastapi import HTTPException, status
+from sqlmodel import Session, select
+from sqlalchemy import delete, insert, update
+from models import User, UserUnavailability
+from schemas import FreeSlotRead
+
+# (start, end, user id)
+BusyBlock = Tuple[datetime, datetime, int]
+
+# Upper bound on the intervals of one bulk write, after RRULE expansion.
+MAX_BULK_BLOCKS = 2000
+
+def to_utc(dt: datetime) -> datetime:
+    """
+    Naive UTC for storage. Naive input is taken to be UTC already.
+    """
+    if dt.tzinfo is not None:
+        return dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+def expand_rrule(pattern: str, start: datetime, end: datetime, tz: Optional[str] = None, limit: int = MAX_BULK_BLOCKS) -> List[Tuple[datetime, datetime]]:
+    """
+    Expands an RRULE whose first occurrence is [start, end) into UTC intervals.
+    With tz (an IANA name) the rule repeats in that zone's wall-clock time, so
+    "weekdays 9-17" stays 9-17 across daylight saving changes.
+    """
+    if end <= start:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="End time must be after start time")
+    zone = None
+    if tz:
+        try:
+            zone = ZoneInfo(tz)
+        except (ZoneInfoNotFoundError, ValueError):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown time zone: {tz}")
+        if start.tzinfo is not None:
+            start = start.astimezone(zone).replace(tzinfo=None)
+            end = end.astimezone(zone).replace(tzinfo=None)
+    else:
+        start, end = to_utc(start), to_utc(end)
+    duration = end - start
+
+    try:
+        rule = rrule.rrulestr(pattern, dtstart=start)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid recurrence rule: {e}")
+    occurrences = list(itertools.islice(rule, limit + 1))
+    if len(occurrences) > limit:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Recurrence rule yields more than {limit} blocks; add COUNT or UNTIL")
+
+    if zone is None:
+        return [(occurrence, occurrence + duration) for occurrence in occurrences]
+    return [
+        (to_utc(occurrence.replace(tzinfo=zone)), to_utc((occurrence + duration).replace(tzinfo=zone)))
+        for occurrence in occurrences
+    ]
+
+def merge_blocks(new: List[Tuple[datetime, datetime]], existing: List[Tuple[datetime, datetime, int]]):
+    """
+    Merges new intervals into a user's existing blocks in one pass over both
+    sorted lists. Overlapping or touching blocks become one.
+
+    Returns (ids of existing blocks to delete, merged intervals to insert).
+    Existing blocks that touch no new interval are left alone.
+    """
+    delete_ids: List[int] = []
+    inserts: List[Tuple[datetime, datetime]] = []
+    merged = heapq.merge(
+        ((start, end, None) for start, end in sorted(new)),
+        sorted(existing, key=lambda block: block[0]),
+        key=lambda block: block[0]
+    )
+
+    group_start = group_end = None
+    group_ids: List[int] = []
+    group_has_new = False
+
+    def flush():
+        if group_has_new:
+            delete_ids.extend(group_ids)
+            inserts.append((group_start, group_end))
+
+    for start, end, block_id in merged:
+        if group_end is not None and start <= group_end:
+            group_end = max(group_end, end)
+        else:
+            if group_end is not None:
+                flush()
+            group_start, group_end, group_ids, group_has_new = start, end, [], False
+        if block_id is None:
+            group_has_new = True
+        else:
+            group_ids.append(block_id)
+    if group_end is not None:
+        flush()
+    return delete_ids, inserts
+
+class AvailabilityService:
+    def __init__(self, session: Session):
+        self.session = session
+
+    def add_blocks(self, user_id: int, intervals: List[Tuple[datetime, datetime]]) -> List[UserUnavailability]:
+        """
+        Adds unavailability for a user, merging it with the user's overlapping
+        blocks. Reads the affected existing blocks with one range query, then
+        deletes and inserts the changed ones as two set-based statements in one
+        transaction. Returns the inserted (merged) blocks.
+        """
+        intervals = [(to_utc(start), to_utc(end)) for start, end in intervals]
+        if any(end <= start for start, end in intervals):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="End time must be after start time")
+        if not intervals:
+            return []
+        if len(intervals) > MAX_BULK_BLOCKS:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"At most {MAX_BULK_BLOCKS} blocks per request")
+
+        # Touching blocks merge too, hence <= and >=.
+        existing = self.session.exec(
+            select(UserUnavailability.start_time, UserUnavailability.end_time, UserUnavailability.id).where(
+                UserUnavailability.user_id == user_id,
+                UserUnavailability.start_time <= max(end for _, end in intervals),
+                UserUnavailability.end_time >= min(start for start, _ in intervals)
+            ).order_by(UserUnavailability.start_time)
+        ).all()
+        delete_ids, inserts = merge_blocks(intervals, [tuple(row) for row in existing])
+
+        if delete_ids:
+            self.session.execute(delete(UserUnavailability).where(UserUnavailability.id.in_(delete_ids)))
+        rows = self.session.execute(
+            insert(UserUnavailability).returning(UserUnavailability.id, UserUnavailability.start_time, UserUnavailability.end_time),
+            [{"user_id": user_id, "start_time": start, "end_time": end} for start, end in inserts]
+        ).all()
+        self.bump_version(user_id)
+        self.session.commit()
+        # Detached copies, so reading them does not reload each row after the commit.
+        return sorted(
+            (UserUnavailability(id=id, user_id=user_id, start_time=start, end_time=end) for id, start, end in rows),
+            key=lambda block: block.start_time
+        )
+
+    def user_blocks(self, user_id: int, start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[UserUnavailability]:
+        """
+        A user's blocks overlapping [start, end), ordered by start, as detached
+        copies. Either bound may be omitted.
+        """
+        statement = select(UserUnavailability.id, UserUnavailability.start_time, UserUnavailability.end_time).where(
+            UserUnavailability.user_id == user_id
+        )
+        if start is not None:
+            statement = statement.where(UserUnavailability.end_time > to_utc(start))
+        if end is not None:
+            statement = statement.where(UserUnavailability.start_time < to_utc(end))
+        return [
+            UserUnavailability(id=id, user_id=user_id, start_time=block_start, end_time=block_end)
+            for id, block_start, block_end in self.session.exec(statement.order_by(UserUnavailability.start_time)).all()
+        ]
+
+    def bump_version(self, user_id: int) -> None:
+        """
+        Marks the user's unavailability as changed. The version keys the cached
+        conflict annotation of polls, see HeatmapService.option_unavailability.
+        """
+        self.session.execute(update(User).where(User.id == user_id).values(availability_version=User.availability_version + 1))
+
+    def all_user_ids(self) -> List[int]:
+        return list(self.session.exec(select(User.id)).all())
+
+    def load_busy(self, user_ids: List[int], start: datetime, end: datetime) -> List[BusyBlock]:
+        """
+        Loads the unavailability of the given users that overlaps [start, end)
+        with one range query, clipped to the window.
+        """
+        statement = select(UserUnavailability.user_id, UserUnavailability.start_time, UserUnavailability.end_time).where(
+            UserUnavailability.user_id.in_(user_ids),
+            UserUnavailability.start_time < end,
+            UserUnavailability.end_time > start
+        )
+        return [
+            (max(block_start, start), min(block_end, end), user_id)
+            for user_id, block_start, block_end in self.session.exec(statement).all()
+        ]
+
+    def free_slots(
+        self,
+        start: datetime,
+        end: datetime,
+        user_ids: Optional[List[int]] = None,
+        min_free: Optional[int] = None,
+        min_duration: timedelta = timedelta(0)
+    ) -> List[FreeSlotRead]:
+        """
+        Returns the ranges within [start, end) in which at least min_free of the
+        users are free. Defaults to every user, all of whom must be free.
+        """
+        if user_ids is None:
+            user_ids = self.all_user_ids()
+        user_ids = list(dict.fromkeys(user_ids))
+        if min_free is None:
+            min_free = len(user_ids)
+
+        busy = self.load_busy(user_ids, start, end)
+        return sweep_free_slots(busy, len(user_ids), start, end, min_free, min_duration)
+
+def sweep_free_slots(
+    busy: List[BusyBlock],
+    user_count: int,
+    start: datetime,
+    end: datetime,
+    min_free: int,
+    min_duration: timedelta = timedelta(0)
+) -> List[FreeSlotRead]:
+    """
+    Sweep-line over the sorted block endpoints. A user counts as busy while at
+    least one of their blocks is open, so overlapping blocks of the same user
+    are not double counted. Adjacent ranges that all satisfy min_free are
+    merged; free_count is the fewest users free at any point of a slot.
+    """
+    events = []
+    for block_start, block_end, user_id in busy:
+        if block_start < block_end:
+            events.append((block_start, 1, user_id))
+            events.append((block_end, -1, user_id))
+    # Ends sort before starts at the same instant, so back-to-back blocks do not overlap.
+    events.sort()
+
+    open_blocks: Dict[int, int] = {}
+    busy_users = 0
+    slots: List[FreeSlotRead] = []
+    slot_start: Optional[datetime] = None
+    slot_min_free = user_count
+    cursor = start
+    index = 0
+
+    while cursor < end:
+        # The number of busy users is constant on [cursor, next_at).
+        next_at = min(events[index][0], end) if index < len(events) else end
+        if next_at > cursor:
+            free = user_count - busy_users
+            if free >= min_free:
+                if slot_start is None:
+                    slot_start, slot_min_free = cursor, free
+                slot_min_free = min(slot_min_free, free)
+            elif slot_start is not None:
+                if cursor - slot_start >= min_duration:
+                    slots.append(FreeSlotRead(start_time=slot_start, end_time=cursor, free_count=slot_min_free))
+                slot_start = None
+            cursor = next_at
+
+        # Apply every event at this instant.
+        while index < len(events) and events[index][0] <= cursor:
+            _, delta, user_id = events[index]
+            count = open_blocks.get(user_id, 0) + delta
+            open_blocks[user_id] = count
+            if delta == 1 and count == 1:
+                busy_users += 1
+            elif delta == -1 and count == 0:
+                busy_users -= 1
+            index += 1
+
+    if slot_start is not None and end - slot_start >= min_duration:
+        slots.append(FreeSlotRead(start_time=slot_start, end_time=end, free_count=slot_min_free))
+    return slots
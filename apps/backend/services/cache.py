@@ -0,0 +1,91 @@
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+class TTLCache:
+    """
+    Thread-safe cache for slow upstream lookups.
+
+    Entries are fresh for `ttl` seconds. For `stale_ttl` seconds after that the
+    stale value is still returned immediately while a single background
+    refresh runs (stale-while-revalidate). Concurrent misses for the same key
+    share one loader call instead of each going upstream.
+    """
+
+    def __init__(self, ttl: float, stale_ttl: float = 0, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: Dict[Hashable, Tuple[Any, float]] = {} # key -> (value, loaded at)
+        self._inflight: Dict[Hashable, Future] = {}
+        self._generation = 0 # bumped by invalidate() so loads started before it are not cached
+
+    def get(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, loaded_at = entry
+                age = self._clock() - loaded_at
+                if age < self.ttl:
+                    return value
+                if age < self.ttl + self.stale_ttl:
+                    if key not in self._inflight:
+                        future = self._inflight[key] = Future()
+                        threading.Thread(target=self._load, args=(key, loader, future, self._generation), daemon=True).start()
+                    return value
+
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+                generation = self._generation
+
+        if owner:
+            self._load(key, loader, future, generation)
+        return future.result()
+
+    def _load(self, key: Hashable, loader: Callable[[], Any], future: Future, generation: int) -> None:
+        # Resolves and forgets only the future get() created for this load, and
+        # caches only if nothing was invalidated since: invalidate() may have
+        # replaced the future under the same key meanwhile.
+        try:
+            value = loader()
+        except Exception as e:
+            with self._lock:
+                self._forget_inflight(key, future)
+            if key in self._entries:
+                print(f"Cache refresh for {key!r} failed, keeping stale value: {e}")
+            future.set_exception(e)
+            return
+
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = (value, self._clock())
+            self._forget_inflight(key, future)
+        future.set_result(value)
+
+    def _forget_inflight(self, key: Hashable, future: Future) -> None:
+        # invalidate() may already have replaced this load with a newer one.
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[0] if entry else None
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """
+        Drops one key, or everything when no key is given. The next get() loads
+        from upstream again.
+        """
+        with self._lock:
+            self._generation += 1
+            if key is None:
+                self._entries.clear()
+                self._inflight.clear()
+            else:
+                self._entries.pop(key, None)
+                self._inflight.pop(key, None)
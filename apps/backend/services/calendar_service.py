@@ -0,0 +1,39 @@
+from typing import List
+from datetime import date, datetime
+from sqlmodel import Session, select
+from sqlalchemy import func, distinct
+from models import Poll, PollOption, Vote
+from schemas import CalendarDensityBucket
+
+GRANULARITIES = ("day", "week")
+
+class CalendarService:
+    def __init__(self, session: Session):
+        self.session = session
+
+    def density(self, start: datetime, end: datetime, granularity: str = "day", tz_offset_minutes: int = 0) -> List[CalendarDensityBucket]:
+        """
+        Counts polls, options and votes per day (or Monday-based week) for the
+        options starting in [start, end), in one GROUP BY over the start_time
+        index. Days are cut at the viewer's local midnight via tz_offset_minutes
+        (minutes east of UTC).
+        """
+        modifiers = [f"{tz_offset_minutes:+d} minutes"]
+        if granularity == "week":
+            # Back to the Monday on or before the day.
+            modifiers += ["-6 days", "weekday 1"]
+        bucket = func.date(PollOption.start_time, *modifiers)
+
+        statement = (
+            select(bucket, func.count(distinct(PollOption.poll_id)), func.count(distinct(PollOption.id)), func.count(Vote.id))
+            .select_from(PollOption)
+            .join(Poll, Poll.id == PollOption.poll_id)
+            .outerjoin(Vote, Vote.poll_option_id == PollOption.id)
+            .where(PollOption.start_time >= start, PollOption.start_time < end, Poll.deleted_at == None)
+            .group_by(bucket)
+            .order_by(bucket)
+        )
+        return [
+            CalendarDensityBucket(day=date.fromisoformat(day), events=events, options=options, votes=votes)
+            for day, events, options, votes in self.session.exec(statement).all()
+        ]
@@ -0,0 +1,151 @@
+import asyncio
+import heapq
+import threading
+from typing import List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+from sqlmodel import Session, select
+from models import Poll, PollOption
+
+# (trigger time, poll id, option id or 0 for one-time polls)
+Trigger = Tuple[datetime, int, int]
+
+def _to_naive_utc(dt: datetime) -> datetime:
+    if dt.tzinfo is not None:
+        return dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+class DeadlineScheduler:
+    """
+    Keeps a min-heap of upcoming deadline triggers so the deadline checker can
+    sleep exactly until the next one is due instead of polling the database.
+
+    The heap is rebuilt from the database after every batch of processed
+    triggers, and PollService pushes new triggers when polls or options change.
+    Entries may go stale (e.g. a deadline was moved); firing a stale entry only
+    causes a scan that finds nothing due, followed by a rebuild.
+    """
+
+    def __init__(self):
+        self._heap: List[Trigger] = []
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._resync_requested = False
+
+    def attach(self, loop: asyncio.AbstractEventLoop) -> None:
+        """
+        Binds the scheduler to the event loop running the deadline checker.
+        """
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+
+    def load(self, session: Session, processed_until: Optional[datetime] = None, retry_delay: timedelta = timedelta(minutes=1)) -> None:
+        """
+        Rebuilds the heap from every pending deadline in the database.
+        Triggers at or before processed_until are still pending only because they
+        failed to process, so they are retried after retry_delay instead of firing
+        in a tight loop.
+        """
+        triggers: List[Trigger] = []
+
+        onetime_stmt = select(Poll.id, Poll.deadline_date).where(
+            Poll.deadline_date != None,
+            Poll.deadline_channel_id != None,
+            Poll.deadline_notification_sent == False,
+            Poll.is_recurring == False,
+            Poll.deleted_at == None
+        )
+        for poll_id, deadline_date in session.exec(onetime_stmt).all():
+            triggers.append((_to_naive_utc(deadline_date), poll_id, 0))
+
+        recurring_stmt = select(PollOption.poll_id, PollOption.id, PollOption.start_time, Poll.deadline_offset_minutes).join(Poll).where(
+            Poll.is_recurring == True,
+            Poll.deadline_offset_minutes != None,
+            Poll.deadline_channel_id != None,
+            Poll.deleted_at == None,
+            PollOption.notification_sent == False
+        )
+        for poll_id, option_id, start_time, offset_minutes in session.exec(recurring_stmt).all():
+            triggers.append((_to_naive_utc(start_time) - timedelta(minutes=offset_minutes), poll_id, option_id))
+
+        if processed_until is not None:
+            retry_at = processed_until + retry_delay
+            triggers = [
+                (retry_at if trigger_at <= processed_until else trigger_at, poll_id, option_id)
+                for trigger_at, poll_id, option_id in triggers
+            ]
+
+        heapq.heapify(triggers)
+        with self._lock:
+            self._heap = triggers
+
+    def schedule_poll(self, poll: Poll) -> None:
+        """
+        Pushes the pending triggers of a created or updated poll.
+        Safe to call from request worker threads.
+        """
+        triggers: List[Trigger] = []
+        if poll.deleted_at is None and poll.deadline_channel_id:
+            if not poll.is_recurring and poll.deadline_date and not poll.deadline_notification_sent:
+                triggers.append((_to_naive_utc(poll.deadline_date), poll.id, 0))
+            elif poll.is_recurring and poll.deadline_offset_minutes is not None:
+                offset = timedelta(minutes=poll.deadline_offset_minutes)
+                for option in poll.options:
+                    if not option.notification_sent:
+                        triggers.append((_to_naive_utc(option.start_time) - offset, poll.id, option.id))
+
+        if not triggers:
+            return
+
+        with self._lock:
+            previous_next = self._heap[0][0] if self._heap else None
+            for trigger in triggers:
+                heapq.heappush(self._heap, trigger)
+            moved_earlier = previous_next is None or self._heap[0][0] < previous_next
+
+        if moved_earlier and self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def request_resync(self) -> None:
+        """
+        Asks the sleeping checker to rebuild the heap from the database, e.g.
+        after polls were changed by another worker process.
+        """
+        self._resync_requested = True
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def next_trigger_at(self) -> Optional[datetime]:
+        with self._lock:
+            return self._heap[0][0] if self._heap else None
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    async def sleep_until_next_trigger(self, max_seconds: float) -> None:
+        """
+        Sleeps until the earliest trigger is due, waking early when an earlier
+        trigger is pushed. Returns after at most max_seconds, or as soon as a
+        resync is requested, so the caller can resynchronise the heap with the
+        database.
+        """
+        give_up_at = datetime.utcnow() + timedelta(seconds=max_seconds)
+        while True:
+            # Clear before reading the heap so a push racing with us is not lost.
+            self._wakeup.clear()
+            if self._resync_requested:
+                self._resync_requested = False
+                return
+            now = datetime.utcnow()
+            next_at = self.next_trigger_at()
+            wake_at = min(next_at, give_up_at) if next_at else give_up_at
+            delay = (wake_at - now).total_seconds()
+            if delay <= 0:
+                return
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+deadline_scheduler = DeadlineScheduler()
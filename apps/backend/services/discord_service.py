@@ -1,8 +1,13 @@
+import asyncio
 import httpx
-from typing import List, Dict, Optional
+import threading
+import time
+from typing import Iterator, List, Dict, Optional
 from datetime import datetime
 from config import settings
 from models import Poll, User
+from services.rate_limiter import RateLimiter
+from services.cache import TTLCache
 
 class DiscordService:
     BASE_URL = "https://discord.com/api/v10"
@@ -12,25 +17,140 @@ class DiscordService:
             "Authorization": f"Bot {settings.DISCORD_BOT_TOKEN}",
             "Content-Type": "application/json"
         }
+        self._client: Optional[httpx.Client] = None
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._lock = threading.Lock()
+        self.rate_limiter = RateLimiter(global_limit=settings.DISCORD_GLOBAL_RATE_LIMIT)
+        self.channel_cache = TTLCache(ttl=settings.DISCORD_CHANNELS_TTL_SECONDS, stale_ttl=settings.DISCORD_CHANNELS_STALE_SECONDS)
+
+    def _client_options(self) -> Dict:
+        return {
+            "headers": self.headers,
+            "timeout": httpx.Timeout(
+                settings.DISCORD_READ_TIMEOUT_SECONDS,
+                connect=settings.DISCORD_CONNECT_TIMEOUT_SECONDS,
+                pool=settings.DISCORD_POOL_TIMEOUT_SECONDS
+            ),
+            "limits": httpx.Limits(
+                max_connections=settings.DISCORD_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.DISCORD_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.DISCORD_KEEPALIVE_EXPIRY_SECONDS
+            ),
+            "http2": self._http2_available()
+        }
+
+    def _http2_available(self) -> bool:
+        if not settings.DISCORD_HTTP2:
+            return False
+        try:
+            import h2 # noqa: F401
+            return True
+        except ImportError:
+            print("DISCORD_HTTP2 is set but the h2 package is not installed, falling back to HTTP/1.1.")
+            return False
+
+    @property
+    def client(self) -> httpx.Client:
+        """
+        Pooled client for the synchronous calls made from request worker threads.
+        """
+        with self._lock:
+            if self._client is None or self._client.is_closed:
+                self._client = httpx.Client(**self._client_options())
+            return self._client
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        """
+        Pooled client for calls made on the event loop (e.g. outbox delivery).
+        """
+        with self._lock:
+            if self._async_client is None or self._async_client.is_closed:
+                self._async_client = httpx.AsyncClient(**self._client_options())
+            return self._async_client
+
+    def open(self) -> None:
+        """
+        Creates the pooled clients. Called on app startup; the properties also
+        create them lazily for scripts and tests.
+        """
+        self.client
+        self.async_client
+
+    async def aclose(self) -> None:
+        """
+        Closes the pooled clients and their keep-alive connections. Called on app shutdown.
+        """
+        with self._lock:
+            client, self._client = self._client, None
+            async_client, self._async_client = self._async_client, None
+        if client is not None:
+            client.close()
+        if async_client is not None:
+            await async_client.aclose()
+
+    def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        Sends a request through the pooled client, waiting for a rate limit slot
+        first and retrying when Discord still answers 429.
+        """
+        for _ in range(settings.DISCORD_RATE_LIMIT_RETRIES + 1):
+            delay = self.rate_limiter.acquire(method, url)
+            if delay > 0:
+                time.sleep(delay)
+            response = self.client.request(method, url, **kwargs)
+            retry_after = self.rate_limiter.update(method, url, response)
+            if retry_after is None:
+                break
+            print(f"Discord rate limited {method} {url}, retry after {retry_after:.2f}s")
+        return response
+
+    async def _arequest(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        Async counterpart of _request() for calls made on the event loop.
+        """
+        for _ in range(settings.DISCORD_RATE_LIMIT_RETRIES + 1):
+            delay = self.rate_limiter.acquire(method, url)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            response = await self.async_client.request(method, url, **kwargs)
+            retry_after = self.rate_limiter.update(method, url, response)
+            if retry_after is None:
+                break
+            print(f"Discord rate limited {method} {url}, retry after {retry_after:.2f}s")
+        return response
 
     def get_guild_channels(self, guild_id: str) -> List[Dict]:
+        """
+        Returns the text channels of a guild from the channel cache, fetching
+        them from Discord when missing or expired.
+        """
+        return self.channel_cache.get(guild_id, lambda: self._fetch_guild_channels(guild_id))
+
+    def invalidate_guild_channels(self, guild_id: Optional[str] = None) -> None:
+        """
+        Forgets the cached channel list of a guild (or of all guilds), e.g.
+        after channels were created or renamed.
+        """
+        self.channel_cache.invalidate(guild_id)
+
+    def _fetch_guild_channels(self, guild_id: str) -> List[Dict]:
         """
         Fetches all channels for a guild and filters for text channels.
         """
         url = f"{self.BASE_URL}/guilds/{guild_id}/channels"
 
         try:
-            with httpx.Client() as client:
-                response = client.get(url, headers=self.headers)
-                response.raise_for_status()
-                channels = response.json()
-                text_channels = [
-                    {"id": c["id"], "name": c["name"], "position": c.get("position", 0), "parent_id": c.get("parent_id")}
-                    for c in channels
-                    if c.get("type") == 0
-                ]
-                text_channels.sort(key=lambda x: x["position"])
-                return text_channels
+            response = self._request("GET", url)
+            response.raise_for_status()
+            channels = response.json()
+            text_channels = [
+                {"id": c["id"], "name": c["name"], "position": c.get("position", 0), "parent_id": c.get("parent_id")}
+                for c in channels
+                if c.get("type") == 0
+            ]
+            text_channels.sort(key=lambda x: x["position"])
+            return text_channels
         except httpx.HTTPStatusError as e:
             print(f"Discord API Error: {e.response.text}")
             raise e
@@ -38,40 +158,52 @@ class DiscordService:
             print(f"Error fetching channels: {e}")
             raise e
 
+    MEMBERS_PAGE_SIZE = 1000 # Discord's maximum for List Guild Members
+
     def get_guild_members(self, guild_id: str) -> List[Dict]:
         """
-        Fetches members from the guild.
+        Fetches all members from the guild, following the pagination cursor.
+        """
+        members = []
+        for page in self.iter_guild_member_pages(guild_id):
+            members.extend(page)
+        return members
+
+    def iter_guild_member_pages(self, guild_id: str) -> Iterator[List[Dict]]:
+        """
+        Yields the guild's (non-bot) members one page at a time, in user id order.
         """
         url = f"{self.BASE_URL}/guilds/{guild_id}/members"
-        params = {"limit": 1000}
+        after = "0"
 
-        try:
-            with httpx.Client() as client:
-                response = client.get(url, headers=self.headers, params=params)
+        while True:
+            try:
+                response = self._request("GET", url, params={"limit": self.MEMBERS_PAGE_SIZE, "after": after})
                 response.raise_for_status()
                 members = response.json()
-                
-                formatted_members = []
-                for m in members:
-                    user = m.get("user", {})
-                    if user.get("bot"): continue
-                    
-                    display_name = m.get("nick") or user.get("global_name") or user.get("username")
-                    formatted_members.append({
-                        "id": user.get("id"),
-                        "username": user.get("username"),
-                        "display_name": display_name,
-                        "avatar": user.get("avatar")
-                    })
-                
-                return formatted_members
-
-        except httpx.HTTPStatusError as e:
-            print(f"Discord API Error: {e.response.text}")
-            raise e
-        except Exception as e:
-            print(f"Error fetching members: {e}")
-            raise e
+            except httpx.HTTPStatusError as e:
+                print(f"Discord API Error: {e.response.text}")
+                raise e
+            except Exception as e:
+                print(f"Error fetching members: {e}")
+                raise e
+
+            yield [self.format_member(m) for m in members if not m.get("user", {}).get("bot")]
+
+            if len(members) < self.MEMBERS_PAGE_SIZE:
+                return
+            # The cursor is the highest user id seen, bots included.
+            after = members[-1]["user"]["id"]
+
+    def format_member(self, member: Dict) -> Dict:
+        user = member.get("user", {})
+        display_name = member.get("nick") or user.get("global_name") or user.get("username")
+        return {
+            "id": user.get("id"),
+            "username": user.get("username"),
+            "display_name": display_name,
+            "avatar": user.get("avatar")
+        }
 
     def get_guild_member(self, guild_id: str, user_id: str) -> Optional[Dict]:
         """
@@ -80,22 +212,38 @@ class DiscordService:
         url = f"{self.BASE_URL}/guilds/{guild_id}/members/{user_id}"
 
         try:
-            with httpx.Client() as client:
-                response = client.get(url, headers=self.headers)
-                if response.status_code == 404:
-                    return None
-                response.raise_for_status()
-                return response.json()
+            response = self._request("GET", url)
+            if response.status_code == 404:
+                return None
+            response.raise_for_status()
+            return response.json()
         except Exception as e:
             print(f"Error fetching member {user_id}: {e}")
             return None
 
-    def send_poll_share_message(self, channel_id: str, poll: Poll, creator: User, frontend_url: str, custom_message: Optional[str] = None, mentioned_user_ids: Optional[List[int]] = None, db_session = None) -> Dict:
+    async def post_message(self, channel_id: str, payload: Dict, nonce: Optional[str] = None) -> Dict:
         """
-        Sends a rich embed message to the specified Discord channel.
+        Posts a message payload to a channel and returns the created message.
+        When a nonce is given Discord enforces it, so a retried delivery of the
+        same message within a few minutes does not post a duplicate.
+        Raises httpx.HTTPStatusError on failure.
         """
         url = f"{self.BASE_URL}/channels/{channel_id}/messages"
+        if nonce:
+            payload = {**payload, "nonce": nonce, "enforce_nonce": True}
+
+        try:
+            response = await self._arequest("POST", url, json=payload)
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPStatusError as e:
+            print(f"Discord API Error: {e.response.text}")
+            raise e
 
+    def build_poll_share_message(self, poll: Poll, creator: User, frontend_url: str, custom_message: Optional[str] = None, mentioned_user_ids: Optional[List[int]] = None, db_session = None) -> Dict:
+        """
+        Builds the rich embed message payload for sharing a poll.
+        """
         # Construct Event Link
         event_link = f"{frontend_url.rstrip('/')}/apps/calendar/{poll.id}"
 
@@ -175,29 +323,15 @@ class DiscordService:
         if mention_str:
             content = f"{content}\n\n{mention_str}"
 
-        payload = {
+        return {
             "content": content,
             "embeds": [embed]
         }
 
-        try:
-            with httpx.Client() as client:
-                response = client.post(url, headers=self.headers, json=payload)
-                response.raise_for_status()
-                return response.json()
-        except httpx.HTTPStatusError as e:
-            print(f"Discord API Error: {e.response.text}")
-            raise e
-        except Exception as e:
-            print(f"Error sending message: {e}")
-            raise e
-
-    def send_deadline_notification(self, channel_id: str, poll_title: str, event_url: str, message: str, result_text: str, mention_discord_ids: List[str]) -> None:
+    def build_deadline_notification(self, poll_title: str, event_url: str, message: str, result_text: str, mention_discord_ids: List[str]) -> Dict:
         """
-        Sends the final deadline notification.
+        Builds the final deadline notification payload.
         """
-        url = f"{self.BASE_URL}/channels/{channel_id}/messages"
-
         fields = [
             {
                 "name": "Result / Status",
@@ -222,23 +356,15 @@ class DiscordService:
         if mention_discord_ids:
             content = " ".join([f"<@{uid}>" for uid in mention_discord_ids])
 
-        payload = {
+        return {
             "content": content,
             "embeds": [embed]
         }
 
-        try:
-            with httpx.Client() as client:
-                client.post(url, headers=self.headers, json=payload)
-        except Exception as e:
-            print(f"Error sending deadline notification: {e}")
-
-    def send_profile_share_message(self, channel_id: str, file_owner: User, frontend_url: str, custom_message: Optional[str] = None, mentioned_user_ids: Optional[List[int]] = None, db_session = None) -> Dict:
+    def build_profile_share_message(self, file_owner: User, frontend_url: str, custom_message: Optional[str] = None, mentioned_user_ids: Optional[List[int]] = None, db_session = None) -> Dict:
         """
-        Sends a share message for a user's availability profile.
+        Builds the share message payload for a user's availability profile.
         """
-        url = f"{self.BASE_URL}/channels/{channel_id}/messages"
-
         # Link to home page or specific profile route if it existed
         # Since Profile.tsx is "Your Profile" and edits it, and we assume there isn't a public read-only view yet or it's just the main app.
         # We will link to the app root for now.
@@ -287,21 +413,9 @@ class DiscordService:
         if mention_str:
             content = f"{content}\n\n{mention_str}"
 
-        payload = {
+        return {
             "content": content,
             "embeds": [embed]
         }
 
-        try:
-            with httpx.Client() as client:
-                response = client.post(url, headers=self.headers, json=payload)
-                response.raise_for_status()
-                return response.json()
-        except httpx.HTTPStatusError as e:
-            print(f"Discord API Error: {e.response.text}")
-            raise e
-        except Exception as e:
-            print(f"Error sending message: {e}")
-            raise e
-
 discord_service = DiscordService()
@@ -0,0 +1,222 @@
+import math
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timedelta
+import numpy as np
+from fastapi import HTTPException, status
+from sqlmodel import Session, select
+from sqlalchemy import and_, func, union
+from models import Poll, PollOption, User, UserUnavailability, Vote
+from schemas import OptionConflictRead, PollConflictsRead, PollUnavailabilityRead
+from services.availability_service import AvailabilityService
+from services.cache import TTLCache
+from config import settings
+
+# Upper bound on the time buckets of one heatmap; wider windows get coarser buckets.
+MAX_BUCKETS = 20000
+
+UNAVAILABILITY_SCOPES = ("voters", "members")
+
+# (poll id, scope) -> PollUnavailabilityRead
+unavailability_cache = TTLCache(ttl=settings.POLL_UNAVAILABILITY_CACHE_SECONDS)
+
+class HeatmapService:
+    """
+    Counts, for every option of a poll, how many participants are unavailable.
+
+    The window spanned by the options is cut into fixed buckets and the
+    participants' unavailability becomes a user x bucket bitmap, so the
+    per-option counts are a few array reductions instead of a loop over
+    options x users x blocks. Block and option edges are widened to whole
+    buckets, so with buckets smaller than the time grid people schedule on
+    (e.g. 15 minutes) the result is exact.
+    """
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    def poll_conflicts(self, poll_id: int, user_ids: Optional[List[int]] = None, bucket: timedelta = timedelta(minutes=15)) -> PollConflictsRead:
+        exists = self.session.exec(select(Poll.id).where(Poll.id == poll_id, Poll.deleted_at == None)).first()
+        if exists is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Poll not found")
+
+        options = self.session.exec(
+            select(PollOption.id, PollOption.start_time, PollOption.end_time)
+            .where(PollOption.poll_id == poll_id)
+            .order_by(PollOption.start_time, PollOption.id)
+        ).all()
+        if user_ids is None:
+            user_ids = self.participant_ids(poll_id)
+        user_ids = sorted(set(user_ids))
+
+        if not options:
+            return PollConflictsRead(poll_id=poll_id, participant_count=len(user_ids), bucket_minutes=int(bucket.total_seconds() // 60), options=[])
+
+        window_start = min(start for _, start, _ in options)
+        window_end = max(end for _, _, end in options)
+        bucket = self._bucket_size(window_start, window_end, bucket)
+        busy = AvailabilityService(self.session).load_busy(user_ids, window_start, window_end) if user_ids else []
+
+        counts, unavailable = option_conflicts(
+            [(start, end) for _, start, end in options],
+            busy,
+            user_ids,
+            window_start,
+            bucket
+        )
+        return PollConflictsRead(
+            poll_id=poll_id,
+            participant_count=len(user_ids),
+            bucket_minutes=int(bucket.total_seconds() // 60),
+            options=[
+                OptionConflictRead(option_id=option_id, unavailable_count=count, unavailable_user_ids=users)
+                for (option_id, _, _), count, users in zip(options, counts, unavailable)
+            ]
+        )
+
+    def option_unavailability(self, poll_id: int, scope: str = "voters") -> PollUnavailabilityRead:
+        """
+        Lists, for every option of a poll, the users who are unavailable during it.
+        scope is "voters" (the poll's voters and creator) or "members" (every
+        known guild member).
+
+        The result is cached per poll and reused for as long as the poll
+        version (bumped by edits and votes) and the summed availability version
+        of the users in scope are unchanged, so it is correct across workers.
+        """
+        poll_version, availability_version = self._versions(poll_id, scope)
+        key = (poll_id, scope)
+        cached = unavailability_cache.peek(key)
+        if cached is not None and (cached.poll_version, cached.availability_version) != (poll_version, availability_version):
+            unavailability_cache.invalidate(key)
+
+        def load() -> PollUnavailabilityRead:
+            return PollUnavailabilityRead(
+                poll_id=poll_id,
+                scope=scope,
+                poll_version=poll_version,
+                availability_version=availability_version,
+                options=self.unavailable_by_option(poll_id, self._participants(poll_id) if scope == "voters" else None)
+            )
+
+        result = unavailability_cache.get(key, load)
+        if (result.poll_version, result.availability_version) != (poll_version, availability_version):
+            # A concurrent request loaded another version; don't serve it to this one.
+            result = load()
+        return result
+
+    def _participants(self, poll_id: int):
+        voters = select(Vote.user_id).join(PollOption, PollOption.id == Vote.poll_option_id).where(PollOption.poll_id == poll_id)
+        creator = select(Poll.creator_id).where(Poll.id == poll_id)
+        return union(voters, creator)
+
+    def _versions(self, poll_id: int, scope: str) -> Tuple[int, int]:
+        participants = self._participants(poll_id) if scope == "voters" else None
+        row = self.session.exec(
+            select(Poll.version, availability_version(participants)).where(Poll.id == poll_id, Poll.deleted_at == None)
+        ).first()
+        if row is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Poll not found")
+        return row[0], row[1]
+
+    def unavailable_by_option(self, poll_id: int, participants=None) -> List[OptionConflictRead]:
+        """
+        One LEFT JOIN of the poll's options against the unavailability that
+        overlaps them, restricted to the user ids selected by participants
+        (every user when None). The outer window (first start to last end) is
+        repeated as a plain range condition so the planner can narrow the
+        unavailability rows before testing each option.
+        """
+        window_start = select(func.min(PollOption.start_time)).where(PollOption.poll_id == poll_id).scalar_subquery()
+        window_end = select(func.max(PollOption.end_time)).where(PollOption.poll_id == poll_id).scalar_subquery()
+        overlap = [
+            UserUnavailability.start_time < window_end,
+            UserUnavailability.end_time > window_start,
+            UserUnavailability.start_time < PollOption.end_time,
+            UserUnavailability.end_time > PollOption.start_time
+        ]
+        if participants is not None:
+            overlap.append(UserUnavailability.user_id.in_(participants))
+
+        rows = self.session.exec(
+            select(PollOption.id, PollOption.start_time, UserUnavailability.user_id)
+            .distinct()
+            .outerjoin(UserUnavailability, and_(*overlap))
+            .where(PollOption.poll_id == poll_id)
+            .order_by(PollOption.start_time, PollOption.id, UserUnavailability.user_id)
+        ).all()
+
+        unavailable: Dict[int, List[int]] = {}
+        for option_id, _, user_id in rows:
+            users = unavailable.setdefault(option_id, [])
+            if user_id is not None:
+                users.append(user_id)
+        return [
+            OptionConflictRead(option_id=option_id, unavailable_count=len(users), unavailable_user_ids=users)
+            for option_id, users in unavailable.items()
+        ]
+
+    def participant_ids(self, poll_id: int) -> List[int]:
+        """
+        Users who voted on any option of the poll, plus its creator.
+        """
+        voters = self.session.exec(
+            select(Vote.user_id).distinct().join(PollOption, PollOption.id == Vote.poll_option_id).where(PollOption.poll_id == poll_id)
+        ).all()
+        creator_id = self.session.exec(select(Poll.creator_id).where(Poll.id == poll_id)).one()
+        return sorted(set(voters) | {creator_id})
+
+    def _bucket_size(self, start: datetime, end: datetime, bucket: timedelta) -> timedelta:
+        if (end - start) / bucket <= MAX_BUCKETS:
+            return bucket
+        minutes = math.ceil((end - start).total_seconds() / 60 / MAX_BUCKETS)
+        return timedelta(minutes=minutes)
+
+def availability_version(participants=None):
+    """
+    Scalar subquery summing the availability versions of the user ids selected
+    by participants (every user when None). Versions only grow, so the sum
+    changes whenever any of those users' unavailability does.
+    """
+    users = select(func.coalesce(func.sum(User.availability_version), 0))
+    if participants is not None:
+        users = users.where(User.id.in_(participants))
+    return users.scalar_subquery()
+
+def option_conflicts(options, busy, user_ids: List[int], window_start: datetime, bucket: timedelta):
+    """
+    options: [(start, end)], busy: [(start, end, user id)] clipped to the window.
+    Returns (conflict count per option, unavailable user ids per option).
+    """
+    seconds = bucket.total_seconds()
+
+    def bucket_indexes(times: np.ndarray, round_up: bool) -> np.ndarray:
+        offsets = (times - np.datetime64(window_start)) / np.timedelta64(1, "s") / seconds
+        return (np.ceil(offsets) if round_up else np.floor(offsets)).astype(np.int64)
+
+    option_starts = bucket_indexes(np.array([s for s, _ in options], dtype="datetime64[us]"), round_up=False)
+    option_ends = bucket_indexes(np.array([e for _, e in options], dtype="datetime64[us]"), round_up=True)
+    bucket_count = int(option_ends.max())
+
+    rows = {user_id: row for row, user_id in enumerate(user_ids)}
+    if busy and user_ids:
+        block_rows = np.array([rows[user_id] for _, _, user_id in busy], dtype=np.int64)
+        block_starts = bucket_indexes(np.array([s for s, _, _ in busy], dtype="datetime64[us]"), round_up=False)
+        block_ends = bucket_indexes(np.array([e for _, e, _ in busy], dtype="datetime64[us]"), round_up=True)
+        # Difference array: +1 where a block starts, -1 where it ends; the running
+        # sum along each row is the number of open blocks in every bucket.
+        diff = np.zeros((len(user_ids), bucket_count + 1), dtype=np.int32)
+        np.add.at(diff, (block_rows, np.clip(block_starts, 0, bucket_count)), 1)
+        np.add.at(diff, (block_rows, np.clip(block_ends, 0, bucket_count)), -1)
+        bitmap = np.cumsum(diff[:, :bucket_count], axis=1) > 0
+    else:
+        bitmap = np.zeros((len(user_ids), bucket_count), dtype=bool)
+
+    # Prefix sums over buckets turn "busy anywhere in [start, end)" into two lookups per option.
+    busy_prefix = np.zeros((len(user_ids), bucket_count + 1), dtype=np.int32)
+    np.cumsum(bitmap, axis=1, out=busy_prefix[:, 1:])
+    conflicts = (busy_prefix[:, option_ends] - busy_prefix[:, option_starts]) > 0 # users x options
+
+    counts = conflicts.sum(axis=0).tolist()
+    user_array = np.array(user_ids, dtype=np.int64)
+    unavailable = [user_array[conflicts[:, i]].tolist() for i in range(len(options))]
+    return counts, unavailable
@@ -0,0 +1,56 @@
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from sqlmodel import Session
+from sqlalchemy import or_, update
+from sqlalchemy.dialects.sqlite import insert
+from models import Lease
+
+class LeaderElection:
+    """
+    Lease-based leader election over the shared database.
+
+    Every worker calls try_acquire() periodically. The conditional UPDATE only
+    succeeds for the current holder (a renewal) or once the lease has expired
+    (a takeover), and SQLite serialises writers, so at most one process holds
+    the lease at any time.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.holder_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    def try_acquire(self, session: Session, ttl_seconds: int) -> bool:
+        """
+        Acquires or renews the lease. Returns True while this process is leader.
+        """
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=ttl_seconds)
+
+        session.execute(
+            insert(Lease)
+            .values(name=self.name, holder=self.holder_id, expires_at=expires_at)
+            .on_conflict_do_nothing(index_elements=["name"])
+        )
+        result = session.execute(
+            update(Lease)
+            .where(Lease.name == self.name, or_(Lease.holder == self.holder_id, Lease.expires_at < now))
+            .values(holder=self.holder_id, expires_at=expires_at)
+        )
+        session.commit()
+        return result.rowcount == 1
+
+    def release(self, session: Session) -> None:
+        """
+        Expires the lease if this process holds it, so another worker can take
+        over without waiting for the TTL.
+        """
+        session.execute(
+            update(Lease)
+            .where(Lease.name == self.name, Lease.holder == self.holder_id)
+            .values(expires_at=datetime.utcnow() - timedelta(seconds=1))
+        )
+        session.commit()
+
+leader_election = LeaderElection("background-jobs")
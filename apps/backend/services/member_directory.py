@@ -0,0 +1,126 @@
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+from services.discord_service import discord_service
+from config import settings
+
+class GuildMembers:
+    def __init__(self):
+        self.members: Dict[str, Dict] = {} # discord id -> formatted member
+        self.refreshed_at: Optional[float] = None # monotonic clock, None until the first full pass
+        self.failed_at: Optional[float] = None # monotonic clock of the last failed pass
+        self.refreshing = False
+        self.loaded = threading.Event()
+
+class MemberDirectory:
+    """
+    In-memory directory of guild members.
+
+    The first read pages through the whole guild. After that the directory is
+    served from memory, and once it is older than the TTL a background thread
+    pages through the guild again, merging each page as it arrives and dropping
+    members that are no longer listed once the pass completes. Logins update
+    single entries through upsert(). After a failed pass no new pass starts
+    until the retry interval has passed.
+    """
+
+    def __init__(
+        self,
+        ttl: float = settings.DISCORD_MEMBERS_TTL_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+        retry_after: float = settings.DISCORD_MEMBERS_RETRY_SECONDS,
+    ):
+        self.ttl = ttl
+        self.retry_after = retry_after
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._guilds: Dict[str, GuildMembers] = {}
+
+    def _guild(self, guild_id: str) -> GuildMembers:
+        if guild_id not in self._guilds:
+            self._guilds[guild_id] = GuildMembers()
+        return self._guilds[guild_id]
+
+    def get_members(self, guild_id: str) -> List[Dict]:
+        with self._lock:
+            guild = self._guild(guild_id)
+            now = self._clock()
+            expired = guild.refreshed_at is None or now - guild.refreshed_at >= self.ttl
+            backing_off = guild.failed_at is not None and now - guild.failed_at < self.retry_after
+            start_refresh = expired and not guild.refreshing and not backing_off
+            if start_refresh:
+                guild.refreshing = True
+            loaded = guild.refreshed_at is not None
+
+        if start_refresh:
+            if loaded:
+                threading.Thread(target=self.refresh, args=(guild_id,), daemon=True).start()
+            else:
+                # Nothing to serve yet: load in this request.
+                self.refresh(guild_id)
+        elif not loaded and guild.refreshing:
+            # Another request is doing the first load; share its result.
+            guild.loaded.wait(timeout=settings.DISCORD_READ_TIMEOUT_SECONDS * 3)
+
+        with self._lock:
+            if guild.refreshed_at is None:
+                raise RuntimeError("Guild member directory is not loaded")
+            return list(guild.members.values())
+
+    def refresh(self, guild_id: str) -> int:
+        """
+        Pages through the guild and merges the result into the directory.
+        Returns the number of members. Called by get_members(); safe to call
+        directly, e.g. from a scheduled job.
+        """
+        with self._lock:
+            guild = self._guild(guild_id)
+            guild.refreshing = True
+            if guild.refreshed_at is None:
+                guild.loaded.clear()
+        seen = set()
+        try:
+            for page in discord_service.iter_guild_member_pages(guild_id):
+                with self._lock:
+                    for member in page:
+                        guild.members[member["id"]] = member
+                        seen.add(member["id"])
+            with self._lock:
+                for discord_id in list(guild.members):
+                    if discord_id not in seen:
+                        del guild.members[discord_id]
+                guild.refreshed_at = self._clock()
+                guild.failed_at = None
+            return len(seen)
+        except Exception as e:
+            print(f"Error refreshing member directory for guild {guild_id}: {e}")
+            with self._lock:
+                guild.failed_at = self._clock()
+                if guild.refreshed_at is None:
+                    # Pages merged before the failure are not a directory.
+                    guild.members.clear()
+                    raise e
+                return len(guild.members)
+        finally:
+            with self._lock:
+                guild.refreshing = False
+            guild.loaded.set()
+
+    def upsert(self, guild_id: str, member: Dict) -> None:
+        """
+        Adds or updates a single (formatted) member, e.g. after a login.
+        """
+        with self._lock:
+            self._guild(guild_id).members[member["id"]] = member
+
+    def invalidate(self, guild_id: Optional[str] = None) -> None:
+        """
+        Forgets one guild, or all of them. The next read loads from Discord again.
+        """
+        with self._lock:
+            if guild_id is None:
+                self._guilds.clear()
+            else:
+                self._guilds.pop(guild_id, None)
+
+member_directory = MemberDirectory()
@@ -0,0 +1,64 @@
+import hashlib
+from typing import Dict, List, Optional
+from sqlmodel import Session
+from sqlalchemy.dialects.sqlite import insert
+from models import User
+from schemas import UserRead
+from services.typeahead_index import typeahead_index
+
+def avatar_url(discord_id: str, avatar: Optional[str]) -> Optional[str]:
+    if not avatar:
+        return None
+    return f"https://cdn.discordapp.com/avatars/{discord_id}/{avatar}.png"
+
+def profile_hash(username: str, display_name: Optional[str], avatar_url: Optional[str]) -> str:
+    """
+    Fingerprint of the profile fields copied from Discord, used to skip
+    rewriting users whose profile did not change.
+    """
+    content = "\x1f".join([username or "", display_name or "", avatar_url or ""])
+    return hashlib.sha256(content.encode()).hexdigest()[:32]
+
+class MemberSyncService:
+    def __init__(self, session: Session):
+        self.session = session
+
+    def sync(self, members: List[Dict], chunk_size: int = 500) -> int:
+        """
+        Upserts guild members into the user table, keyed on discord_id.
+        Rows whose profile hash is unchanged are left untouched, and only the
+        changed users are pushed to the typeahead index. Returns the number of
+        users inserted or updated.
+        """
+        rows = []
+        for m in members:
+            discord_id = str(m["id"])
+            url = avatar_url(discord_id, m.get("avatar"))
+            rows.append({
+                "discord_id": discord_id,
+                "username": m["username"],
+                "display_name": m["display_name"],
+                "avatar_url": url,
+                "profile_hash": profile_hash(m["username"], m["display_name"], url)
+            })
+
+        changed: List[UserRead] = []
+        for start in range(0, len(rows), chunk_size):
+            statement = insert(User).values(rows[start:start + chunk_size])
+            statement = statement.on_conflict_do_update(
+                index_elements=["discord_id"],
+                set_={
+                    "username": statement.excluded.username,
+                    "display_name": statement.excluded.display_name,
+                    "avatar_url": statement.excluded.avatar_url,
+                    "profile_hash": statement.excluded.profile_hash
+                },
+                where=User.profile_hash.is_distinct_from(statement.excluded.profile_hash)
+            ).returning(User.id, User.username, User.display_name, User.avatar_url)
+            changed.extend(
+                UserRead(id=id, username=username, display_name=display_name, avatar_url=avatar_url)
+                for id, username, display_name, avatar_url in self.session.execute(statement).all()
+            )
+        self.session.commit()
+        typeahead_index.upsert(changed)
+        return len(changed)
@@ -1,123 +1,257 @@
-from typing import List, Optional
-from datetime import datetime
-from sqlmodel import Session, select, desc
-from models import UserMention, User
-from services.discord_service import discord_service
+import heapq
+import json
+import math
+from typing import List, Optional, Tuple
+from datetime import datetime, timedelta
+from sqlmodel import Session, select
+from sqlalchemy import and_, or_, func, null, literal, update
+from sqlalchemy.dialects.sqlite import insert
+from models import AffinityEpoch, UserMention, User
+from schemas import MentionCandidateRead, UserRead
+from services.typeahead_index import typeahead_index
 from config import settings
 
+# Affinity weights are stored relative to an epoch: a mention at time t adds
+# 2^((t - epoch) / half-life), so older scores never need rewriting and dividing
+# by the weight of "now" gives the decayed count. The epoch starts here and is
+# moved forward (see MentionService.rebase_affinity) once it is
+# AFFINITY_REBASE_HALF_LIVES behind, long before weights overflow a float.
+AFFINITY_EPOCH = datetime(2025, 1, 1)
+AFFINITY_REBASE_HALF_LIVES = 256
+
+def decode_mention_ids(value) -> List[int]:
+    """
+    User ids from a poll's deadline_mention_ids, which older rows store as a
+    JSON-encoded string. Entries that are not user ids are skipped.
+    """
+    if not value:
+        return []
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return []
+    if not isinstance(value, list):
+        return []
+    ids = []
+    for entry in value:
+        if isinstance(entry, bool):
+            continue
+        try:
+            ids.append(int(entry))
+        except (TypeError, ValueError):
+            continue
+    return ids
+
 class MentionService:
-    def record_mentions(self, session: Session, creator_id: int, target_user_ids: List[int]) -> None:
+    def __init__(self):
+        self._epoch: Optional[datetime] = None # cached AffinityEpoch, see affinity_epoch()
+
+    def reset(self) -> None:
+        self._epoch = None
+
+    def half_lives(self, since: datetime, at: datetime) -> float:
+        return (at - since).total_seconds() / (settings.MENTION_AFFINITY_HALF_LIFE_DAYS * 86400)
+
+    def mention_weight(self, at: datetime, epoch: datetime = AFFINITY_EPOCH) -> float:
+        return 2.0 ** self.half_lives(epoch, at)
+
+    def decay(self, now: datetime, epoch: datetime) -> float:
         """
-        Records or updates the last_mentioned_at timestamp for a list of target users
-        mentioned by a creator.
+        Factor turning a stored affinity into the decayed count at now. The
+        inverse of mention_weight(now), but underflows instead of overflowing.
         """
-        if not target_user_ids:
-            return
+        return 2.0 ** -self.half_lives(epoch, now)
 
-        now = datetime.utcnow()
+    def affinity_epoch(self, session: Session, now: datetime) -> datetime:
+        """
+        The epoch stored affinities are relative to. Only rebase_affinity()
+        moves it, and only once it is AFFINITY_REBASE_HALF_LIVES behind, so the
+        cached value is safe to use until a half-life before that.
+        """
+        if self._epoch is None or self.half_lives(self._epoch, now) >= AFFINITY_REBASE_HALF_LIVES - 1:
+            stored = session.exec(select(AffinityEpoch.epoch).where(AffinityEpoch.id == 1)).first()
+            self._epoch = stored or AFFINITY_EPOCH
+        return self._epoch
 
-        for target_id in target_user_ids:
-            # Check if record exists
-            statement = select(UserMention).where(
-                UserMention.creator_id == creator_id,
-                UserMention.target_user_id == target_id
-            )
-            mention_record = session.exec(statement).first()
-
-            if mention_record:
-                mention_record.last_mentioned_at = now
-                session.add(mention_record)
-            else:
-                # Create new record
-                new_mention = UserMention(
-                    creator_id=creator_id,
-                    target_user_id=target_id,
-                    last_mentioned_at=now
-                )
-                session.add(new_mention)
+    def rebase_affinity(self, session: Session, now: datetime) -> bool:
+        """
+        Moves the epoch forward by the whole half-lives it is behind and scales
+        every stored affinity by 2^-k to match, in one transaction. Returns
+        False if the epoch is not due or another process moved it first.
+        """
+        epoch = self.affinity_epoch(session, now)
+        k = math.floor(self.half_lives(epoch, now))
+        if k < AFFINITY_REBASE_HALF_LIVES:
+            return False
 
+        session.execute(insert(AffinityEpoch).values(id=1, epoch=epoch).on_conflict_do_nothing())
+        moved = session.execute(
+            update(AffinityEpoch)
+            .where(AffinityEpoch.id == 1, AffinityEpoch.epoch == epoch)
+            .values(epoch=epoch + timedelta(days=k * settings.MENTION_AFFINITY_HALF_LIFE_DAYS))
+        ).rowcount
+        if moved:
+            session.execute(update(UserMention).values(affinity=UserMention.affinity * 2.0 ** -k))
         session.commit()
+        self._epoch = None
+        return bool(moved)
 
-    def get_ranked_mentions(self, session: Session, creator_id: int) -> List[User]:
+    def record_mentions(self, session: Session, creator_id: int, target_user_ids: List[int]) -> None:
         """
-        Returns a list of Users ranked by how recently they were mentioned by the creator.
-        Users never mentioned are not included? Or included at the end?
-        Requirement: "rank all users by most recent @ by the creator in all the events."
-
-        This usually implies we want *all* mentionable users, but sorted.
-        However, fetching ALL users might be heavy if thousands.
-        For now, let's return:
-        1. Users mentioned by creator (sorted desc by date).
-        2. Other users (sorted alphabetically or by recent activity).
+        Records a mention of each target by a creator: updates last_mentioned_at
+        and adds the mention's weight to the pair's affinity.
+        """
+        if not target_user_ids:
+            return
 
-        Actually, simpler: just return the sorted list of users who HAVE been mentioned.
-        The frontend can search/filter from the full list if needed, or we mix them.
+        now = datetime.utcnow()
+        epoch = self.affinity_epoch(session, now)
+        if self.half_lives(epoch, now) >= AFFINITY_REBASE_HALF_LIVES:
+            self.rebase_affinity(session, now)
+            epoch = self.affinity_epoch(session, now)
+        weight = self.mention_weight(now, epoch)
+        # One statement for all targets; duplicates would hit the same row twice.
+        rows = [
+            {"creator_id": creator_id, "target_user_id": target_id, "last_mentioned_at": now, "affinity": weight}
+            for target_id in dict.fromkeys(target_user_ids)
+        ]
+        statement = insert(UserMention).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=["creator_id", "target_user_id"],
+            set_={
+                "last_mentioned_at": statement.excluded.last_mentioned_at,
+                "affinity": UserMention.affinity + statement.excluded.affinity
+            }
+        )
+        session.execute(statement)
+        session.commit()
 
-        Let's implement: Return ALL users, but order them by Mention History first.
+    def get_ranked_mentions(self, session: Session, creator_id: int, query: Optional[str] = None, limit: int = 20) -> List[MentionCandidateRead]:
         """
+        Returns the top mention candidates for a creator: users they mention
+        most (by decayed affinity) first, then everyone else by name. An
+        optional query matches the start of the username, display name or any
+        word of the display name (case-insensitive) and is served from the
+        in-memory typeahead index.
+        """
+        prefix = (query or "").strip().lstrip("@")
+        if not prefix:
+            return self._top_from_database(session, creator_id, limit)
 
-        # Subquery or Join strategy
-        # specific for SQLite and SQLModel might be tricky with Outer Joins + Ordering.
-        # Let's try to fetch all users and manual sort if N is small (<1000).
-        # Assuming Guild size is reasonable.
-
-        # 1. Sync Discord Members
         try:
-            guild_members = discord_service.get_guild_members(settings.DISCORD_GUILD_ID)
-            for m in guild_members:
-                # Check if user exists by Discord ID
-                discord_id = str(m["id"])
-                existing_user = session.exec(select(User).where(User.discord_id == discord_id)).first()
-                
-                # Construct Avatar URL
-                avatar_url = None
-                if m["avatar"]:
-                    avatar_url = f"https://cdn.discordapp.com/avatars/{m['id']}/{m['avatar']}.png"
-
-                if existing_user:
-                    # Update info if needed (optional, but good for freshness)
-                    existing_user.username = m["username"]
-                    existing_user.display_name = m["display_name"]
-                    existing_user.avatar_url = avatar_url
-                    session.add(existing_user)
-                else:
-                    # Create new user
-                    new_user = User(
-                        discord_id=discord_id,
-                        username=m["username"],
-                        display_name=m["display_name"],
-                        avatar_url=avatar_url
-                    )
-                    session.add(new_user)
-            session.commit()
+            typeahead_index.ensure_loaded(session)
         except Exception as e:
-            print(f"Error syncing Discord members: {e}")
-            # Continue even if sync fails, to show local users at least.
+            print(f"Typeahead index unavailable, searching the database: {e}")
+            return self._search_database(session, creator_id, prefix, limit)
 
-        # 2. Fetch mention history for this creator
-        mentions_stmt = select(UserMention).where(UserMention.creator_id == creator_id).order_by(desc(UserMention.last_mentioned_at))
-        mentions = session.exec(mentions_stmt).all()
+        matches = typeahead_index.search(prefix)
+        mentions = {
+            target_id: (affinity, last_at)
+            for target_id, affinity, last_at in session.exec(
+                select(UserMention.target_user_id, UserMention.affinity, UserMention.last_mentioned_at).where(UserMention.creator_id == creator_id)
+            ).all()
+        }
 
-        mention_map = {m.target_user_id: m.last_mentioned_at for m in mentions}
+        def rank(user: UserRead):
+            affinity = mentions.get(user.id, (0.0, None))[0]
+            return (-affinity, (user.display_name or user.username).lower(), user.id)
 
-        # 2. Fetch all users
-        all_users = session.exec(select(User)).all()
+        now = datetime.utcnow()
+        decay = self.decay(now, self.affinity_epoch(session, now))
+        candidates = []
+        for user in heapq.nsmallest(limit, matches, key=rank):
+            affinity, last_at = mentions.get(user.id, (0.0, None))
+            candidates.append(MentionCandidateRead(**user.model_dump(), last_mentioned_at=last_at, affinity=affinity * decay))
+        return candidates
 
-        # 3. Sort
-        # Key: (Has been mentioned? [1/0], Last Mention Date, Username)
-        # We want most recent first.
-        def sort_key(u: User):
-            last_at = mention_map.get(u.id)
-            # If never mentioned, use min date
-            if last_at:
-                return (1, last_at.timestamp())
-            return (0, 0)
+    def _top_from_database(self, session: Session, creator_id: int, limit: int) -> List[MentionCandidateRead]:
+        """
+        Top K without a query: the creator's highest-affinity pairs straight
+        from the (creator_id, affinity) index, topped up with unmentioned users
+        by name.
+        """
+        columns = (User.id, User.username, User.display_name, User.avatar_url)
+        mentioned = session.exec(
+            select(*columns, UserMention.last_mentioned_at, UserMention.affinity)
+            .join(UserMention, UserMention.target_user_id == User.id)
+            .where(UserMention.creator_id == creator_id)
+            .order_by(UserMention.affinity.desc())
+            .limit(limit)
+        ).all()
 
-        sorted_users = sorted(all_users, key=sort_key, reverse=True)
+        rows = list(mentioned)
+        if len(rows) < limit:
+            already_mentioned = select(UserMention.target_user_id).where(UserMention.creator_id == creator_id)
+            rows.extend(session.exec(
+                select(*columns, null(), literal(0.0))
+                .where(User.id.not_in(already_mentioned))
+                .order_by(func.coalesce(User.display_name, User.username).collate("NOCASE"), User.id)
+                .limit(limit - len(rows))
+            ).all())
+        return self._candidates(session, rows)
 
-        # Filter out the creator themselves?
-        # sorted_users = [u for u in sorted_users if u.id != creator_id]
+    def get_candidates(self, session: Session, creator_id: int, user_ids: List[int]) -> List[MentionCandidateRead]:
+        """
+        The given users as mention candidates, e.g. to render mentions that
+        were selected earlier but are not among the top results.
+        """
+        if not user_ids:
+            return []
+        statement = (
+            select(User.id, User.username, User.display_name, User.avatar_url, UserMention.last_mentioned_at, UserMention.affinity)
+            .outerjoin(UserMention, and_(UserMention.target_user_id == User.id, UserMention.creator_id == creator_id))
+            .where(User.id.in_(user_ids))
+            .order_by(User.id)
+        )
+        return self._candidates(session, session.exec(statement).all())
+
+    def _search_database(self, session: Session, creator_id: int, prefix: str, limit: int) -> List[MentionCandidateRead]:
+        """
+        Same ranking as the index path, as one SQL query. The prefix filter is
+        a NOCASE range so SQLite can seek the NOCASE indexes on username and
+        display_name.
+        """
+        prefix, upper = nocase_prefix_range(prefix)
+        statement = (
+            select(User.id, User.username, User.display_name, User.avatar_url, UserMention.last_mentioned_at, UserMention.affinity)
+            .outerjoin(UserMention, and_(UserMention.target_user_id == User.id, UserMention.creator_id == creator_id))
+            .where(or_(
+                and_(User.username.collate("NOCASE") >= prefix, User.username.collate("NOCASE") < upper),
+                and_(User.display_name.collate("NOCASE") >= prefix, User.display_name.collate("NOCASE") < upper)
+            ))
+            .order_by(
+                UserMention.affinity.desc().nulls_last(),
+                func.coalesce(User.display_name, User.username).collate("NOCASE"),
+                User.id
+            )
+            .limit(limit)
+        )
+        return self._candidates(session, session.exec(statement).all())
+
+    def _candidates(self, session: Session, rows) -> List[MentionCandidateRead]:
+        now = datetime.utcnow()
+        decay = self.decay(now, self.affinity_epoch(session, now))
+        return [
+            MentionCandidateRead(
+                id=id, username=username, display_name=display_name, avatar_url=avatar_url,
+                last_mentioned_at=last_mentioned_at, affinity=(affinity or 0.0) * decay
+            )
+            for id, username, display_name, avatar_url, last_mentioned_at, affinity in rows
+        ]
 
-        return sorted_users
+def nocase_prefix_range(prefix: str) -> Tuple[str, str]:
+    """
+    [lower, upper) bounds matching every string that starts with prefix under
+    SQLite's NOCASE collation, which folds only ASCII A-Z to lowercase. Both
+    bounds are built from the folded prefix; upper is the smallest folded
+    string that no longer starts with it, so a successor that would be an
+    uppercase letter (and compare as lowercase) skips past Z.
+    """
+    lower = "".join(c.lower() if "A" <= c <= "Z" else c for c in prefix)
+    successor = chr(ord(lower[-1]) + 1)
+    if "A" <= successor <= "Z":
+        successor = "["
+    return lower, lower[:-1] + successor
 
 mention_service = MentionService()
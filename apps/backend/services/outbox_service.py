@@ -0,0 +1,157 @@
+import asyncio
+import hashlib
+import random
+from typing import Dict, List, Optional
+from datetime import datetime, timedelta
+import httpx
+from pydantic import BaseModel
+from sqlmodel import Session, select
+from sqlalchemy import func, update
+from sqlalchemy.dialects.sqlite import insert
+from models import OutboxMessage
+from services.discord_service import discord_service
+from config import settings
+
+class DeliveryResult(BaseModel):
+    message_id: int
+    ok: bool
+    discord_message_id: Optional[str] = None
+    error: Optional[str] = None
+    permanent: bool = False # Failures that retrying cannot fix (e.g. missing channel access)
+
+class OutboxService:
+    """
+    Transactional outbox for Discord messages.
+
+    Producers call enqueue() inside their own transaction, so the message is
+    stored if and only if the state change commits. The delivery worker drains
+    pending rows in batches, retries failures with exponential backoff and
+    dead-letters messages that keep failing.
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def enqueue(self, session: Session, idempotency_key: str, channel_id: str, payload: Dict) -> Optional[int]:
+        """
+        Adds a message to the outbox without committing. Enqueuing the same
+        idempotency key twice is a no-op. Returns the outbox row id.
+        """
+        session.execute(
+            insert(OutboxMessage)
+            .values(
+                idempotency_key=idempotency_key,
+                channel_id=channel_id,
+                payload=payload,
+                status="pending",
+                attempts=0,
+                next_attempt_at=datetime.utcnow(),
+                created_at=datetime.utcnow()
+            )
+            .on_conflict_do_nothing(index_elements=["idempotency_key"])
+        )
+        return session.exec(select(OutboxMessage.id).where(OutboxMessage.idempotency_key == idempotency_key)).first()
+
+    def attach(self, loop: asyncio.AbstractEventLoop) -> None:
+        """
+        Binds the outbox to the event loop running the delivery worker.
+        """
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+
+    def wake(self) -> None:
+        """
+        Tells the delivery worker new messages were committed.
+        Safe to call from request worker threads.
+        """
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def clear_wakeup(self) -> None:
+        """
+        Called by the worker before it looks for due messages, so a wake() that
+        races with the lookup is not lost.
+        """
+        self._wakeup.clear()
+
+    async def wait(self, next_attempt_at: Optional[datetime], max_seconds: float) -> None:
+        """
+        Sleeps until the next retry is due, new messages are enqueued, or
+        max_seconds pass.
+        """
+        delay = max_seconds
+        if next_attempt_at is not None:
+            delay = min(delay, max((next_attempt_at - datetime.utcnow()).total_seconds(), 0))
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+
+    def fetch_due(self, session: Session, now: datetime, limit: int) -> List[OutboxMessage]:
+        statement = (
+            select(OutboxMessage)
+            .where(OutboxMessage.status == "pending", OutboxMessage.next_attempt_at <= now)
+            .order_by(OutboxMessage.id)
+            .limit(limit)
+        )
+        return list(session.exec(statement).all())
+
+    def next_attempt_at(self, session: Session) -> Optional[datetime]:
+        statement = select(func.min(OutboxMessage.next_attempt_at)).where(OutboxMessage.status == "pending")
+        return session.exec(statement).first()
+
+    async def deliver_batch(self, messages: List[OutboxMessage], concurrency: int) -> List[DeliveryResult]:
+        """
+        Sends a batch of messages with at most `concurrency` in flight.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def deliver(message: OutboxMessage) -> DeliveryResult:
+            async with semaphore:
+                return await self._deliver(message)
+
+        return await asyncio.gather(*(deliver(m) for m in messages))
+
+    async def _deliver(self, message: OutboxMessage) -> DeliveryResult:
+        try:
+            response = await discord_service.post_message(message.channel_id, message.payload, nonce=self.nonce(message.idempotency_key))
+            return DeliveryResult(message_id=message.id, ok=True, discord_message_id=str(response.get("id")))
+        except httpx.HTTPStatusError as e:
+            status_code = e.response.status_code
+            permanent = 400 <= status_code < 500 and status_code != 429
+            return DeliveryResult(message_id=message.id, ok=False, error=f"HTTP {status_code}: {e.response.text[:500]}", permanent=permanent)
+        except Exception as e:
+            return DeliveryResult(message_id=message.id, ok=False, error=str(e)[:500])
+
+    def record_results(self, session: Session, messages: List[OutboxMessage], results: List[DeliveryResult]) -> None:
+        """
+        Stores the outcome of a delivered batch in a single commit.
+        """
+        now = datetime.utcnow()
+        attempts = {m.id: m.attempts for m in messages}
+        for result in results:
+            attempt = attempts[result.message_id] + 1
+            values = {"attempts": attempt}
+            if result.ok:
+                values.update(status="sent", sent_at=now, discord_message_id=result.discord_message_id, last_error=None)
+            elif result.permanent or attempt >= settings.OUTBOX_MAX_ATTEMPTS:
+                print(f"Dead-lettering outbox message {result.message_id} after {attempt} attempts: {result.error}")
+                values.update(status="dead", last_error=result.error)
+            else:
+                values.update(next_attempt_at=now + self.backoff(attempt), last_error=result.error)
+            session.execute(update(OutboxMessage).where(OutboxMessage.id == result.message_id).values(**values))
+        session.commit()
+
+    def backoff(self, attempt: int) -> timedelta:
+        """
+        Exponential backoff with jitter for the given (1-based) attempt.
+        """
+        delay = min(settings.OUTBOX_BACKOFF_BASE_SECONDS * 2 ** (attempt - 1), settings.OUTBOX_BACKOFF_MAX_SECONDS)
+        return timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+    def nonce(self, idempotency_key: str) -> str:
+        # Discord nonces are limited to 25 characters.
+        return hashlib.sha256(idempotency_key.encode()).hexdigest()[:25]
+
+outbox_service = OutboxService()
@@ -1,10 +1,12 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 from sqlmodel import Session, select
 from sqlalchemy.orm import selectinload
+from sqlalchemy import update, func
 from fastapi import HTTPException, status
-from models import Poll, PollOption, User, Vote
-from schemas import PollCreate, PollOptionCreate, PollUpdate
+from models import Poll, PollOption, User, Vote, ArchivedPoll, ArchivedPollOption, ArchivedVote
+from schemas import PollCreate, PollOptionCreate, PollUpdate, PollResults, PollOptionTally
 from services.notification import NotificationService, NoOpNotificationService
+from services.deadline_scheduler import deadline_scheduler
 import logging
 from dateutil import rrule
 from dateutil.parser import parse
@@ -123,6 +125,7 @@ class PollService:
         self.session.add(db_poll)
         self.session.commit()
         self.session.refresh(db_poll)
+        deadline_scheduler.schedule_poll(db_poll)
 
         # Send notification
         try:
@@ -137,24 +140,87 @@ class PollService:
 
         return db_poll
 
-    def get_poll(self, poll_id: int) -> Poll:
+    def get_poll(self, poll_id: int, include_archived: bool = False) -> Poll:
         # Eager load options to avoid N+1 and ensure they are present
-        statement = select(Poll).where(Poll.id == poll_id).options(
+        statement = select(Poll).where(Poll.id == poll_id, Poll.deleted_at == None).options(
             selectinload(Poll.options).selectinload(PollOption.votes).selectinload(Vote.user),
             selectinload(Poll.creator)
         )
         poll = self.session.exec(statement).first()
+        if not poll and include_archived:
+            poll = self.session.exec(self._archived_polls_statement().where(ArchivedPoll.id == poll_id)).first()
         if not poll:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Poll not found")
         return poll
 
-    def list_polls(self) -> List[Poll]:
+    def list_polls(self, include_archived: bool = False) -> List[Poll]:
         # Eager load options
-        statement = select(Poll).options(
+        statement = select(Poll).where(Poll.deleted_at == None).options(
             selectinload(Poll.options).selectinload(PollOption.votes).selectinload(Vote.user),
             selectinload(Poll.creator)
         )
-        return self.session.exec(statement).all()
+        polls = list(self.session.exec(statement).all())
+        if include_archived:
+            polls.extend(self.session.exec(self._archived_polls_statement()).all())
+        return polls
+
+    def results(self, poll_id: int) -> PollResults:
+        """
+        Returns the vote tally, the top options and the distinct voters of a poll,
+        computed with aggregate queries instead of loading the object graph.
+        """
+        exists = self.session.exec(select(Poll.id).where(Poll.id == poll_id, Poll.deleted_at == None)).first()
+        if exists is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Poll not found")
+        return self.results_for_polls([poll_id])[poll_id]
+
+    def results_for_polls(self, poll_ids: List[int]) -> Dict[int, PollResults]:
+        """
+        Batched form of results(): two queries regardless of how many polls.
+        """
+        results = {
+            poll_id: PollResults(poll_id=poll_id, total_votes=0, voter_count=0, tally=[], top_options=[])
+            for poll_id in poll_ids
+        }
+        if not poll_ids:
+            return results
+
+        vote_count = func.count(Vote.id)
+        tally_stmt = (
+            select(PollOption.poll_id, PollOption.id, PollOption.label, PollOption.start_time, PollOption.end_time, vote_count)
+            .outerjoin(Vote, Vote.poll_option_id == PollOption.id)
+            .where(PollOption.poll_id.in_(poll_ids))
+            .group_by(PollOption.id)
+            .order_by(PollOption.poll_id, vote_count.desc(), PollOption.start_time)
+        )
+        for poll_id, option_id, label, start_time, end_time, votes in self.session.exec(tally_stmt).all():
+            result = results[poll_id]
+            entry = PollOptionTally(option_id=option_id, label=label, start_time=start_time, end_time=end_time, votes=votes)
+            result.tally.append(entry)
+            result.total_votes += votes
+            if votes > 0 and (not result.top_options or result.top_options[0].votes == votes):
+                result.top_options.append(entry)
+
+        voters_stmt = (
+            select(PollOption.poll_id, User.discord_id)
+            .distinct()
+            .join(Vote, Vote.poll_option_id == PollOption.id)
+            .join(User, User.id == Vote.user_id)
+            .where(PollOption.poll_id.in_(poll_ids))
+        )
+        for poll_id, discord_id in self.session.exec(voters_stmt).all():
+            results[poll_id].voter_discord_ids.append(discord_id)
+            results[poll_id].voter_count += 1
+
+        return results
+
+    def _archived_polls_statement(self):
+        # Archived polls are read-only and mirror the hot tables' shape, so they
+        # serialize through the same response schemas.
+        return select(ArchivedPoll).options(
+            selectinload(ArchivedPoll.options).selectinload(ArchivedPollOption.votes).selectinload(ArchivedVote.user),
+            selectinload(ArchivedPoll.creator)
+        )
 
     def add_poll_option(self, poll_id: int, option_create: PollOptionCreate, user: User) -> PollOption:
         poll = self.get_poll(poll_id)
@@ -167,17 +233,28 @@ class PollService:
             start_time=option_create.start_time,
             end_time=option_create.end_time
         )
+        poll.updated_at = datetime.utcnow()
+        poll.version = Poll.version + 1
         self.session.add(db_option)
+        self.session.add(poll)
         self.session.commit()
         self.session.refresh(db_option)
+        self.session.refresh(poll)
+        deadline_scheduler.schedule_poll(poll)
         return db_option
 
     def delete_poll(self, poll_id: int, user: User):
-        poll = self.get_poll(poll_id)
-        if poll.creator_id != user.id:
+        # Only the owner is needed for the permission check; the options and votes
+        # are left for the background purger so this request stays a single UPDATE.
+        statement = select(Poll.creator_id).where(Poll.id == poll_id, Poll.deleted_at == None)
+        creator_id = self.session.exec(statement).first()
+        if creator_id is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Poll not found")
+        if creator_id != user.id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to delete this poll")
 
-        self.session.delete(poll)
+        now = datetime.utcnow()
+        self.session.execute(update(Poll).where(Poll.id == poll_id).values(deleted_at=now, updated_at=now, version=Poll.version + 1))
         self.session.commit()
 
     def update_poll(self, poll_id: int, poll_update: PollUpdate, user: User) -> Poll:
@@ -187,6 +264,8 @@ class PollService:
 
         poll.title = poll_update.title
         poll.description = poll_update.description
+        poll.updated_at = datetime.utcnow()
+        poll.version = Poll.version + 1
 
         # Update deadline fields
         if poll_update.deadline_date: poll.deadline_date = poll_update.deadline_date
@@ -315,6 +394,7 @@ class PollService:
         self.session.add(poll)
         self.session.commit()
         self.session.refresh(poll)
+        deadline_scheduler.schedule_poll(poll)
         return poll
 
     def delete_poll_option(self, poll_id: int, option_id: int, user: User):
@@ -329,5 +409,8 @@ class PollService:
         if option.poll_id != poll_id:
              raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Option does not belong to this poll")
 
+        poll.updated_at = datetime.utcnow()
+        poll.version = Poll.version + 1
+        self.session.add(poll)
         self.session.delete(option)
         self.session.commit()
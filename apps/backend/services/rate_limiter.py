@@ -0,0 +1,206 @@
+import bisect
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+import httpx
+from pydantic import BaseModel
+
+# Path segments whose id is a "major parameter": Discord keeps separate limits
+# per channel/guild/webhook even when routes share a bucket.
+MAJOR_PARAMETERS = ("channels", "guilds", "webhooks")
+
+def route_key(method: str, url: str) -> Tuple[str, str]:
+    """
+    Returns (route, major parameter) for a Discord API URL, e.g.
+    ("POST /api/v10/channels/{id}/messages", "123") for a message to channel 123.
+    """
+    route: List[str] = []
+    major = ""
+    previous = None
+    for part in urlsplit(url).path.split("/"):
+        if part.isdigit():
+            if previous in MAJOR_PARAMETERS and not major:
+                major = part
+            part = "{id}"
+        route.append(part)
+        previous = part
+    return f"{method.upper()} {'/'.join(route)}", major
+
+class BucketState:
+    def __init__(self, key: str):
+        self.key = key
+        self.limit: Optional[int] = None
+        self.remaining: Optional[int] = None
+        self.reset_at = 0.0 # monotonic clock
+        self.reset_after = 1.0
+        self.queued_until = 0.0 # latest slot handed out to a waiting request
+
+class RateLimitBucketRead(BaseModel):
+    bucket: str
+    routes: List[str]
+    limit: Optional[int]
+    remaining: Optional[int]
+    resets_in: float
+    queued_for: float
+
+class RateLimitMetrics(BaseModel):
+    global_limit: int
+    global_requests_last_second: int
+    global_blocked_for: float
+    requests: int
+    delayed_requests: int
+    rate_limited_responses: int
+    buckets: List[RateLimitBucketRead]
+
+class RateLimiter:
+    """
+    Client-side pacing for the Discord API.
+
+    Buckets are learned from the X-RateLimit-* response headers and tracked per
+    bucket and major parameter. acquire() reserves a slot before each request
+    and returns how long the caller has to wait for it, so bursts are spread
+    over the reset windows instead of running into 429s. A 429 (per route or
+    global) blocks the affected bucket for retry_after.
+    """
+
+    def __init__(self, global_limit: int = 50, clock: Callable[[], float] = time.monotonic):
+        self.global_limit = global_limit
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._route_buckets: Dict[str, str] = {} # route -> bucket hash from X-RateLimit-Bucket
+        self._buckets: Dict[str, BucketState] = {}
+        self._global_slots: List[float] = [] # sorted send times within the last second
+        self._global_blocked_until = 0.0
+        self._requests = 0
+        self._delayed = 0
+        self._rate_limited = 0
+
+    def _bucket(self, method: str, url: str) -> BucketState:
+        route, major = route_key(method, url)
+        key = f"{self._route_buckets.get(route, route)}:{major}"
+        if key not in self._buckets:
+            self._buckets[key] = BucketState(key)
+        return self._buckets[key]
+
+    def acquire(self, method: str, url: str) -> float:
+        """
+        Reserves a slot for a request and returns the seconds to wait before sending it.
+        """
+        with self._lock:
+            now = self._clock()
+            bucket = self._bucket(method, url)
+            send_at = max(now, self._global_blocked_until)
+
+            if bucket.limit is not None:
+                # Requests already waiting for this bucket go first.
+                send_at = max(send_at, bucket.queued_until)
+                if bucket.reset_at <= send_at:
+                    # The window we knew about has passed; assume a fresh one.
+                    bucket.remaining = bucket.limit
+                    bucket.reset_at = send_at + bucket.reset_after
+                if bucket.remaining > 0:
+                    bucket.remaining -= 1
+                else:
+                    # Wait for the next window.
+                    send_at = bucket.reset_at
+                    bucket.queued_until = send_at
+                    bucket.reset_at = send_at + bucket.reset_after
+                    bucket.remaining = bucket.limit - 1
+
+            send_at = self._global_slot(now, send_at)
+            self._requests += 1
+            delay = send_at - now
+            if delay > 0:
+                self._delayed += 1
+            return delay
+
+    def _global_slot(self, now: float, send_at: float) -> float:
+        slots = self._global_slots
+        del slots[:bisect.bisect_left(slots, now - 1)]
+        while True:
+            in_window = bisect.bisect_right(slots, send_at) - bisect.bisect_right(slots, send_at - 1)
+            if in_window < self.global_limit:
+                break
+            send_at = slots[bisect.bisect_right(slots, send_at - 1)] + 1
+        bisect.insort(slots, send_at)
+        return send_at
+
+    def update(self, method: str, url: str, response: httpx.Response) -> Optional[float]:
+        """
+        Records the rate limit headers of a response. Returns retry_after in
+        seconds if the request was rate limited and should be retried.
+        """
+        headers = response.headers
+        with self._lock:
+            now = self._clock()
+            route, _ = route_key(method, url)
+            bucket_hash = headers.get("X-RateLimit-Bucket")
+            if bucket_hash and self._route_buckets.get(route) != bucket_hash:
+                previous = self._bucket(method, url)
+                self._route_buckets[route] = bucket_hash
+                bucket = self._bucket(method, url)
+                bucket.queued_until = max(bucket.queued_until, previous.queued_until)
+            else:
+                bucket = self._bucket(method, url)
+
+            if "X-RateLimit-Limit" in headers:
+                bucket.limit = int(headers["X-RateLimit-Limit"])
+                bucket.reset_after = float(headers.get("X-RateLimit-Reset-After", bucket.reset_after))
+                reset_at = now + bucket.reset_after
+                remaining = int(headers.get("X-RateLimit-Remaining", bucket.limit))
+                if bucket.remaining is None or reset_at > bucket.reset_at + 0.5:
+                    # A new window started on Discord's side; its count wins.
+                    bucket.remaining = remaining
+                    bucket.reset_at = max(reset_at, bucket.queued_until)
+                else:
+                    # Same window: keep the slots already handed to requests in flight.
+                    bucket.remaining = min(bucket.remaining, remaining)
+
+            if response.status_code != 429:
+                return None
+
+            self._rate_limited += 1
+            retry_after = self._retry_after(response)
+            if headers.get("X-RateLimit-Global") == "true" or headers.get("X-RateLimit-Scope") == "global":
+                self._global_blocked_until = max(self._global_blocked_until, now + retry_after)
+            else:
+                bucket.remaining = 0
+                bucket.reset_at = max(bucket.reset_at, now + retry_after)
+                if bucket.limit is None:
+                    bucket.limit = 1
+            return retry_after
+
+    def _retry_after(self, response: httpx.Response) -> float:
+        try:
+            return float(response.json()["retry_after"])
+        except Exception:
+            return float(response.headers.get("Retry-After", 1))
+
+    def metrics(self) -> RateLimitMetrics:
+        with self._lock:
+            now = self._clock()
+            routes: Dict[str, List[str]] = {}
+            for route, bucket_hash in self._route_buckets.items():
+                routes.setdefault(bucket_hash, []).append(route)
+            buckets = []
+            for key, bucket in sorted(self._buckets.items()):
+                name = key.rsplit(":", 1)[0]
+                buckets.append(RateLimitBucketRead(
+                    bucket=key,
+                    routes=sorted(routes.get(name, [name])),
+                    limit=bucket.limit,
+                    remaining=bucket.remaining if bucket.reset_at > now else bucket.limit,
+                    resets_in=round(max(bucket.reset_at - now, 0), 3),
+                    queued_for=round(max(bucket.queued_until - now, 0), 3)
+                ))
+            slots = self._global_slots
+            return RateLimitMetrics(
+                global_limit=self.global_limit,
+                global_requests_last_second=bisect.bisect_right(slots, now) - bisect.bisect_left(slots, now - 1),
+                global_blocked_for=round(max(self._global_blocked_until - now, 0), 3),
+                requests=self._requests,
+                delayed_requests=self._delayed,
+                rate_limited_responses=self._rate_limited,
+                buckets=buckets
+            )
@@ -0,0 +1,107 @@
+from typing import List, Optional, Tuple
+from datetime import datetime
+from fastapi import HTTPException, status
+from sqlmodel import Session, select
+from sqlalchemy import union
+from models import Poll, PollOption, User, Vote
+from schemas import OptionRecommendationRead, PollRecommendationRead, PollOptionTally
+from services.cache import TTLCache
+from services.heatmap_service import HeatmapService, availability_version
+from services.mention_service import decode_mention_ids
+from services.poll_service import PollService
+from config import settings
+
+# poll id -> PollRecommendationRead
+recommendation_cache = TTLCache(ttl=settings.POLL_UNAVAILABILITY_CACHE_SECONDS)
+
+class RecommendationService:
+    """
+    Ranks the options of a poll by votes, the unavailability of the people
+    involved (voters and mentioned users) and how soon after the deadline they
+    start. Everything comes from aggregate queries: the vote tally, and one
+    join of options against unavailability.
+
+    Results are cached per poll and reused while the poll version and the
+    participants' availability version are unchanged. Proximity is measured
+    from the deadline rather than the current time, so a cached ranking does
+    not go stale on its own.
+    """
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    def recommend(self, poll_id: int) -> PollRecommendationRead:
+        poll_version, deadline_date, mention_ids = self._poll(poll_id)
+        participants = self._participants(poll_id, mention_ids)
+        current_availability = self.session.exec(select(availability_version(participants))).one()
+
+        cached = recommendation_cache.peek(poll_id)
+        if cached is not None and (cached.poll_version, cached.availability_version) != (poll_version, current_availability):
+            recommendation_cache.invalidate(poll_id)
+
+        def load() -> PollRecommendationRead:
+            return PollRecommendationRead(
+                poll_id=poll_id,
+                poll_version=poll_version,
+                availability_version=current_availability,
+                deadline_date=deadline_date,
+                options=self._rank(poll_id, deadline_date, participants)
+            )
+
+        result = recommendation_cache.get(poll_id, load)
+        if (result.poll_version, result.availability_version) != (poll_version, current_availability):
+            # A concurrent request loaded another version; don't serve it to this one.
+            result = load()
+        return result
+
+    def _poll(self, poll_id: int) -> Tuple[int, Optional[datetime], List[int]]:
+        row = self.session.exec(
+            select(Poll.version, Poll.deadline_date, Poll.is_recurring, Poll.deadline_mention_ids)
+            .where(Poll.id == poll_id, Poll.deleted_at == None)
+        ).first()
+        if row is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Poll not found")
+        version, deadline_date, is_recurring, mention_ids = row
+        # Recurring polls have a deadline per instance, so there is no single one to be close to.
+        return version, None if is_recurring else deadline_date, decode_mention_ids(mention_ids)
+
+    def _participants(self, poll_id: int, mention_ids: List[int]):
+        voters = select(Vote.user_id).join(PollOption, PollOption.id == Vote.poll_option_id).where(PollOption.poll_id == poll_id)
+        if not mention_ids:
+            return voters
+        return union(voters, select(User.id).where(User.id.in_(mention_ids)))
+
+    def _rank(self, poll_id: int, deadline_date: Optional[datetime], participants) -> List[OptionRecommendationRead]:
+        tally = PollService(self.session).results_for_polls([poll_id])[poll_id].tally
+        unavailable = {
+            option.option_id: option.unavailable_count
+            for option in HeatmapService(self.session).unavailable_by_option(poll_id, participants)
+        }
+        options = [score_option(option, unavailable.get(option.option_id, 0), deadline_date) for option in tally]
+        options.sort(key=lambda option: (option.starts_before_deadline, -option.score, option.start_time, option.option_id))
+        return options
+
+def score_option(option: PollOptionTally, unavailable_count: int, deadline_date: Optional[datetime]) -> OptionRecommendationRead:
+    proximity = 0.0
+    starts_before_deadline = False
+    if deadline_date is not None:
+        starts_before_deadline = option.start_time < deadline_date
+        if not starts_before_deadline:
+            days = (option.start_time - deadline_date).total_seconds() / 86400
+            proximity = 0.5 ** (days / settings.RECOMMENDATION_PROXIMITY_HALF_LIFE_DAYS)
+    score = (
+        option.votes
+        - settings.RECOMMENDATION_UNAVAILABLE_WEIGHT * unavailable_count
+        + settings.RECOMMENDATION_PROXIMITY_WEIGHT * proximity
+    )
+    return OptionRecommendationRead(
+        option_id=option.option_id,
+        label=option.label,
+        start_time=option.start_time,
+        end_time=option.end_time,
+        votes=option.votes,
+        unavailable_count=unavailable_count,
+        proximity=round(proximity, 4),
+        starts_before_deadline=starts_before_deadline,
+        score=round(score, 4)
+    )
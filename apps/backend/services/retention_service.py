@@ -0,0 +1,116 @@
+from typing import List
+from datetime import datetime, timedelta
+from sqlmodel import Session, select
+from sqlalchemy import delete, insert, func, literal
+from models import Poll, PollOption, Vote, ArchivedPoll, ArchivedPollOption, ArchivedVote
+import logging
+
+logger = logging.getLogger(__name__)
+
+def _copy_columns(source, target, extra=None):
+    """
+    Returns the (target column names, source select columns) pair used by an
+    INSERT ... SELECT that copies every column the two tables share.
+    """
+    names = [c.name for c in source.__table__.columns if c.name in target.__table__.columns]
+    columns = [source.__table__.c[name] for name in names]
+    for name, value in (extra or {}).items():
+        names.append(name)
+        columns.append(literal(value).label(name))
+    return names, columns
+
+class RetentionService:
+    def __init__(self, session: Session):
+        self.session = session
+
+    def find_archivable_poll_ids(self, cutoff: datetime, limit: int) -> List[int]:
+        """
+        Returns ids of polls whose last option ended before the cutoff.
+        """
+        statement = (
+            select(PollOption.poll_id)
+            .join(Poll)
+            .where(Poll.deleted_at == None)
+            .group_by(PollOption.poll_id)
+            .having(func.max(PollOption.end_time) < cutoff)
+            .order_by(PollOption.poll_id)
+            .limit(limit)
+        )
+        return list(self.session.exec(statement).all())
+
+    def archive_polls(self, older_than_days: int, batch_size: int = 100) -> int:
+        """
+        Moves finished polls, with their options and votes, into the archive tables.
+        Each batch is copied with INSERT ... SELECT and removed with set-based deletes
+        in a single transaction, so a batch is either fully hot or fully archived.
+        Returns the number of archived polls.
+        """
+        cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+        archived = 0
+
+        while True:
+            poll_ids = self.find_archivable_poll_ids(cutoff, batch_size)
+            if not poll_ids:
+                break
+
+            option_ids = select(PollOption.id).where(PollOption.poll_id.in_(poll_ids))
+
+            names, columns = _copy_columns(Poll, ArchivedPoll, {"archived_at": datetime.utcnow()})
+            self.session.execute(insert(ArchivedPoll).from_select(names, select(*columns).where(Poll.id.in_(poll_ids))))
+
+            names, columns = _copy_columns(PollOption, ArchivedPollOption)
+            self.session.execute(insert(ArchivedPollOption).from_select(names, select(*columns).where(PollOption.poll_id.in_(poll_ids))))
+
+            names, columns = _copy_columns(Vote, ArchivedVote)
+            self.session.execute(insert(ArchivedVote).from_select(names, select(*columns).where(Vote.poll_option_id.in_(option_ids))))
+
+            self.session.execute(delete(Vote).where(Vote.poll_option_id.in_(option_ids)))
+            self.session.execute(delete(PollOption).where(PollOption.poll_id.in_(poll_ids)))
+            self.session.execute(delete(Poll).where(Poll.id.in_(poll_ids)))
+            self.session.commit()
+
+            archived += len(poll_ids)
+            logger.info(f"Archived {len(poll_ids)} polls")
+
+            if len(poll_ids) < batch_size:
+                break
+
+        return archived
+
+    def purge_deleted_polls(self, chunk_size: int = 500) -> int:
+        """
+        Removes soft-deleted polls with their options and votes.
+        Rows are deleted in chunks of chunk_size, committing after each chunk, so
+        no single transaction holds the SQLite write lock for long.
+        Returns the number of purged polls.
+        """
+        deleted_poll_ids = select(Poll.id).where(Poll.deleted_at != None)
+        deleted_option_ids = select(PollOption.id).where(PollOption.poll_id.in_(deleted_poll_ids))
+
+        chunks = [
+            (Vote, select(Vote.id).where(Vote.poll_option_id.in_(deleted_option_ids))),
+            (PollOption, deleted_option_ids),
+        ]
+        for model, ids in chunks:
+            while self._delete_chunk(model, ids, chunk_size) == chunk_size:
+                pass
+
+        # Options are gone by now, so the polls themselves are a cheap final pass.
+        purged = 0
+        while True:
+            count = self._delete_chunk(Poll, deleted_poll_ids, chunk_size)
+            purged += count
+            if count < chunk_size:
+                break
+
+        if purged:
+            logger.info(f"Purged {purged} deleted polls")
+        return purged
+
+    def _delete_chunk(self, model, ids, chunk_size: int) -> int:
+        result = self.session.execute(
+            delete(model).where(model.id.in_(ids.limit(chunk_size).scalar_subquery()))
+            .execution_options(synchronize_session=False)
+        )
+        self.session.commit()
+        return result.rowcount
@@ -0,0 +1,103 @@
+import bisect
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from sqlmodel import Session, select
+from models import User
+from schemas import UserRead
+from config import settings
+
+def search_terms(user: UserRead) -> Set[str]:
+    """
+    Lowercased strings a user can be found by: username, display name (the
+    guild nickname when set) and every word of the display name.
+    """
+    terms = {user.username.lower()}
+    if user.display_name:
+        name = user.display_name.lower()
+        terms.add(name)
+        terms.update(name.split())
+    return terms
+
+class TypeaheadIndex:
+    """
+    In-process prefix index over users for the mention typeahead.
+
+    Terms are kept in one sorted list of (term, user id) pairs, so a prefix
+    lookup is two bisects. Member sync and logins update single users through
+    upsert(); the whole index is also reloaded from the database every
+    TYPEAHEAD_RELOAD_SECONDS to pick up changes made by other worker processes.
+    """
+
+    def __init__(self, reload_seconds: float = settings.TYPEAHEAD_RELOAD_SECONDS, clock: Callable[[], float] = time.monotonic):
+        self.reload_seconds = reload_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._keys: List[Tuple[str, int]] = []
+        self._users: Dict[int, UserRead] = {}
+        self._loaded_at: Optional[float] = None
+
+    def ensure_loaded(self, session: Session) -> None:
+        with self._lock:
+            fresh = self._loaded_at is not None and self._clock() - self._loaded_at < self.reload_seconds
+        if not fresh:
+            self.load(session)
+
+    def load(self, session: Session) -> None:
+        """
+        Rebuilds the index from the user table.
+        """
+        rows = session.exec(select(User.id, User.username, User.display_name, User.avatar_url)).all()
+        users = {
+            id: UserRead(id=id, username=username, display_name=display_name, avatar_url=avatar_url)
+            for id, username, display_name, avatar_url in rows
+        }
+        keys = sorted((term, user.id) for user in users.values() for term in search_terms(user))
+        with self._lock:
+            self._users = users
+            self._keys = keys
+            self._loaded_at = self._clock()
+
+    def upsert(self, users: Iterable[UserRead]) -> None:
+        """
+        Adds or replaces users in place. Before the first load this is a no-op,
+        since the load will read them from the database anyway.
+        """
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            for user in users:
+                previous = self._users.get(user.id)
+                if previous is not None:
+                    for term in search_terms(previous):
+                        index = bisect.bisect_left(self._keys, (term, user.id))
+                        if index < len(self._keys) and self._keys[index] == (term, user.id):
+                            del self._keys[index]
+                self._users[user.id] = user
+                for term in search_terms(user):
+                    bisect.insort(self._keys, (term, user.id))
+
+    def search(self, prefix: str) -> List[UserRead]:
+        """
+        Returns the users with a term starting with prefix (case-insensitive).
+        """
+        prefix = prefix.lower()
+        with self._lock:
+            start = bisect.bisect_left(self._keys, (prefix,))
+            end = bisect.bisect_left(self._keys, (prefix[:-1] + chr(ord(prefix[-1]) + 1),), lo=start)
+            ids = dict.fromkeys(user_id for _, user_id in self._keys[start:end])
+            return [self._users[user_id] for user_id in ids]
+
+    def reset(self) -> None:
+        """
+        Empties the index; the next search reloads it.
+        """
+        with self._lock:
+            self._keys = []
+            self._users = {}
+            self._loaded_at = None
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+typeahead_index = TypeaheadIndex()
@@ -1,6 +1,7 @@
 from typing import Optional
 from sqlmodel import Session, select
 from sqlalchemy.orm import selectinload
+from sqlalchemy import update
 from fastapi import HTTPException, status
 from models import Vote, PollOption, User, Poll
 from services.notification import NotificationService, NoOpNotificationService
@@ -20,7 +21,10 @@ class VoteService:
         If the vote does not exist, it creates it.
         """
         # 1. Verify Poll Option exists and fetch poll info for notification
-        statement = select(PollOption).where(PollOption.id == poll_option_id).options(selectinload(PollOption.poll))
+        statement = select(PollOption).join(Poll).where(
+            PollOption.id == poll_option_id,
+            Poll.deleted_at == None
+        ).options(selectinload(PollOption.poll))
         poll_option = self.session.exec(statement).first()
 
         if not poll_option:
@@ -33,6 +37,9 @@ class VoteService:
         )
         existing_vote = self.session.exec(vote_statement).first()
 
+        # Votes change the poll's participants, see HeatmapService.option_unavailability.
+        self.session.execute(update(Poll).where(Poll.id == poll_option.poll_id).values(version=Poll.version + 1))
+
         if existing_vote:
             # Toggle OFF: Delete vote
             self.session.delete(existing_vote)
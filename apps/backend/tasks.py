@@ -1,149 +1,398 @@
 import asyncio
-from datetime import datetime, timedelta
+from typing import List, Optional
+from datetime import datetime, timedelta, timezone
+from pydantic import BaseModel
 from sqlmodel import Session, select
+from sqlalchemy import DateTime, func, update
+from sqlalchemy.orm import selectinload
 from database import engine
 from models import Poll, PollOption, Vote, User
 from services.discord_service import discord_service
-from services.mention_service import mention_service
+from services.mention_service import mention_service, decode_mention_ids
+from services.retention_service import RetentionService
+from services.deadline_scheduler import deadline_scheduler
+from services.outbox_service import outbox_service
+from services.leader_election import leader_election
+from services.poll_service import PollService
+from services.recommendation_service import RecommendationService
+from services.member_directory import member_directory
+from services.member_sync_service import MemberSyncService
+from schemas import PollResults
 from config import settings
 
+# Recurring instances whose deadline passed longer ago than this (e.g. while the
+# server was down) are marked as sent without notifying.
+RECURRING_CATCHUP_WINDOW = timedelta(hours=6)
+
+async def run_background_jobs():
+    """
+    Campaigns for the background-jobs lease and runs the jobs only while this
+    process holds it, so starting uvicorn with several workers does not send
+    every notification several times. If the leader stops renewing, another
+    worker takes over once the lease expires.
+    """
+    print(f"Starting leader election as {leader_election.holder_id}...")
+    jobs = []
+    while True:
+        try:
+            is_leader = await asyncio.to_thread(run_in_session, leader_election.try_acquire, settings.LEADER_LEASE_SECONDS)
+        except Exception as e:
+            # Without a confirmed renewal we must assume another worker may take over.
+            print(f"Error renewing leader lease: {e}")
+            is_leader = False
+
+        if is_leader and not jobs:
+            print("Acquired leader lease; starting background jobs.")
+            jobs = [asyncio.create_task(job()) for job in LEADER_JOBS]
+        elif not is_leader and jobs:
+            print("Lost leader lease; stopping background jobs.")
+            for job in jobs:
+                job.cancel()
+            jobs = []
+
+        await asyncio.sleep(settings.LEADER_RENEW_SECONDS)
+
+def release_leadership():
+    try:
+        run_in_session(leader_election.release)
+    except Exception as e:
+        print(f"Error releasing leader lease: {e}")
+
+async def watch_poll_changes():
+    """
+    Background task that resyncs the deadline scheduler when polls change in
+    another worker process, whose in-process pushes cannot reach this heap.
+    Runs on the leader only, and reads one indexed max() per interval.
+    """
+    last_seen = None
+    while True:
+        try:
+            latest = await asyncio.to_thread(run_in_session, latest_poll_change)
+            if last_seen is not None and latest != last_seen:
+                deadline_scheduler.request_resync()
+            last_seen = latest
+        except Exception as e:
+            print(f"Error watching poll changes: {e}")
+        await asyncio.sleep(settings.DEADLINE_WATCH_SECONDS)
+
+def latest_poll_change(session: Session) -> Optional[datetime]:
+    return session.exec(select(func.max(Poll.updated_at))).first()
+
+class DeadlineNotification(BaseModel):
+    """
+    A deadline message ready to send, detached from any database session.
+    option_id is set for recurring instances and None for one-time polls.
+    """
+    poll_id: int
+    option_id: Optional[int] = None
+    channel_id: str
+    poll_title: str
+    event_url: str
+    message: Optional[str] = None
+    result_text: str
+    creator_id: Optional[int] = None
+    manual_mention_ids: List[int] = []
+    mention_user_ids: List[int] = []
+    mention_discord_ids: List[str] = []
+
 async def check_deadlines():
     """
-    Background task to check for expired deadlines and send notifications.
+    Background task to check for expired deadlines and queue notifications.
+    Sleeps until the next trigger in the deadline scheduler's heap instead of
+    polling, and rebuilds the heap from the database after each batch.
+
+    Database work runs in a worker thread so a tick never blocks the event loop
+    serving requests; the messages themselves go out through the outbox.
     """
     print("Starting deadline checker task...")
+    deadline_scheduler.attach(asyncio.get_running_loop())
     while True:
         try:
-            with Session(engine) as session:
-                now = datetime.utcnow()
-
-                # 1. Check One-Time Polls
-                stmt_onetime = select(Poll).where(
-                    Poll.deadline_date != None,
-                    Poll.deadline_date <= now,
-                    Poll.deadline_notification_sent == False,
-                    Poll.is_recurring == False
-                )
-                expired_onetime_polls = session.exec(stmt_onetime).all()
-
-                for poll in expired_onetime_polls:
-                    print(f"Processing deadline for one-time poll: {poll.title}")
-                    process_onetime_poll(session, poll)
-
-                # 2. Check Recurring Polls
-                stmt_recurring = select(Poll).where(
-                    Poll.is_recurring == True,
-                    Poll.deadline_offset_minutes != None
-                )
-                recurring_polls = session.exec(stmt_recurring).all()
-
-                for poll in recurring_polls:
-                    offset = timedelta(minutes=poll.deadline_offset_minutes)
-                    options_stmt = select(PollOption).where(
-                        PollOption.poll_id == poll.id,
-                        PollOption.notification_sent == False,
-                        (PollOption.start_time - offset) <= now
-                    )
-                    options = session.exec(options_stmt).all()
-
-                    for option in options:
-                        trigger_time = option.start_time - offset
-                        if now - trigger_time < timedelta(hours=6):
-                             print(f"Processing deadline for recurring poll: {poll.title}, option: {option.start_time}")
-                             process_recurring_instance(session, poll, option)
-                        else:
-                            option.notification_sent = True
-                            session.add(option)
-                            session.commit()
-
-            await asyncio.sleep(60)
+            now = datetime.utcnow()
+            notifications = await asyncio.to_thread(run_in_session, process_due_deadlines, now)
+            if notifications:
+                outbox_service.wake()
+
+            await asyncio.to_thread(run_in_session, reload_deadline_scheduler, now)
+            await deadline_scheduler.sleep_until_next_trigger(settings.DEADLINE_RESYNC_SECONDS)
 
         except Exception as e:
             print(f"Error in deadline checker: {e}")
-            await asyncio.sleep(60)
+            await asyncio.sleep(settings.DEADLINE_RETRY_SECONDS)
+
+async def deliver_outbox():
+    """
+    Background task that drains the Discord outbox: batches of due messages
+    are sent concurrently, failures are retried with exponential backoff and
+    messages that keep failing are dead-lettered.
+    """
+    print("Starting outbox delivery task...")
+    outbox_service.attach(asyncio.get_running_loop())
+    while True:
+        try:
+            outbox_service.clear_wakeup()
+            delivered = await deliver_outbox_batch()
+            if delivered < settings.OUTBOX_BATCH_SIZE:
+                next_attempt_at = await asyncio.to_thread(run_in_session, outbox_service.next_attempt_at)
+                await outbox_service.wait(next_attempt_at, settings.OUTBOX_POLL_SECONDS)
+        except Exception as e:
+            print(f"Error in outbox delivery: {e}")
+            await asyncio.sleep(settings.OUTBOX_POLL_SECONDS)
+
+async def deliver_outbox_batch() -> int:
+    messages = await asyncio.to_thread(run_in_session, outbox_service.fetch_due, datetime.utcnow(), settings.OUTBOX_BATCH_SIZE)
+    if not messages:
+        return 0
+
+    results = await outbox_service.deliver_batch(messages, settings.OUTBOX_CONCURRENCY)
+    await asyncio.to_thread(run_in_session, outbox_service.record_results, messages, results)
+    return len(messages)
+
+def run_in_session(func, *args):
+    """
+    Runs func(session, *args) in a fresh session; used from worker threads.
+    """
+    with Session(engine) as session:
+        return func(session, *args)
+
+def reload_deadline_scheduler(session: Session, processed_until: datetime):
+    deadline_scheduler.load(session, processed_until=processed_until, retry_delay=timedelta(seconds=settings.DEADLINE_RETRY_SECONDS))
+
+def process_due_deadlines(session: Session, now: datetime) -> List[DeadlineNotification]:
+    """
+    Queues notifications for every deadline that is due at the given time.
+    """
+    notifications = []
+
+    # 1. Check One-Time Polls
+    stmt_onetime = select(Poll).where(
+        Poll.deadline_date != None,
+        Poll.deadline_date <= now,
+        Poll.deadline_notification_sent == False,
+        Poll.is_recurring == False,
+        Poll.deleted_at == None
+    )
+    expired_onetime_polls = session.exec(stmt_onetime).all()
+    onetime_results = PollService(session).results_for_polls([poll.id for poll in expired_onetime_polls])
+    recommendation_service = RecommendationService(session)
+
+    for poll in expired_onetime_polls:
+        print(f"Processing deadline for one-time poll: {poll.title}")
+        notification = process_onetime_poll(poll, onetime_results[poll.id], recommendation_service)
+        if notification:
+            notifications.append(notification)
+
+    # 2. Check Recurring Polls
+    # Each option triggers deadline_offset_minutes before it starts. Instances
+    # whose trigger is older than the catch-up window are marked stale in bulk,
+    # and every remaining due (poll, option) pair comes back from one query.
+    trigger_time = func.datetime(
+        PollOption.start_time,
+        func.printf("-%d minutes", Poll.deadline_offset_minutes),
+        type_=DateTime
+    )
+    due_recurring = (
+        Poll.is_recurring == True,
+        Poll.deadline_offset_minutes != None,
+        Poll.deleted_at == None,
+        PollOption.notification_sent == False,
+        trigger_time <= now
+    )
+
+    stale_options = select(PollOption.id).join(Poll).where(
+        *due_recurring,
+        trigger_time < now - RECURRING_CATCHUP_WINDOW
+    )
+    result = session.execute(
+        update(PollOption)
+        .where(PollOption.id.in_(stale_options))
+        .values(notification_sent=True)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount:
+        print(f"Marked {result.rowcount} stale recurring instances as sent.")
+    session.commit()
+
+    stmt_recurring = (
+        select(Poll, PollOption)
+        .join(PollOption, PollOption.poll_id == Poll.id)
+        .where(*due_recurring)
+        .order_by(PollOption.start_time)
+        .options(selectinload(PollOption.votes).selectinload(Vote.user))
+    )
+    for poll, option in session.exec(stmt_recurring).all():
+        print(f"Processing deadline for recurring poll: {poll.title}, option: {option.start_time}")
+        notification = process_recurring_instance(poll, option)
+        if notification:
+            notifications.append(notification)
+
+    resolve_mentions(session, notifications)
+    queue_deadline_notifications(session, notifications)
+    return notifications
+
+def resolve_mentions(session: Session, notifications: List[DeadlineNotification]):
+    """
+    Records the manual mentions and fills in Discord IDs for every prepared
+    notification with a single user query.
+    """
+    for notification in notifications:
+        # Users mentioned in the final deadline message (manually) should be boosted.
+        if notification.manual_mention_ids:
+            mention_service.record_mentions(session, notification.creator_id, notification.manual_mention_ids)
+
+    user_ids = {uid for n in notifications for uid in n.mention_user_ids}
+    if not user_ids:
+        return
+
+    rows = session.exec(select(User.id, User.discord_id).where(User.id.in_(user_ids))).all()
+    discord_ids = dict(rows)
+    for notification in notifications:
+        resolved = [discord_ids[uid] for uid in notification.mention_user_ids if uid in discord_ids]
+        # dict.fromkeys keeps the order while dropping users already mentioned as voters
+        notification.mention_discord_ids = list(dict.fromkeys(notification.mention_discord_ids + resolved))
+
+def queue_deadline_notifications(session: Session, notifications: List[DeadlineNotification]):
+    """
+    Writes the notifications to the outbox and marks them sent in a single
+    commit, so a notification is never lost or queued twice.
+    """
+    for notification in notifications:
+        if notification.option_id is not None:
+            idempotency_key = f"deadline:option:{notification.option_id}"
+        else:
+            idempotency_key = f"deadline:poll:{notification.poll_id}"
+        payload = discord_service.build_deadline_notification(
+            poll_title=notification.poll_title,
+            event_url=notification.event_url,
+            message=notification.message,
+            result_text=notification.result_text,
+            mention_discord_ids=notification.mention_discord_ids
+        )
+        outbox_service.enqueue(session, idempotency_key, notification.channel_id, payload)
+
+    option_ids = [n.option_id for n in notifications if n.option_id is not None]
+    poll_ids = [n.poll_id for n in notifications if n.option_id is None]
+    if option_ids:
+        session.execute(update(PollOption).where(PollOption.id.in_(option_ids)).values(notification_sent=True))
+    if poll_ids:
+        session.execute(update(Poll).where(Poll.id.in_(poll_ids)).values(deadline_notification_sent=True))
+    session.commit()
+
+def manual_mention_ids(poll: Poll) -> List[int]:
+    return decode_mention_ids(poll.deadline_mention_ids)
+
+async def archive_old_polls():
+    """
+    Background task that moves finished polls into the archive tables.
+    """
+    print("Starting poll archival task...")
+    while True:
+        try:
+            archived = await asyncio.to_thread(run_archival)
+            if archived:
+                print(f"Archived {archived} polls.")
+        except Exception as e:
+            print(f"Error in poll archival: {e}")
+        await asyncio.sleep(settings.ARCHIVE_INTERVAL_SECONDS)
+
+def run_archival() -> int:
+    with Session(engine) as session:
+        return RetentionService(session).archive_polls(settings.ARCHIVE_AFTER_DAYS, settings.ARCHIVE_BATCH_SIZE)
+
+async def purge_deleted_polls():
+    """
+    Background task that removes the rows of soft-deleted polls.
+    """
+    print("Starting deleted poll purger task...")
+    while True:
+        try:
+            purged = await asyncio.to_thread(run_purge)
+            if purged:
+                print(f"Purged {purged} deleted polls.")
+        except Exception as e:
+            print(f"Error in deleted poll purger: {e}")
+        await asyncio.sleep(settings.PURGE_INTERVAL_SECONDS)
+
+def run_purge() -> int:
+    with Session(engine) as session:
+        return RetentionService(session).purge_deleted_polls(settings.PURGE_CHUNK_SIZE)
 
-def process_onetime_poll(session: Session, poll: Poll):
+async def sync_guild_members():
+    """
+    Background task that copies the guild member list into the user table, so
+    reads (e.g. the mention typeahead) never have to sync on the request path.
+    """
+    print("Starting guild member sync task...")
+    while True:
+        try:
+            changed = await asyncio.to_thread(run_member_sync)
+            if changed:
+                print(f"Synced {changed} changed guild members.")
+        except Exception as e:
+            print(f"Error syncing guild members: {e}")
+        await asyncio.sleep(settings.MEMBER_SYNC_INTERVAL_SECONDS)
+
+def run_member_sync() -> int:
+    member_directory.refresh(settings.DISCORD_GUILD_ID)
+    members = member_directory.get_members(settings.DISCORD_GUILD_ID)
+    with Session(engine) as session:
+        return MemberSyncService(session).sync(members)
+
+def process_onetime_poll(poll: Poll, results: PollResults, recommendation_service: RecommendationService) -> Optional[DeadlineNotification]:
     try:
         if not poll.deadline_channel_id:
-            return
+            return None
 
-        # 1. Determine Winner
-        options = poll.options
-        if not options:
+        # 1. Determine Winner: the best recommended option that got any votes
+        # (the ranking also weighs unavailability and breaks vote ties
+        # deterministically), else the vote leader.
+        if not results.tally:
             result_text = "No options were available."
+        elif not results.top_options:
+            result_text = "No votes were cast."
         else:
-            scores = []
-            for opt in options:
-                count = len(opt.votes)
-                scores.append((opt, count))
-            scores.sort(key=lambda x: x[1], reverse=True)
-
-            if not scores or scores[0][1] == 0:
-                 result_text = "No votes were cast."
+            try:
+                voted = [option for option in recommendation_service.recommend(poll.id).options if option.votes > 0]
+            except Exception as e:
+                # One poll's ranking failing must not hold back its announcement.
+                print(f"Failed to rank options of poll {poll.id}: {e}")
+                voted = []
+            if voted:
+                final_winner = voted[0]
+                result_text = f"Winner: **{final_winner.label}** ({final_winner.votes} votes)"
+                if final_winner.unavailable_count:
+                    result_text += f", {final_winner.unavailable_count} unavailable"
             else:
-                 winner, count = scores[0]
-                 max_score = scores[0][1]
-                 ties = [s[0] for s in scores if s[1] == max_score]
-
-                 import random
-                 final_winner = random.choice(ties)
-                 result_text = f"Winner: **{final_winner.label}** ({max_score} votes)"
+                final_winner = results.top_options[0]
+                result_text = f"Winner: **{final_winner.label}** ({final_winner.votes} votes)"
 
-        # 2. Collect Mentions
-        voter_ids = set()
-        for opt in poll.options:
-            for vote in opt.votes:
-                voter_ids.add(vote.user_id)
-
-        # Manually mentioned users
-        manual_mentions = []
-        if poll.deadline_mention_ids:
-            import json
-            manual_ids = poll.deadline_mention_ids
-            if isinstance(manual_ids, str):
-                 try:
-                     manual_ids = json.loads(manual_ids)
-                 except:
-                     manual_ids = []
-            if isinstance(manual_ids, list):
-                manual_mentions = manual_ids
-                for uid in manual_ids:
-                    voter_ids.add(uid)
-
-        # Record Mentions for Ranking
-        # Users mentioned in the final deadline message (manually) should be boosted.
-        if manual_mentions:
-            mention_service.record_mentions(session, poll.creator_id, manual_mentions)
+        # 2. Collect Mentions (voters plus manually mentioned users)
+        manual_mentions = manual_mention_ids(poll)
 
-        discord_ids = []
-        if voter_ids:
-            users = session.exec(select(User).where(User.id.in_(list(voter_ids)))).all()
-            discord_ids = [u.discord_id for u in users]
-
-        # 3. Send Notification
+        # 3. Build Notification
         event_url = f"{settings.FRONTEND_URL}/apps/calendar/events/{poll.id}"
 
-        discord_service.send_deadline_notification(
+        return DeadlineNotification(
+            poll_id=poll.id,
             channel_id=poll.deadline_channel_id,
             poll_title=poll.title,
             event_url=event_url,
             message=poll.deadline_message,
             result_text=result_text,
-            mention_discord_ids=discord_ids
+            creator_id=poll.creator_id,
+            manual_mention_ids=manual_mentions,
+            mention_user_ids=manual_mentions,
+            mention_discord_ids=results.voter_discord_ids
         )
 
-        # 4. Mark as Sent
-        poll.deadline_notification_sent = True
-        session.add(poll)
-        session.commit()
-
     except Exception as e:
         print(f"Failed to process onetime poll {poll.id}: {e}")
+        return None
 
-def process_recurring_instance(session: Session, poll: Poll, option: PollOption):
+def process_recurring_instance(poll: Poll, option: PollOption) -> Optional[DeadlineNotification]:
     try:
         if not poll.deadline_channel_id:
-            return
+            return None
 
         # 1. Participants List
         participants = []
@@ -161,52 +410,42 @@ def process_recurring_instance(session: Session, poll: Poll, option: PollOption)
             result_text = "**Participants:** " + ", ".join(participants)
 
         # 2. Mentions
-        manual_mentions = []
-        if poll.deadline_mention_ids:
-             import json
-             manual_ids = poll.deadline_mention_ids
-             if isinstance(manual_ids, str):
-                  try:
-                      manual_ids = json.loads(manual_ids)
-                  except:
-                      manual_ids = []
-             if isinstance(manual_ids, list):
-                 manual_mentions = manual_ids
-                 for uid in manual_ids:
-                     voter_ids.add(uid)
-
-        if manual_mentions:
-            mention_service.record_mentions(session, poll.creator_id, manual_mentions)
-
-        discord_ids = []
-        if voter_ids:
-             users = session.exec(select(User).where(User.id.in_(list(voter_ids)))).all()
-             discord_ids = [u.discord_id for u in users]
-
-        # 3. Send Notification
+        manual_mentions = manual_mention_ids(poll)
+        voter_ids.update(manual_mentions)
+
+        # 3. Build Notification
         event_url = f"{settings.FRONTEND_URL}/apps/calendar/events/{poll.id}"
 
         # Use Discord's native timestamp formatting for proper timezone display
-        from datetime import timezone as tz
         start_dt = option.start_time
         if start_dt.tzinfo is None:
-            start_dt = start_dt.replace(tzinfo=tz.utc)
+            start_dt = start_dt.replace(tzinfo=timezone.utc)
         start_timestamp = int(start_dt.timestamp())
         date_label = f"<t:{start_timestamp}:f>"
 
-        discord_service.send_deadline_notification(
+        return DeadlineNotification(
+            poll_id=poll.id,
+            option_id=option.id,
             channel_id=poll.deadline_channel_id,
             poll_title=f"{poll.title} ({date_label})",
             event_url=event_url,
             message=poll.deadline_message,
             result_text=result_text,
-            mention_discord_ids=discord_ids
+            creator_id=poll.creator_id,
+            manual_mention_ids=manual_mentions,
+            mention_user_ids=sorted(voter_ids)
         )
 
-        # 4. Mark as Sent
-        option.notification_sent = True
-        session.add(option)
-        session.commit()
-
     except Exception as e:
         print(f"Failed to process recurring poll {poll.id} instance {option.id}: {e}")
+        return None
+
+# Jobs that must run in exactly one process, started by run_background_jobs.
+LEADER_JOBS = [
+    check_deadlines,
+    watch_poll_changes,
+    deliver_outbox,
+    archive_old_polls,
+    purge_deleted_polls,
+    sync_guild_members,
+]
@@ -1,5 +1,7 @@
 import pytest
+from contextlib import contextmanager
 from sqlmodel import Session, SQLModel, create_engine
+from sqlalchemy import event
 from sqlalchemy.pool import StaticPool
 from models import User
 from typing import Generator
@@ -15,9 +17,41 @@ def session_fixture() -> Generator[Session, None, None]:
         poolclass=StaticPool
     )
     SQLModel.metadata.create_all(engine)
+    # Process-wide indexes must not carry users over from another test's database.
+    from services.typeahead_index import typeahead_index
+    from services.heatmap_service import unavailability_cache
+    from services.recommendation_service import recommendation_cache
+    from services.mention_service import mention_service
+    typeahead_index.reset()
+    mention_service.reset()
+    unavailability_cache.invalidate()
+    recommendation_cache.invalidate()
     with Session(engine) as session:
         yield session
 
+@pytest.fixture(name="statement_counter")
+def statement_counter_fixture(session: Session):
+    """
+    Records the (statement, parameters) the session's engine executes:
+
+        with statement_counter() as statements:
+            ...
+    """
+    @contextmanager
+    def count():
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append((statement, parameters))
+
+        event.listen(session.bind, "before_cursor_execute", record)
+        try:
+            yield statements
+        finally:
+            event.remove(session.bind, "before_cursor_execute", record)
+
+    return count
+
 @pytest.fixture(name="test_user")
 def test_user_fixture(session: Session) -> User:
     user = User(
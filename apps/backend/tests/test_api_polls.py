@@ -77,3 +77,75 @@ def test_get_poll_api(client: TestClient, session: Session, test_user: User):
     data = response.json()
     assert data["title"] == "Get Poll API"
     assert data["creator"]["username"] == test_user.username
+
+def test_get_archived_poll_api(client: TestClient, session: Session, test_user: User):
+    from models import PollOption
+    from services.retention_service import RetentionService
+
+    end = datetime.utcnow() - timedelta(days=400)
+    poll = Poll(title="Archived Poll", creator_id=test_user.id)
+    poll.options = [PollOption(label="Opt", start_time=end - timedelta(hours=1), end_time=end)]
+    session.add(poll)
+    session.commit()
+    poll_id = poll.id
+    RetentionService(session).archive_polls(older_than_days=180)
+
+    assert client.get(f"/api/polls/{poll_id}").status_code == 404
+
+    response = client.get(f"/api/polls/{poll_id}", params={"include_archived": True})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["title"] == "Archived Poll"
+    assert data["archived_at"] is not None
+    assert data["creator"]["username"] == test_user.username
+
+    titles = [p["title"] for p in client.get("/api/polls", params={"include_archived": True}).json()]
+    assert "Archived Poll" in titles
+
+def test_get_poll_results_api(client: TestClient, session: Session, test_user: User):
+    create_resp = client.post(
+        "/api/polls",
+        json={
+            "title": "Results API",
+            "options": [
+                {
+                    "label": "Opt",
+                    "start_time": (datetime.utcnow() + timedelta(hours=1)).isoformat(),
+                    "end_time": (datetime.utcnow() + timedelta(hours=2)).isoformat()
+                }
+            ]
+        }
+    )
+    poll = create_resp.json()
+    client.post("/api/votes", json={"poll_option_id": poll["options"][0]["id"]})
+
+    response = client.get(f"/api/polls/{poll['id']}/results")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total_votes"] == 1
+    assert data["top_options"][0]["label"] == "Opt"
+    assert "voter_discord_ids" not in data
+
+def test_get_poll_conflicts_api(client: TestClient, session: Session, test_user: User):
+    from models import UserUnavailability
+
+    start = datetime(2030, 5, 6, 18)
+    create_resp = client.post(
+        "/api/polls",
+        json={
+            "title": "Conflicts API",
+            "options": [
+                {"label": "A", "start_time": start.isoformat(), "end_time": (start + timedelta(hours=1)).isoformat()},
+                {"label": "B", "start_time": (start + timedelta(days=1)).isoformat(), "end_time": (start + timedelta(days=1, hours=1)).isoformat()}
+            ]
+        }
+    )
+    poll_id = create_resp.json()["id"]
+    session.add(UserUnavailability(user_id=test_user.id, start_time=start + timedelta(days=1), end_time=start + timedelta(days=2)))
+    session.commit()
+
+    response = client.get(f"/api/polls/{poll_id}/conflicts")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["participant_count"] == 1
+    assert [o["unavailable_count"] for o in data["options"]] == [0, 1]
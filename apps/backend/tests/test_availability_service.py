@@ -0,0 +1,167 @@
+import pytest
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+
+from main import app
+from dependencies import get_current_user, get_session
+from models import User, UserUnavailability
+from services.availability_service import AvailabilityService, expand_rrule, merge_blocks, sweep_free_slots
+
+DAY = datetime(2030, 1, 7)
+
+@pytest.fixture(name="client")
+def client_fixture(session: Session, test_user: User):
+    app.dependency_overrides[get_session] = lambda: session
+    app.dependency_overrides[get_current_user] = lambda: test_user
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+def at(hour: int) -> datetime:
+    return DAY + timedelta(hours=hour)
+
+def ranges(slots):
+    return [(s.start_time.hour, s.end_time.hour if s.end_time.date() == DAY.date() else 24, s.free_count) for s in slots]
+
+def test_sweep_requires_everyone_free_by_default():
+    busy = [
+        (at(9), at(11), 1),
+        (at(10), at(12), 2),
+        (at(10), at(10), 3), # empty blocks are ignored
+    ]
+
+    slots = sweep_free_slots(busy, user_count=3, start=at(8), end=at(14), min_free=3)
+
+    assert ranges(slots) == [(8, 9, 3), (12, 14, 3)]
+
+def test_sweep_at_least_k_free_merges_ranges():
+    busy = [(at(9), at(11), 1), (at(10), at(12), 2)]
+
+    slots = sweep_free_slots(busy, user_count=3, start=at(8), end=at(14), min_free=2)
+
+    # 10-11 has only one user free, so two slots remain; 8-10 dips to 2 free.
+    assert ranges(slots) == [(8, 10, 2), (11, 14, 2)]
+
+def test_sweep_does_not_double_count_overlapping_blocks_of_one_user():
+    busy = [(at(9), at(12), 1), (at(10), at(11), 1), (at(12), at(13), 1)]
+
+    slots = sweep_free_slots(busy, user_count=2, start=at(8), end=at(14), min_free=2)
+
+    assert ranges(slots) == [(8, 9, 2), (13, 14, 2)]
+
+def test_sweep_min_duration():
+    busy = [(at(9), at(10), 1), (at(11), at(14), 1)]
+
+    slots = sweep_free_slots(busy, user_count=1, start=at(8), end=at(16), min_free=1, min_duration=timedelta(hours=2))
+
+    assert ranges(slots) == [(14, 16, 1)]
+
+def test_service_loads_only_requested_users_in_window(session: Session, test_user):
+    other = User(discord_id="other", username="other")
+    outsider = User(discord_id="outsider", username="outsider")
+    session.add_all([other, outsider])
+    session.commit()
+    session.add_all([
+        UserUnavailability(user_id=test_user.id, start_time=at(6), end_time=at(9)),
+        UserUnavailability(user_id=other.id, start_time=at(12), end_time=at(13)),
+        UserUnavailability(user_id=outsider.id, start_time=at(8), end_time=at(20)),
+        UserUnavailability(user_id=other.id, start_time=at(30), end_time=at(40)),
+    ])
+    session.commit()
+
+    service = AvailabilityService(session)
+    busy = service.load_busy([test_user.id, other.id], at(8), at(18))
+    slots = service.free_slots(at(8), at(18), [test_user.id, other.id])
+
+    assert sorted(busy) == [(at(8), at(9), test_user.id), (at(12), at(13), other.id)]
+    assert ranges(slots) == [(9, 12, 2), (13, 18, 2)]
+
+def test_free_slots_api(client: TestClient, session: Session, test_user):
+    session.add(UserUnavailability(user_id=test_user.id, start_time=at(10), end_time=at(11)))
+    session.commit()
+
+    response = client.get("/api/availability/free-slots", params={
+        "start": at(9).isoformat() + "Z",
+        "end": at(12).isoformat() + "Z",
+        "user_ids": [test_user.id]
+    })
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["user_count"] == 1
+    assert [(s["start_time"], s["end_time"]) for s in data["slots"]] == [
+        ("2030-01-07T09:00:00Z", "2030-01-07T10:00:00Z"),
+        ("2030-01-07T11:00:00Z", "2030-01-07T12:00:00Z"),
+    ]
+    assert client.get("/api/availability/free-slots", params={"start": at(12).isoformat(), "end": at(9).isoformat()}).status_code == 400
+
+def test_merge_blocks_single_pass():
+    existing = [
+        (at(1), at(2), 10),   # untouched
+        (at(8), at(9), 11),   # touches the new 9-10 block
+        (at(9), at(12), 12),  # overlaps it
+        (at(20), at(21), 13), # inside the new 19-22 block
+    ]
+    new = [(at(19), at(22)), (at(9), at(10)), (at(14), at(15)), (at(14), at(16))]
+
+    delete_ids, inserts = merge_blocks(new, existing)
+
+    assert sorted(delete_ids) == [11, 12, 13]
+    assert inserts == [(at(8), at(12)), (at(14), at(16)), (at(19), at(22))]
+
+def test_expand_rrule_keeps_wall_clock_time_across_dst():
+    # Europe/Berlin leaves summer time on 2030-10-27.
+    blocks = expand_rrule("FREQ=DAILY;COUNT=3", datetime(2030, 10, 26, 9), datetime(2030, 10, 26, 17), "Europe/Berlin")
+
+    assert blocks == [
+        (datetime(2030, 10, 26, 7), datetime(2030, 10, 26, 15)),
+        (datetime(2030, 10, 27, 8), datetime(2030, 10, 27, 16)),
+        (datetime(2030, 10, 28, 8), datetime(2030, 10, 28, 16)),
+    ]
+
+def test_add_blocks_is_set_based(session: Session, test_user, statement_counter):
+    session.add_all([
+        UserUnavailability(user_id=test_user.id, start_time=at(8), end_time=at(10)),
+        UserUnavailability(user_id=test_user.id, start_time=at(12), end_time=at(13)),
+    ])
+    session.commit()
+    user_id = test_user.id
+    new = [(at(9 + 24 * day), at(17 + 24 * day)) for day in range(100)]
+
+    with statement_counter() as statements:
+        blocks = AvailabilityService(session).add_blocks(user_id, new)
+
+    # Existing blocks, one delete, the inserts (batched by the driver) and the version bump.
+    assert [statement.split()[0] for statement, _ in statements[:2]] == ["SELECT", "DELETE"]
+    assert len(statements) <= 5
+    assert len(blocks) == 100
+    assert (blocks[0].start_time, blocks[0].end_time) == (at(8), at(17))
+    rows = session.exec(select(UserUnavailability).where(UserUnavailability.user_id == user_id)).all()
+    assert len(rows) == 100
+    assert session.get(User, user_id).availability_version == 1
+
+def test_bulk_unavailability_api(client: TestClient, session: Session, test_user):
+    response = client.post("/api/profile/unavailability/bulk", json={
+        "blocks": [{"start_time": "2030-01-06T20:00:00+01:00", "end_time": "2030-01-06T21:00:00+01:00"}],
+        "recurrence": {
+            "start_time": "2030-01-07T09:00:00",
+            "end_time": "2030-01-07T17:00:00",
+            "rrule": "FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR;UNTIL=20300119",
+            "timezone": "America/New_York"
+        }
+    })
+
+    assert response.status_code == 200
+    blocks = response.json()
+    assert len(blocks) == 11
+    assert blocks[0]["start_time"] == "2030-01-06T19:00:00Z" # the explicit block, normalized to UTC
+    assert blocks[1]["start_time"] == "2030-01-07T14:00:00Z" # 9:00 in New York
+
+    too_many = client.post("/api/profile/unavailability/bulk", json={
+        "recurrence": {"start_time": "2030-01-07T09:00:00", "end_time": "2030-01-07T10:00:00", "rrule": "FREQ=HOURLY"}
+    })
+    assert too_many.status_code == 400
+    bad_zone = client.post("/api/profile/unavailability/bulk", json={
+        "recurrence": {"start_time": "2030-01-07T09:00:00", "end_time": "2030-01-07T10:00:00", "rrule": "FREQ=DAILY;COUNT=2", "timezone": "Mars/Olympus"}
+    })
+    assert bad_zone.status_code == 400
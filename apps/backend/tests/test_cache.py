@@ -0,0 +1,131 @@
+import threading
+import time
+import pytest
+
+from services.cache import TTLCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+def test_fresh_hit_skips_loader():
+    clock = FakeClock()
+    cache = TTLCache(ttl=10, clock=clock)
+    calls = []
+
+    assert cache.get("g", lambda: calls.append(1) or "v1") == "v1"
+    clock.now = 9
+    assert cache.get("g", lambda: calls.append(1) or "v2") == "v1"
+    assert len(calls) == 1
+
+def test_stale_value_is_served_while_refreshing():
+    clock = FakeClock()
+    cache = TTLCache(ttl=10, stale_ttl=100, clock=clock)
+    cache.get("g", lambda: "v1")
+    release = threading.Event()
+
+    def slow_loader():
+        release.wait(2)
+        return "v2"
+
+    clock.now = 20
+    assert cache.get("g", slow_loader) == "v1"
+    # Only one refresh runs while stale.
+    assert cache.get("g", lambda: pytest.fail("second refresh started")) == "v1"
+
+    release.set()
+    wait_for(lambda: cache.peek("g") == "v2")
+
+def test_expired_entry_is_reloaded():
+    clock = FakeClock()
+    cache = TTLCache(ttl=10, stale_ttl=5, clock=clock)
+    cache.get("g", lambda: "v1")
+
+    clock.now = 16
+    assert cache.get("g", lambda: "v2") == "v2"
+
+def test_concurrent_misses_share_one_load():
+    cache = TTLCache(ttl=10)
+    calls = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def loader():
+        calls.append(1)
+        started.set()
+        release.wait(2)
+        return "v1"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("g", loader))) for _ in range(5)]
+    threads[0].start()
+    started.wait(2)
+    for thread in threads[1:]:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join(2)
+
+    assert calls == [1]
+    assert results == ["v1"] * 5
+
+def test_failed_load_is_raised_and_not_cached():
+    cache = TTLCache(ttl=10)
+
+    def failing():
+        raise RuntimeError("discord down")
+
+    with pytest.raises(RuntimeError):
+        cache.get("g", failing)
+    assert cache.get("g", lambda: "v1") == "v1"
+
+def test_invalidate_forces_reload():
+    cache = TTLCache(ttl=10)
+    cache.get("g", lambda: "v1")
+
+    cache.invalidate("g")
+
+    assert cache.get("g", lambda: "v2") == "v2"
+
+def test_invalidate_during_inflight_load():
+    cache = TTLCache(ttl=10)
+    release = threading.Event()
+    results = {}
+    original_load = cache._load
+    raced = []
+
+    def second_reader():
+        results["second"] = cache.get("g", lambda: release.wait(2) and "new")
+
+    def racing_load(*args):
+        # invalidate() and a newer caller land between get() and the load.
+        if not raced:
+            raced.append(True)
+            cache.invalidate("g")
+            threading.Thread(target=second_reader, daemon=True).start()
+            wait_for(lambda: "g" in cache._inflight)
+        return original_load(*args)
+
+    cache._load = racing_load
+
+    def first_reader():
+        results["first"] = cache.get("g", lambda: "old")
+
+    first = threading.Thread(target=first_reader, daemon=True)
+    first.start()
+    first.join(2)
+    release.set()
+    wait_for(lambda: "second" in results)
+
+    assert results == {"first": "old", "second": "new"}
+    assert cache.get("g", lambda: "unused") == "new" # the stale load was not cached
@@ -0,0 +1,78 @@
+from datetime import date, datetime
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+from sqlalchemy import text
+
+from models import Poll, PollOption, User, Vote
+from services.calendar_service import CalendarService
+
+def create_polls(session: Session, test_user: User):
+    voter = User(discord_id="voter", username="voter")
+    session.add(voter)
+    first = Poll(title="First", creator_id=test_user.id)
+    first.options = [
+        PollOption(label="Wed morning", start_time=datetime(2030, 5, 1, 9), end_time=datetime(2030, 5, 1, 10)),
+        PollOption(label="Wed night", start_time=datetime(2030, 5, 1, 23, 30), end_time=datetime(2030, 5, 2, 0, 30)),
+        PollOption(label="Mon", start_time=datetime(2030, 5, 6, 9), end_time=datetime(2030, 5, 6, 10)),
+    ]
+    second = Poll(title="Second", creator_id=test_user.id)
+    second.options = [PollOption(label="Wed", start_time=datetime(2030, 5, 1, 12), end_time=datetime(2030, 5, 1, 13))]
+    deleted = Poll(title="Deleted", creator_id=test_user.id, deleted_at=datetime(2030, 1, 1))
+    deleted.options = [PollOption(label="Wed", start_time=datetime(2030, 5, 1, 12), end_time=datetime(2030, 5, 1, 13))]
+    session.add_all([first, second, deleted])
+    session.commit()
+    session.add_all([
+        Vote(poll_option_id=first.options[0].id, user_id=test_user.id),
+        Vote(poll_option_id=first.options[0].id, user_id=voter.id),
+        Vote(poll_option_id=second.options[0].id, user_id=voter.id),
+    ])
+    session.commit()
+
+def counts(buckets):
+    return [(b.day, b.events, b.options, b.votes) for b in buckets]
+
+def test_density_per_day_and_week(session: Session, test_user):
+    create_polls(session, test_user)
+    service = CalendarService(session)
+    start, end = datetime(2030, 4, 1), datetime(2030, 6, 1)
+
+    assert counts(service.density(start, end)) == [
+        (date(2030, 5, 1), 2, 3, 3),
+        (date(2030, 5, 6), 1, 1, 0),
+    ]
+    # 2030-05-01 is a Wednesday; its week starts on Monday 2030-04-29.
+    assert counts(service.density(start, end, "week")) == [
+        (date(2030, 4, 29), 2, 3, 3),
+        (date(2030, 5, 6), 1, 1, 0),
+    ]
+
+def test_density_cuts_days_at_local_midnight(session: Session, test_user):
+    create_polls(session, test_user)
+
+    # At UTC+2 the 23:30 option falls on the next day.
+    buckets = CalendarService(session).density(datetime(2030, 4, 1), datetime(2030, 6, 1), tz_offset_minutes=120)
+
+    assert [(b.day, b.options) for b in buckets] == [
+        (date(2030, 5, 1), 2),
+        (date(2030, 5, 2), 1),
+        (date(2030, 5, 6), 1),
+    ]
+
+def test_density_range_uses_start_time_index(session: Session):
+    plan = session.connection().execute(text(
+        "EXPLAIN QUERY PLAN SELECT date(start_time), count(*) FROM polloption "
+        "WHERE start_time >= '2030-01-01' AND start_time < '2031-01-01' GROUP BY date(start_time)"
+    )).all()
+    assert "ix_polloption_start_time (start_time>? AND start_time<?)" in " ".join(row[-1] for row in plan)
+
+def test_density_api(client: TestClient, session: Session, test_user):
+    create_polls(session, test_user)
+
+    response = client.get("/api/calendar/density", params={"start": "2030-01-01T00:00:00Z", "end": "2031-01-01T00:00:00Z"})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["granularity"] == "day"
+    assert data["buckets"][0] == {"day": "2030-05-01", "events": 2, "options": 3, "votes": 3}
+    assert client.get("/api/calendar/density", params={"start": "2030-01-01", "end": "2030-02-01", "granularity": "month"}).status_code == 422
+    assert client.get("/api/calendar/density", params={"start": "2030-01-01", "end": "2035-01-01"}).status_code == 400
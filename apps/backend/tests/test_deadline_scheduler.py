@@ -0,0 +1,56 @@
+import asyncio
+from datetime import datetime, timedelta
+from sqlmodel import Session
+
+from models import Poll, PollOption
+from services.deadline_scheduler import DeadlineScheduler
+
+def create_onetime_poll(session: Session, user, deadline: datetime) -> Poll:
+    poll = Poll(title="One-time", creator_id=user.id, deadline_date=deadline, deadline_channel_id="123")
+    session.add(poll)
+    session.commit()
+    session.refresh(poll)
+    return poll
+
+def test_load_orders_triggers(session: Session, test_user):
+    now = datetime.utcnow()
+    create_onetime_poll(session, test_user, now + timedelta(hours=3))
+    recurring = Poll(title="Recurring", creator_id=test_user.id, is_recurring=True, deadline_offset_minutes=30, deadline_channel_id="123")
+    recurring.options = [
+        PollOption(label="A", start_time=now + timedelta(hours=2), end_time=now + timedelta(hours=3)),
+        PollOption(label="B", start_time=now + timedelta(days=1), end_time=now + timedelta(days=1, hours=1)),
+    ]
+    session.add(recurring)
+    # Polls without a channel never notify, so they must not be scheduled.
+    session.add(Poll(title="Silent", creator_id=test_user.id, deadline_date=now + timedelta(minutes=1)))
+    session.commit()
+
+    scheduler = DeadlineScheduler()
+    scheduler.load(session)
+
+    assert len(scheduler) == 3
+    assert scheduler.next_trigger_at() == recurring.options[0].start_time - timedelta(minutes=30)
+
+def test_load_delays_failed_triggers(session: Session, test_user):
+    now = datetime.utcnow()
+    create_onetime_poll(session, test_user, now - timedelta(minutes=5))
+
+    scheduler = DeadlineScheduler()
+    scheduler.load(session, processed_until=now, retry_delay=timedelta(seconds=60))
+
+    assert scheduler.next_trigger_at() == now + timedelta(seconds=60)
+
+def test_schedule_poll_wakes_sleeper(session: Session, test_user):
+    scheduler = DeadlineScheduler()
+    poll = create_onetime_poll(session, test_user, datetime.utcnow() + timedelta(milliseconds=50))
+
+    async def run():
+        scheduler.attach(asyncio.get_running_loop())
+        sleeper = asyncio.create_task(scheduler.sleep_until_next_trigger(max_seconds=30))
+        await asyncio.sleep(0.01)
+        assert not sleeper.done()
+        scheduler.schedule_poll(poll)
+        await asyncio.wait_for(sleeper, timeout=2)
+
+    asyncio.run(run())
+    assert scheduler.next_trigger_at() == poll.deadline_date
@@ -2,8 +2,8 @@
 import pytest
 from unittest.mock import MagicMock, patch
 from fastapi.testclient import TestClient
-from sqlmodel import Session
-from models import User, Poll, PollOption
+from sqlmodel import Session, select
+from models import User, Poll, PollOption, OutboxMessage
 from routers.discord import router
 from services.discord_service import discord_service
 from main import app
@@ -40,7 +40,7 @@ def test_share_poll_to_discord(client, session, test_user, mock_discord_service)
     session.refresh(poll)
 
     # Mock Service
-    mock_discord_service.send_poll_share_message.return_value = {"id": "msg_123"}
+    mock_discord_service.build_poll_share_message.return_value = {"content": "hello"}
 
     from dependencies import get_current_user
     app.dependency_overrides[get_current_user] = lambda: test_user
@@ -50,16 +50,27 @@ def test_share_poll_to_discord(client, session, test_user, mock_discord_service)
         "channel_id": "12345"
     }
 
-    response = client.post("/api/discord/share", json=payload)
+    response = client.post("/api/discord/share", json=payload, headers={"Idempotency-Key": "abc"})
     assert response.status_code == 200
-    assert response.json() == {"message": "Shared successfully", "discord_message_id": "msg_123"}
+    data = response.json()
+    assert data["message"] == "Share queued"
 
     # Verify service called with correct args
-    mock_discord_service.send_poll_share_message.assert_called_once()
-    args = mock_discord_service.send_poll_share_message.call_args
-    assert args.kwargs['channel_id'] == "12345"
+    mock_discord_service.build_poll_share_message.assert_called_once()
+    args = mock_discord_service.build_poll_share_message.call_args
     assert args.kwargs['poll'].id == poll.id
 
+    # The message is queued in the outbox rather than sent inline
+    message = session.get(OutboxMessage, data["outbox_message_id"])
+    assert message.status == "pending"
+    assert message.channel_id == "12345"
+    assert message.payload == {"content": "hello"}
+
+    # Retrying with the same idempotency key queues nothing new
+    retry = client.post("/api/discord/share", json=payload, headers={"Idempotency-Key": "abc"})
+    assert retry.json()["outbox_message_id"] == data["outbox_message_id"]
+    assert len(session.exec(select(OutboxMessage)).all()) == 1
+
 def test_share_nonexistent_poll(client, test_user, mock_discord_service):
     from dependencies import get_current_user
     app.dependency_overrides[get_current_user] = lambda: test_user
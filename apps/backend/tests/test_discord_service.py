@@ -0,0 +1,56 @@
+import asyncio
+import httpx
+
+from services.discord_service import DiscordService
+
+def test_pooled_client_is_reused_and_closed():
+    service = DiscordService()
+    client = service.client
+    async_client = service.async_client
+
+    assert service.client is client
+    assert service.async_client is async_client
+    assert client.timeout.connect == 5.0
+
+    asyncio.run(service.aclose())
+
+    assert client.is_closed and async_client.is_closed
+    assert service.client is not client
+    service.client.close()
+
+def test_get_guild_channels_uses_pooled_client():
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.headers["Authorization"].startswith("Bot ")
+        return httpx.Response(200, json=[
+            {"id": "2", "name": "second", "type": 0, "position": 2},
+            {"id": "1", "name": "first", "type": 0, "position": 1},
+            {"id": "3", "name": "voice", "type": 2, "position": 0},
+        ])
+
+    service = DiscordService()
+    service._client = httpx.Client(transport=httpx.MockTransport(handler), headers=service.headers)
+
+    channels = service.get_guild_channels("1")
+
+    assert [c["name"] for c in channels] == ["first", "second"]
+    service.client.close()
+
+def test_get_guild_members_follows_after_cursor(monkeypatch):
+    monkeypatch.setattr(DiscordService, "MEMBERS_PAGE_SIZE", 2)
+    members = [{"user": {"id": str(i), "username": f"user{i}", "bot": i == 2}} for i in range(1, 6)]
+    cursors = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        after = request.url.params["after"]
+        cursors.append(after)
+        page = [m for m in members if int(m["user"]["id"]) > int(after)][:2]
+        return httpx.Response(200, json=page)
+
+    service = DiscordService()
+    service._client = httpx.Client(transport=httpx.MockTransport(handler), headers=service.headers)
+
+    result = service.get_guild_members("1")
+
+    assert cursors == ["0", "2", "4"]
+    assert [m["id"] for m in result] == ["1", "3", "4", "5"]
+    service.client.close()
@@ -0,0 +1,148 @@
+from datetime import datetime, timedelta
+from sqlmodel import Session, select
+from fastapi.testclient import TestClient
+
+from models import Poll, PollOption, User, UserUnavailability, Vote
+from services.heatmap_service import HeatmapService, option_conflicts
+
+DAY = datetime(2030, 3, 4)
+
+def at(hour: float) -> datetime:
+    return DAY + timedelta(hours=hour)
+
+def test_option_conflicts_counts_users_per_option():
+    options = [(at(9), at(10)), (at(10), at(11)), (at(14), at(16))]
+    busy = [
+        (at(8), at(10), 1),          # ends as option 1 ends, before option 2
+        (at(10.5), at(10.75), 2),    # inside option 2
+        (at(15), at(20), 2),         # overlaps option 3
+        (at(15.5), at(15.75), 2),    # same user twice in option 3
+    ]
+
+    counts, unavailable = option_conflicts(options, busy, [1, 2, 3], at(9), timedelta(minutes=15))
+
+    assert counts == [1, 1, 1]
+    assert unavailable == [[1], [2], [2]]
+
+def test_poll_conflicts_uses_voters_and_creator(session: Session, test_user):
+    voter = User(discord_id="voter", username="voter")
+    bystander = User(discord_id="bystander", username="bystander")
+    session.add_all([voter, bystander])
+    poll = Poll(title="Heatmap", creator_id=test_user.id)
+    poll.options = [
+        PollOption(label="Morning", start_time=at(9), end_time=at(10)),
+        PollOption(label="Evening", start_time=at(18), end_time=at(19)),
+    ]
+    session.add(poll)
+    session.commit()
+    session.add_all([
+        Vote(poll_option_id=poll.options[0].id, user_id=voter.id),
+        UserUnavailability(user_id=test_user.id, start_time=at(8), end_time=at(9.5)),
+        UserUnavailability(user_id=voter.id, start_time=at(17), end_time=at(23)),
+        UserUnavailability(user_id=bystander.id, start_time=at(0), end_time=at(24)),
+    ])
+    session.commit()
+
+    result = HeatmapService(session).poll_conflicts(poll.id)
+
+    assert result.participant_count == 2
+    assert [(o.unavailable_count, o.unavailable_user_ids) for o in result.options] == [
+        (1, [test_user.id]),
+        (1, [voter.id]),
+    ]
+
+    everyone = HeatmapService(session).poll_conflicts(poll.id, user_ids=[test_user.id, voter.id, bystander.id])
+    assert [o.unavailable_count for o in everyone.options] == [2, 2]
+
+def test_wide_windows_get_coarser_buckets(session: Session, test_user):
+    poll = Poll(title="Year", creator_id=test_user.id)
+    poll.options = [
+        PollOption(label="Start", start_time=at(0), end_time=at(1)),
+        PollOption(label="End", start_time=at(24 * 365), end_time=at(24 * 365 + 1)),
+    ]
+    session.add(poll)
+    session.commit()
+
+    result = HeatmapService(session).poll_conflicts(poll.id, bucket=timedelta(minutes=1))
+
+    assert result.bucket_minutes == 27
+    assert [o.unavailable_count for o in result.options] == [0, 0]
+
+def create_unavailability_poll(session: Session, test_user):
+    voter = User(discord_id="voter", username="voter")
+    member = User(discord_id="member", username="member")
+    session.add_all([voter, member])
+    poll = Poll(title="Annotated", creator_id=test_user.id)
+    poll.options = [PollOption(label=f"Option {i}", start_time=at(9 + 2 * i), end_time=at(10 + 2 * i)) for i in range(5)]
+    session.add(poll)
+    session.commit()
+    session.add_all([
+        Vote(poll_option_id=poll.options[0].id, user_id=voter.id),
+        UserUnavailability(user_id=test_user.id, start_time=at(8), end_time=at(12)),   # options 0 and 1
+        UserUnavailability(user_id=voter.id, start_time=at(15), end_time=at(15.5)),     # option 3
+        UserUnavailability(user_id=member.id, start_time=at(0), end_time=at(24)),      # every option
+        UserUnavailability(user_id=voter.id, start_time=at(30), end_time=at(40)),      # outside the poll
+    ])
+    session.commit()
+    return poll, voter, member
+
+def test_option_unavailability_is_one_join(session: Session, test_user, statement_counter):
+    poll, voter, member = create_unavailability_poll(session, test_user)
+    poll_id = poll.id
+    service = HeatmapService(session)
+
+    with statement_counter() as statements:
+        result = service.option_unavailability(poll_id)
+
+    # One query for the versions, one join for every option.
+    assert len(statements) == 2
+    assert [o.unavailable_user_ids for o in result.options] == [[test_user.id], [test_user.id], [], [voter.id], []]
+
+    members = service.option_unavailability(poll_id, scope="members")
+    assert [o.unavailable_count for o in members.options] == [2, 2, 1, 2, 1]
+
+def test_option_unavailability_is_cached_per_version(session: Session, test_user, statement_counter):
+    poll, voter, member = create_unavailability_poll(session, test_user)
+    poll_id = poll.id
+    service = HeatmapService(session)
+    first = service.option_unavailability(poll_id)
+
+    with statement_counter() as statements:
+        cached = service.option_unavailability(poll_id)
+    assert len(statements) == 1
+    assert cached is first
+
+    # New availability of a participant changes the version and the result.
+    session.add(UserUnavailability(user_id=voter.id, start_time=at(13), end_time=at(13.5)))
+    session.exec(select(User).where(User.id == voter.id)).one().availability_version += 1
+    session.commit()
+    updated = service.option_unavailability(poll_id)
+    assert updated.availability_version == first.availability_version + 1
+    assert updated.options[2].unavailable_user_ids == [voter.id]
+
+    # So does a vote bringing in a new participant.
+    poll = session.get(Poll, poll_id)
+    session.add(Vote(poll_option_id=poll.options[0].id, user_id=member.id))
+    poll.version += 1
+    session.commit()
+    assert [o.unavailable_count for o in service.option_unavailability(poll_id).options] == [2, 2, 2, 2, 1]
+
+def test_unavailability_api_follows_writes(client: TestClient, session: Session, test_user):
+    from main import app
+    from dependencies import get_current_user
+
+    poll, voter, member = create_unavailability_poll(session, test_user)
+    poll_id, option_id, version = poll.id, poll.options[4].id, poll.version
+    app.dependency_overrides[get_current_user] = lambda: test_user
+
+    response = client.get(f"/api/polls/{poll_id}/unavailability")
+    assert response.status_code == 200
+    assert response.json()["options"][4]["unavailable_count"] == 0
+
+    client.post("/api/profile/unavailability", json={"start_time": at(17.5).isoformat(), "end_time": at(18).isoformat()})
+    assert client.get(f"/api/polls/{poll_id}/unavailability").json()["options"][4]["unavailable_user_ids"] == [test_user.id]
+
+    client.post("/api/votes", json={"poll_option_id": option_id})
+    assert client.get(f"/api/polls/{poll_id}/unavailability").json()["poll_version"] == version + 1
+
+    assert client.get(f"/api/polls/{poll_id}/unavailability?scope=everyone").status_code == 422
@@ -0,0 +1,34 @@
+import time
+from sqlmodel import Session
+
+from models import Lease
+from services.leader_election import LeaderElection
+
+def test_only_one_holder(session: Session):
+    first = LeaderElection("jobs")
+    second = LeaderElection("jobs")
+
+    assert first.try_acquire(session, ttl_seconds=30) is True
+    assert second.try_acquire(session, ttl_seconds=30) is False
+    # Renewal by the holder keeps succeeding
+    assert first.try_acquire(session, ttl_seconds=30) is True
+    assert session.get(Lease, "jobs").holder == first.holder_id
+
+def test_takeover_after_expiry(session: Session):
+    first = LeaderElection("jobs")
+    second = LeaderElection("jobs")
+
+    assert first.try_acquire(session, ttl_seconds=0) is True
+    time.sleep(0.01)
+
+    assert second.try_acquire(session, ttl_seconds=30) is True
+    assert first.try_acquire(session, ttl_seconds=30) is False
+
+def test_release_hands_over(session: Session):
+    first = LeaderElection("jobs")
+    second = LeaderElection("jobs")
+
+    assert first.try_acquire(session, ttl_seconds=30) is True
+    first.release(session)
+
+    assert second.try_acquire(session, ttl_seconds=30) is True
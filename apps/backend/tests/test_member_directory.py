@@ -0,0 +1,124 @@
+import threading
+import time
+import pytest
+
+from services.discord_service import discord_service
+from services.member_directory import MemberDirectory
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def member(discord_id: str, name: str = None):
+    return {"id": discord_id, "username": name or f"user{discord_id}", "display_name": name, "avatar": None}
+
+@pytest.fixture
+def pages(monkeypatch):
+    state = {"pages": [[member("1"), member("2")], [member("3")]], "calls": 0}
+
+    def fake_pages(guild_id):
+        state["calls"] += 1
+        yield from state["pages"]
+
+    monkeypatch.setattr(discord_service, "iter_guild_member_pages", fake_pages)
+    return state
+
+def test_first_read_loads_all_pages(pages):
+    directory = MemberDirectory(ttl=60, clock=FakeClock())
+
+    assert [m["id"] for m in directory.get_members("g")] == ["1", "2", "3"]
+    assert [m["id"] for m in directory.get_members("g")] == ["1", "2", "3"]
+    assert pages["calls"] == 1
+
+def test_expired_directory_refreshes_in_background(pages, monkeypatch):
+    clock = FakeClock()
+    directory = MemberDirectory(ttl=60, clock=clock)
+    directory.get_members("g")
+
+    release = threading.Event()
+
+    def slow_pages(guild_id):
+        pages["calls"] += 1
+        release.wait(2)
+        yield [member("1", "renamed"), member("4")]
+
+    monkeypatch.setattr(discord_service, "iter_guild_member_pages", slow_pages)
+
+    clock.now = 61
+    # The stale directory is served while the refresh runs, and only one refresh starts.
+    assert [m["id"] for m in directory.get_members("g")] == ["1", "2", "3"]
+    assert [m["id"] for m in directory.get_members("g")] == ["1", "2", "3"]
+
+    release.set()
+    for _ in range(200):
+        if sorted(m["id"] for m in directory.get_members("g")) == ["1", "4"]:
+            break
+        time.sleep(0.01)
+
+    members = {m["id"]: m for m in directory.get_members("g")}
+    assert sorted(members) == ["1", "4"]
+    assert members["1"]["display_name"] == "renamed"
+    assert pages["calls"] == 2
+
+def test_upsert_updates_single_member(pages):
+    directory = MemberDirectory(ttl=60, clock=FakeClock())
+    directory.get_members("g")
+
+    directory.upsert("g", member("9", "newcomer"))
+
+    assert [m["id"] for m in directory.get_members("g")] == ["1", "2", "3", "9"]
+    assert pages["calls"] == 1
+
+def test_failed_first_load_raises(monkeypatch):
+    def failing(guild_id):
+        raise RuntimeError("discord down")
+        yield
+
+    monkeypatch.setattr(discord_service, "iter_guild_member_pages", failing)
+
+    with pytest.raises(RuntimeError):
+        MemberDirectory(ttl=60).get_members("g")
+
+def test_failed_first_page_is_not_served_and_retries_back_off(monkeypatch):
+    state = {"calls": 0}
+
+    def partial(guild_id):
+        state["calls"] += 1
+        yield [member("1")]
+        raise RuntimeError("discord down")
+
+    monkeypatch.setattr(discord_service, "iter_guild_member_pages", partial)
+    clock = FakeClock()
+    directory = MemberDirectory(ttl=60, clock=clock, retry_after=30)
+
+    with pytest.raises(RuntimeError):
+        directory.get_members("g")
+    # Within the retry interval nothing is served and Discord is not asked again.
+    with pytest.raises(RuntimeError):
+        directory.get_members("g")
+    assert state["calls"] == 1
+
+    clock.now = 30
+    monkeypatch.setattr(discord_service, "iter_guild_member_pages", lambda guild_id: iter([[member("1"), member("2")]]))
+    assert [m["id"] for m in directory.get_members("g")] == ["1", "2"]
+
+def test_failed_background_refresh_backs_off(pages, monkeypatch):
+    clock = FakeClock()
+    directory = MemberDirectory(ttl=60, clock=clock, retry_after=30)
+    directory.get_members("g")
+
+    def failing(guild_id):
+        pages["calls"] += 1
+        raise RuntimeError("discord down")
+        yield
+
+    monkeypatch.setattr(discord_service, "iter_guild_member_pages", failing)
+    clock.now = 61
+    assert directory.refresh("g") == 3
+
+    # The old directory keeps being served without starting another pass.
+    assert [m["id"] for m in directory.get_members("g")] == ["1", "2", "3"]
+    assert pages["calls"] == 2
@@ -0,0 +1,32 @@
+from sqlmodel import Session, select
+
+from models import User
+from services.member_sync_service import MemberSyncService
+
+def member(discord_id: str, name: str, avatar: str = None):
+    return {"id": discord_id, "username": name, "display_name": name.title(), "avatar": avatar}
+
+def test_sync_inserts_updates_and_skips_unchanged(session: Session, test_user):
+    service = MemberSyncService(session)
+    members = [member("1001", "alice"), member("1002", "bob", avatar="abc")]
+
+    assert service.sync(members) == 2
+    assert service.sync(members) == 0
+
+    members[0] = member("1001", "alice", avatar="new")
+    assert service.sync(members) == 1
+
+    session.expire_all()
+    alice = session.exec(select(User).where(User.discord_id == "1001")).one()
+    assert alice.avatar_url == "https://cdn.discordapp.com/avatars/1001/new.png"
+    assert alice.display_name == "Alice"
+    # Users that are not guild members (e.g. the fixture user) are kept.
+    assert session.get(User, test_user.id) is not None
+
+def test_sync_is_one_statement_per_chunk(session: Session, statement_counter):
+    members = [member(str(2000 + i), f"user{i}") for i in range(25)]
+    with statement_counter() as statements:
+        changed = MemberSyncService(session).sync(members, chunk_size=10)
+
+    assert changed == 25
+    assert len([statement for statement, _ in statements if statement.startswith("INSERT")]) == 3
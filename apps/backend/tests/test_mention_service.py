@@ -0,0 +1,211 @@
+import pytest
+from datetime import datetime, timedelta
+from sqlmodel import Session, select
+
+from config import Settings, settings
+from models import AffinityEpoch, User, UserMention
+from services.mention_service import mention_service, AFFINITY_EPOCH, AFFINITY_REBASE_HALF_LIVES
+
+def create_users(session: Session, count: int):
+    users = [User(discord_id=f"target_{i}", username=f"target{i}") for i in range(count)]
+    session.add_all(users)
+    session.commit()
+    return [u.id for u in users]
+
+def test_record_mentions_is_one_statement(session: Session, test_user, statement_counter):
+    target_ids = create_users(session, 50)
+    creator_id = test_user.id
+    mention_service.affinity_epoch(session, datetime.utcnow()) # read once per process
+
+    with statement_counter() as statements:
+        mention_service.record_mentions(session, creator_id, target_ids)
+
+    assert len(statements) == 1
+    assert statements[0][0].startswith("INSERT INTO usermention")
+    assert len(session.exec(select(UserMention)).all()) == 50
+
+def test_record_mentions_accumulates_affinity(session: Session, test_user):
+    target_ids = create_users(session, 2)
+    creator_id = test_user.id
+
+    mention_service.record_mentions(session, creator_id, target_ids)
+    mention_service.record_mentions(session, creator_id, target_ids[:1])
+
+    ranked = mention_service.get_ranked_mentions(session, creator_id, limit=2)
+    assert [u.id for u in ranked] == target_ids
+    assert ranked[0].affinity == pytest.approx(2.0, rel=1e-3)
+    assert ranked[1].affinity == pytest.approx(1.0, rel=1e-3)
+
+def test_frequent_older_mentions_outrank_one_recent(session: Session, test_user):
+    target_ids = create_users(session, 2)
+    session.add(mention(test_user.id, target_ids[0], 0))
+    # Three mentions 40 days ago are worth 3 * 2^(-40/30) ~ 1.19 today.
+    session.add(mention(test_user.id, target_ids[1], 40, 40, 40))
+    session.commit()
+
+    ranked = mention_service.get_ranked_mentions(session, test_user.id, limit=5)
+
+    assert [u.id for u in ranked[:2]] == [target_ids[1], target_ids[0]]
+    assert ranked[0].affinity == pytest.approx(3 * 2 ** (-40 / 30), rel=1e-3)
+
+def test_top_candidates_read_affinity_index(session: Session, test_user, statement_counter):
+    creator_id = test_user.id
+    with statement_counter() as captured:
+        mention_service.get_ranked_mentions(session, creator_id, limit=5)
+
+    statement, parameters = captured[0]
+    plan = " ".join(str(row) for row in session.connection().exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters))
+    assert "ix_usermention_creator_affinity" in plan
+    assert "TEMP B-TREE" not in plan
+
+def test_record_mentions_updates_existing(session: Session, test_user, statement_counter):
+    target_ids = create_users(session, 3)
+    old = datetime.utcnow() - timedelta(days=30)
+    session.add(UserMention(creator_id=test_user.id, target_user_id=target_ids[0], last_mentioned_at=old))
+    session.commit()
+    creator_id = test_user.id
+    mention_service.affinity_epoch(session, datetime.utcnow())
+
+    # Duplicates in the input are recorded once.
+    with statement_counter() as statements:
+        mention_service.record_mentions(session, creator_id, [target_ids[0], target_ids[1], target_ids[0]])
+    session.expire_all()
+
+    assert len(statements) == 1
+    mentions = {m.target_user_id: m for m in session.exec(select(UserMention)).all()}
+    assert sorted(mentions) == target_ids[:2]
+    assert mentions[target_ids[0]].last_mentioned_at > old
+
+def test_rebase_keeps_decayed_affinity(session: Session, test_user):
+    target_ids = create_users(session, 2)
+    session.add(mention(test_user.id, target_ids[0], 0, 3))
+    session.add(mention(test_user.id, target_ids[1], 10))
+    session.commit()
+    later = datetime.utcnow() + timedelta(days=300 * 30)
+    before = {m.target_user_id: m.affinity * mention_service.decay(later, AFFINITY_EPOCH) for m in session.exec(select(UserMention)).all()}
+
+    assert mention_service.rebase_affinity(session, later)
+    assert not mention_service.rebase_affinity(session, later)
+
+    epoch = session.get(AffinityEpoch, 1).epoch
+    assert mention_service.half_lives(epoch, later) < 1
+    session.expire_all()
+    for m in session.exec(select(UserMention)).all():
+        assert m.affinity * mention_service.decay(later, epoch) == pytest.approx(before[m.target_user_id], rel=1e-9)
+
+def test_short_half_life_rebases_instead_of_overflowing(session: Session, test_user, monkeypatch):
+    target_ids = create_users(session, 1)
+    session.add(mention(test_user.id, target_ids[0], 0))
+    session.commit()
+    # More than 1024 half-lives since AFFINITY_EPOCH: 2^half_lives no longer fits a float.
+    monkeypatch.setattr(settings, "MENTION_AFFINITY_HALF_LIFE_DAYS", 0.25)
+    assert mention_service.half_lives(AFFINITY_EPOCH, datetime.utcnow()) > 1024
+
+    mention_service.record_mentions(session, test_user.id, target_ids)
+
+    assert mention_service.half_lives(session.get(AffinityEpoch, 1).epoch, datetime.utcnow()) < AFFINITY_REBASE_HALF_LIVES
+    ranked = mention_service.get_ranked_mentions(session, test_user.id, limit=1)
+    assert ranked[0].affinity == pytest.approx(1.0, rel=1e-3)
+
+def test_half_life_must_be_at_least_a_day():
+    with pytest.raises(ValueError):
+        Settings(MENTION_AFFINITY_HALF_LIFE_DAYS=0.01)
+
+def mention(creator_id: int, target_id: int, *ages_in_days: float) -> UserMention:
+    now = datetime.utcnow()
+    times = [now - timedelta(days=age) for age in ages_in_days]
+    return UserMention(
+        creator_id=creator_id,
+        target_user_id=target_id,
+        last_mentioned_at=max(times),
+        affinity=sum(mention_service.mention_weight(t) for t in times)
+    )
+
+def test_ranked_mentions_orders_by_affinity_then_name(session: Session, test_user):
+    session.add_all([
+        User(discord_id="d1", username="zed"),
+        User(discord_id="d2", username="amy", display_name="Amy"),
+        User(discord_id="d3", username="bob"),
+    ])
+    session.commit()
+    ids = {u.username: u.id for u in session.exec(select(User)).all()}
+    session.add(mention(test_user.id, ids["bob"], 2))
+    session.add(mention(test_user.id, ids["zed"], 0))
+    # Mentions by other creators do not count.
+    session.add(mention(ids["amy"], ids["amy"], 0, 0, 0))
+    session.commit()
+
+    ranked = mention_service.get_ranked_mentions(session, test_user.id, limit=3)
+
+    assert [u.username for u in ranked] == ["zed", "bob", "amy"]
+    assert ranked[2].last_mentioned_at is None
+    assert not hasattr(ranked[0], "discord_id")
+
+def test_ranked_mentions_prefix_search(session: Session, test_user):
+    session.add_all([
+        User(discord_id="d1", username="alice"),
+        User(discord_id="d2", username="xyz", display_name="Alfred"),
+        User(discord_id="d3", username="albatross_bot", display_name="Bird"),
+        User(discord_id="d4", username="bob", display_name="Al"),
+        User(discord_id="d5", username="carol"),
+    ])
+    session.commit()
+
+    names = [u.username for u in mention_service.get_ranked_mentions(session, test_user.id, query="@AL")]
+    assert sorted(names) == ["albatross_bot", "alice", "bob", "xyz"]
+    assert [u.username for u in mention_service.get_ranked_mentions(session, test_user.id, query="alf")] == ["xyz"]
+
+def test_database_prefix_search_ignores_case(session: Session, test_user):
+    session.add_all([
+        User(discord_id="d1", username="Zed"),
+        User(discord_id="d2", username="eliza", display_name="LIZ Taylor"),
+        User(discord_id="d3", username="x_y"),
+        User(discord_id="d4", username="x@home"),
+    ])
+    session.commit()
+
+    def search(prefix):
+        return sorted(u.username for u in mention_service._search_database(session, test_user.id, prefix, 20))
+
+    assert search("Z") == ["Zed"]
+    assert search("z") == ["Zed"]
+    assert search("LIZ") == ["eliza"]
+    assert search("lIz") == ["eliza"]
+    # '_' sorts between '@' and 'a'; it must not match "x@".
+    assert search("x@") == ["x@home"]
+
+def test_database_prefix_search_uses_indexes(session: Session, test_user, statement_counter):
+    with statement_counter() as captured:
+        mention_service._search_database(session, test_user.id, "al", 20)
+
+    statement, parameters = next((s, p) for s, p in captured if "usermention" in s)
+    plan = " ".join(str(row) for row in session.connection().exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters))
+    assert "ix_user_username_nocase" in plan
+    assert "ix_user_display_name_nocase" in plan
+
+def test_prefix_search_ranks_index_matches_by_recency(session: Session, test_user):
+    session.add_all([
+        User(discord_id="d1", username="samwise", display_name="Sam Gamgee"),
+        User(discord_id="d2", username="gandalf", display_name="Mithrandir"),
+        User(discord_id="d3", username="galadriel"),
+    ])
+    session.commit()
+    ids = {u.username: u.id for u in session.exec(select(User)).all()}
+    session.add(mention(test_user.id, ids["samwise"], 0))
+    session.commit()
+
+    # "ga" matches usernames and the second word of "Sam Gamgee".
+    ranked = mention_service.get_ranked_mentions(session, test_user.id, query="ga")
+    assert [u.username for u in ranked] == ["samwise", "galadriel", "gandalf"]
+    assert ranked[0].last_mentioned_at is not None
+
+def test_get_candidates_resolves_selected_ids(session: Session, test_user):
+    target_ids = create_users(session, 30)
+    creator_id = test_user.id
+    mention_service.record_mentions(session, creator_id, [target_ids[0]])
+
+    # Users outside the top results still resolve, with their affinity.
+    candidates = mention_service.get_candidates(session, creator_id, [target_ids[-1], target_ids[0], 9999])
+
+    assert [c.id for c in candidates] == [target_ids[0], target_ids[-1]]
+    assert candidates[0].affinity > 0 and candidates[1].affinity == 0
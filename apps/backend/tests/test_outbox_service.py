@@ -0,0 +1,105 @@
+import asyncio
+import httpx
+from datetime import datetime, timedelta
+from sqlmodel import Session, select
+
+from models import OutboxMessage
+from services.outbox_service import outbox_service
+from services.discord_service import discord_service
+
+def queue_messages(session: Session, count: int):
+    ids = [outbox_service.enqueue(session, f"test:{i}", "123", {"content": f"Message {i}"}) for i in range(count)]
+    session.commit()
+    return ids
+
+def deliver(session: Session):
+    messages = outbox_service.fetch_due(session, datetime.utcnow(), 50)
+    results = asyncio.run(outbox_service.deliver_batch(messages, concurrency=3))
+    outbox_service.record_results(session, messages, results)
+    session.expire_all()
+    return results
+
+def http_error(status_code: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", "https://discord.com/api/v10/channels/123/messages")
+    return httpx.HTTPStatusError("error", request=request, response=httpx.Response(status_code, request=request, text="nope"))
+
+def test_enqueue_is_idempotent(session: Session):
+    first = outbox_service.enqueue(session, "share:1", "123", {"content": "a"})
+    second = outbox_service.enqueue(session, "share:1", "123", {"content": "b"})
+    session.commit()
+
+    assert first == second
+    messages = session.exec(select(OutboxMessage)).all()
+    assert len(messages) == 1
+    assert messages[0].payload == {"content": "a"}
+
+def test_delivery_is_concurrent_and_marks_sent(session: Session, monkeypatch):
+    active = 0
+    peak = 0
+    nonces = []
+
+    async def fake_post(channel_id, payload, nonce=None):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        nonces.append(nonce)
+        return {"id": f"discord-{payload['content']}"}
+
+    monkeypatch.setattr(discord_service, "post_message", fake_post)
+    ids = queue_messages(session, 7)
+
+    deliver(session)
+
+    assert peak == 3
+    assert len(set(nonces)) == 7
+    assert all(len(n) <= 25 for n in nonces)
+    for message_id in ids:
+        message = session.get(OutboxMessage, message_id)
+        assert message.status == "sent"
+        assert message.discord_message_id.startswith("discord-")
+
+def test_transient_failure_backs_off(session: Session, monkeypatch):
+    async def failing_post(channel_id, payload, nonce=None):
+        raise http_error(503)
+
+    monkeypatch.setattr(discord_service, "post_message", failing_post)
+    [message_id] = queue_messages(session, 1)
+
+    deliver(session)
+
+    message = session.get(OutboxMessage, message_id)
+    assert message.status == "pending"
+    assert message.attempts == 1
+    assert message.next_attempt_at > datetime.utcnow()
+    assert "503" in message.last_error
+    assert outbox_service.fetch_due(session, datetime.utcnow(), 50) == []
+
+def test_permanent_failure_is_dead_lettered(session: Session, monkeypatch):
+    async def forbidden_post(channel_id, payload, nonce=None):
+        raise http_error(403)
+
+    monkeypatch.setattr(discord_service, "post_message", forbidden_post)
+    [message_id] = queue_messages(session, 1)
+
+    deliver(session)
+
+    assert session.get(OutboxMessage, message_id).status == "dead"
+
+def test_max_attempts_dead_letters(session: Session, monkeypatch):
+    monkeypatch.setattr(outbox_service, "backoff", lambda attempt: timedelta(0))
+    monkeypatch.setattr("services.outbox_service.settings.OUTBOX_MAX_ATTEMPTS", 3)
+
+    async def failing_post(channel_id, payload, nonce=None):
+        raise httpx.ConnectError("connection refused")
+
+    monkeypatch.setattr(discord_service, "post_message", failing_post)
+    [message_id] = queue_messages(session, 1)
+
+    for _ in range(3):
+        deliver(session)
+
+    message = session.get(OutboxMessage, message_id)
+    assert message.attempts == 3
+    assert message.status == "dead"
@@ -100,3 +100,48 @@ def test_list_polls(session, test_user):
     titles = [p.title for p in polls]
     assert "P1" in titles
     assert "P2" in titles
+
+def test_poll_results(session, test_user):
+    from models import User, Vote
+    service = PollService(session)
+    start = datetime.utcnow() + timedelta(days=1)
+    poll = service.create_poll(PollCreate(
+        title="Results Poll",
+        options=[
+            PollOptionCreate(label="A", start_time=start, end_time=start + timedelta(hours=1)),
+            PollOptionCreate(label="B", start_time=start + timedelta(days=1), end_time=start + timedelta(days=1, hours=1)),
+            PollOptionCreate(label="C", start_time=start + timedelta(days=2), end_time=start + timedelta(days=2, hours=1)),
+        ]
+    ), test_user)
+    other = User(discord_id="other_discord", username="other")
+    session.add(other)
+    session.commit()
+    a, b, c = sorted(poll.options, key=lambda o: o.start_time)
+    session.add(Vote(poll_option_id=b.id, user_id=test_user.id))
+    session.add(Vote(poll_option_id=b.id, user_id=other.id))
+    session.add(Vote(poll_option_id=a.id, user_id=other.id))
+    session.commit()
+
+    results = service.results(poll.id)
+
+    assert results.total_votes == 3
+    assert results.voter_count == 2
+    assert [(t.label, t.votes) for t in results.tally] == [("B", 2), ("A", 1), ("C", 0)]
+    assert [t.label for t in results.top_options] == ["B"]
+    assert sorted(results.voter_discord_ids) == sorted([test_user.discord_id, "other_discord"])
+
+def test_poll_results_without_votes(session, test_user):
+    service = PollService(session)
+    start = datetime.utcnow() + timedelta(days=1)
+    poll = service.create_poll(PollCreate(
+        title="Empty Poll",
+        options=[PollOptionCreate(label="A", start_time=start, end_time=start + timedelta(hours=1))]
+    ), test_user)
+
+    results = service.results(poll.id)
+
+    assert results.total_votes == 0
+    assert results.top_options == []
+    with pytest.raises(HTTPException) as exc:
+        service.results(poll.id + 1000)
+    assert exc.value.status_code == 404
@@ -1,6 +1,6 @@
 
 import pytest
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from fastapi.testclient import TestClient
 from sqlmodel import Session, select
 from models import User, UserUnavailability
@@ -98,3 +98,42 @@ def test_create_unavailability_invalid_times(client: TestClient):
 
     response = client.post("/api/profile/unavailability", json=payload)
     assert response.status_code == 400
+
+def test_get_unavailability_window(client: TestClient, session: Session, test_user: User):
+    day = datetime(2030, 6, 3)
+    for offset in [-400, -10, 0, 1, 2, 40]: # days from `day`
+        start = day + timedelta(days=offset, hours=9)
+        session.add(UserUnavailability(user_id=test_user.id, start_time=start, end_time=start + timedelta(hours=8)))
+    # Spans into the window from before it.
+    session.add(UserUnavailability(user_id=test_user.id, start_time=day - timedelta(days=1), end_time=day + timedelta(hours=1)))
+    session.commit()
+
+    params = {"from": day.isoformat(), "to": (day + timedelta(days=2)).isoformat()}
+    response = client.get("/api/profile/unavailability", params=params)
+    assert response.status_code == 200
+    starts = [block["start_time"] for block in response.json()]
+    assert starts == ["2030-06-02T00:00:00Z", "2030-06-03T09:00:00Z", "2030-06-04T09:00:00Z"]
+
+    compact = client.get("/api/profile/unavailability", params={**params, "format": "compact"}).json()
+    epoch = lambda dt: int(dt.replace(tzinfo=timezone.utc).timestamp())
+    assert [block[1:] for block in compact["blocks"]] == [
+        [epoch(day - timedelta(days=1)), epoch(day + timedelta(hours=1))],
+        [epoch(day + timedelta(hours=9)), epoch(day + timedelta(hours=17))],
+        [epoch(day + timedelta(days=1, hours=9)), epoch(day + timedelta(days=1, hours=17))],
+    ]
+
+    assert len(client.get("/api/profile/unavailability").json()) == 7
+    assert client.get("/api/profile/unavailability", params={"from": params["to"], "to": params["from"]}).status_code == 400
+    # An offset-aware bound with a naive one: compared after normalizing both to UTC.
+    mixed = client.get("/api/profile/unavailability", params={"from": "2030-06-03T02:00:00+02:00", "to": params["to"]})
+    assert mixed.status_code == 200
+    assert len(mixed.json()) == 3
+
+def test_unavailability_window_uses_index(session: Session, test_user: User):
+    from sqlalchemy import text
+
+    plan = session.connection().execute(text(
+        "EXPLAIN QUERY PLAN SELECT id, start_time, end_time FROM userunavailability "
+        "WHERE user_id = 1 AND end_time > '2030-01-01' AND start_time < '2030-02-01' ORDER BY start_time"
+    )).all()
+    assert "ix_userunavailability_user_end_start (user_id=? AND end_time>?)" in " ".join(row[-1] for row in plan)
@@ -0,0 +1,74 @@
+import httpx
+
+from services.rate_limiter import RateLimiter, route_key
+
+MESSAGES_URL = "https://discord.com/api/v10/channels/123/messages"
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def response(status_code=200, remaining=4, reset_after=2.0, bucket="abc", json=None, **headers):
+    return httpx.Response(status_code, json=json or {}, headers={
+        "X-RateLimit-Limit": "5",
+        "X-RateLimit-Remaining": str(remaining),
+        "X-RateLimit-Reset-After": str(reset_after),
+        "X-RateLimit-Bucket": bucket,
+        **headers
+    })
+
+def test_route_key_keeps_major_parameter():
+    assert route_key("post", MESSAGES_URL) == ("POST /api/v10/channels/{id}/messages", "123")
+    assert route_key("GET", "https://discord.com/api/v10/guilds/1/members/42") == ("GET /api/v10/guilds/{id}/members/{id}", "1")
+
+def test_requests_are_paced_once_bucket_is_exhausted():
+    clock = FakeClock()
+    limiter = RateLimiter(clock=clock)
+
+    assert limiter.acquire("POST", MESSAGES_URL) == 0
+    limiter.update("POST", MESSAGES_URL, response(remaining=1, reset_after=2.0))
+
+    delays = [limiter.acquire("POST", MESSAGES_URL) for _ in range(7)]
+
+    # One request left in this window, then 5 per 2 second window.
+    assert delays == [0, 2.0, 2.0, 2.0, 2.0, 2.0, 4.0]
+    # Another channel has its own limit.
+    assert limiter.acquire("POST", "https://discord.com/api/v10/channels/456/messages") == 0
+
+    metrics = limiter.metrics()
+    assert metrics.delayed_requests == 6
+    bucket = next(b for b in metrics.buckets if b.bucket == "abc:123")
+    assert bucket.routes == ["POST /api/v10/channels/{id}/messages"]
+    assert bucket.queued_for == 4.0
+
+def test_429_blocks_bucket_for_retry_after():
+    clock = FakeClock()
+    limiter = RateLimiter(clock=clock)
+
+    limiter.acquire("POST", MESSAGES_URL)
+    retry_after = limiter.update("POST", MESSAGES_URL, response(429, remaining=0, json={"retry_after": 3.5}))
+
+    assert retry_after == 3.5
+    assert limiter.acquire("POST", MESSAGES_URL) == 3.5
+    assert limiter.metrics().rate_limited_responses == 1
+
+def test_global_429_blocks_every_route():
+    clock = FakeClock()
+    limiter = RateLimiter(clock=clock)
+
+    limiter.acquire("POST", MESSAGES_URL)
+    limiter.update("POST", MESSAGES_URL, response(429, json={"retry_after": 1.5, "global": True}, **{"X-RateLimit-Global": "true"}))
+
+    assert limiter.acquire("GET", "https://discord.com/api/v10/guilds/1/channels") == 1.5
+    assert limiter.metrics().global_blocked_for == 1.5
+
+def test_global_limit_per_second():
+    clock = FakeClock()
+    limiter = RateLimiter(global_limit=3, clock=clock)
+
+    delays = [limiter.acquire("GET", f"https://discord.com/api/v10/guilds/{i}/channels") for i in range(4)]
+
+    assert delays == [0, 0, 0, 1.0]
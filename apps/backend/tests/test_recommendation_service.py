@@ -0,0 +1,137 @@
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+import tasks
+from models import Poll, PollOption, User, UserUnavailability, Vote
+from services.recommendation_service import RecommendationService
+
+DEADLINE = datetime(2030, 4, 1, 12)
+
+def option(label: str, days_after_deadline: float) -> PollOption:
+    start = DEADLINE + timedelta(days=days_after_deadline)
+    return PollOption(label=label, start_time=start, end_time=start + timedelta(hours=2))
+
+def create_poll(session: Session, test_user: User):
+    voters = [User(discord_id=f"voter{i}", username=f"voter{i}") for i in range(3)]
+    mentioned = User(discord_id="mentioned", username="mentioned")
+    outsider = User(discord_id="outsider", username="outsider")
+    session.add_all(voters + [mentioned, outsider])
+    session.commit()
+    poll = Poll(title="Pick one", creator_id=test_user.id, deadline_date=DEADLINE, deadline_channel_id="123", deadline_mention_ids=[mentioned.id])
+    poll.options = [
+        option("Popular", 3),    # 2 votes, but the mentioned user and a voter are away
+        option("Soon", 1),       # 1 vote
+        option("Later", 10),     # 1 vote
+        option("Too early", -1), # 3 votes, starts before the deadline
+    ]
+    session.add(poll)
+    session.commit()
+    popular, soon, later, early = poll.options
+    session.add_all(
+        [Vote(poll_option_id=popular.id, user_id=voters[i].id) for i in range(2)]
+        + [Vote(poll_option_id=soon.id, user_id=voters[2].id), Vote(poll_option_id=later.id, user_id=voters[0].id)]
+        + [Vote(poll_option_id=early.id, user_id=voter.id) for voter in voters]
+        + [
+            UserUnavailability(user_id=mentioned.id, start_time=popular.start_time, end_time=popular.end_time),
+            UserUnavailability(user_id=voters[2].id, start_time=popular.start_time - timedelta(hours=1), end_time=popular.start_time + timedelta(hours=1)),
+            UserUnavailability(user_id=outsider.id, start_time=soon.start_time, end_time=soon.end_time), # not involved
+        ]
+    )
+    session.commit()
+    return poll, voters, mentioned
+
+def test_recommendation_ranks_by_votes_unavailability_and_proximity(session: Session, test_user):
+    poll, voters, mentioned = create_poll(session, test_user)
+
+    result = RecommendationService(session).recommend(poll.id)
+
+    assert [o.label for o in result.options] == ["Soon", "Later", "Popular", "Too early"]
+    soon, later, popular, early = result.options
+    assert (popular.votes, popular.unavailable_count) == (2, 2)
+    assert soon.unavailable_count == 0 # the outsider neither voted nor was mentioned
+    assert soon.proximity > later.proximity > 0
+    assert early.starts_before_deadline and early.proximity == 0
+
+def test_recommendation_is_cached_per_version(session: Session, test_user, statement_counter):
+    poll, voters, mentioned = create_poll(session, test_user)
+    poll_id = poll.id
+    service = RecommendationService(session)
+    first = service.recommend(poll_id)
+
+    with statement_counter() as statements:
+        cached = service.recommend(poll_id)
+    assert cached is first
+    assert len(statements) == 2 # the poll row and the availability version
+
+    # A vote bumps the poll version and changes the ranking.
+    session.add(Vote(poll_option_id=first.options[1].option_id, user_id=voters[1].id))
+    session.get(Poll, poll_id).version += 1
+    session.commit()
+    assert service.recommend(poll_id).options[0].label == "Later"
+
+def test_recommendation_api(client: TestClient, session: Session, test_user):
+    poll, voters, mentioned = create_poll(session, test_user)
+
+    response = client.get(f"/api/polls/{poll.id}/recommendation")
+
+    assert response.status_code == 200
+    assert response.json()["options"][0]["label"] == "Soon"
+    assert client.get("/api/polls/999/recommendation").status_code == 404
+
+def test_deadline_notifier_announces_recommendation(session: Session, test_user):
+    poll, voters, mentioned = create_poll(session, test_user)
+    poll_id = poll.id
+
+    notifications = tasks.process_due_deadlines(session, DEADLINE + timedelta(minutes=1))
+    # "Too early" has the most votes, but starts before the poll closes.
+    assert notifications[0].result_text == "Winner: **Soon** (1 votes)"
+
+    # The mentioned user frees up "Popular"; with a third vote it now wins despite one absence.
+    session.query(UserUnavailability).filter(UserUnavailability.user_id == mentioned.id).delete()
+    session.get(User, mentioned.id).availability_version += 1
+    session.add(Vote(poll_option_id=poll.options[0].id, user_id=voters[2].id))
+    poll = session.get(Poll, poll_id)
+    poll.version += 1
+    poll.deadline_notification_sent = False
+    session.commit()
+
+    notifications = tasks.process_due_deadlines(session, DEADLINE + timedelta(minutes=1))
+    assert notifications[0].result_text == "Winner: **Popular** (3 votes), 1 unavailable"
+
+def test_deadline_notifier_never_announces_an_option_without_votes(session: Session, test_user):
+    voters = [User(discord_id=f"v{i}", username=f"v{i}") for i in range(2)]
+    session.add_all(voters)
+    poll = Poll(title="Close call", creator_id=test_user.id, deadline_date=DEADLINE, deadline_channel_id="123")
+    poll.options = [option("Before", -1 / 24), option("Nobody", 2)]
+    session.add(poll)
+    session.commit()
+    session.add_all([Vote(poll_option_id=poll.options[0].id, user_id=voter.id) for voter in voters])
+    session.commit()
+
+    notifications = tasks.process_due_deadlines(session, DEADLINE + timedelta(minutes=1))
+
+    assert notifications[0].result_text == "Winner: **Before** (2 votes)"
+
+def test_string_encoded_mention_ids(client: TestClient, session: Session, test_user):
+    poll, voters, mentioned = create_poll(session, test_user)
+    # Rows written before the column held a list store the ids as a JSON string.
+    poll.deadline_mention_ids = f'[{mentioned.id}, "x"]'
+    session.add(poll)
+    session.commit()
+
+    assert RecommendationService(session).recommend(poll.id).options[0].label == "Soon"
+    assert client.get(f"/api/polls/{poll.id}/recommendation").status_code == 200
+    notifications = tasks.process_due_deadlines(session, DEADLINE + timedelta(minutes=1))
+    assert notifications[0].result_text == "Winner: **Soon** (1 votes)"
+    assert "mentioned" in notifications[0].mention_discord_ids
+
+def test_deadline_notifier_falls_back_to_vote_leader(session: Session, test_user, monkeypatch):
+    poll, voters, mentioned = create_poll(session, test_user)
+
+    def broken(self, poll_id):
+        raise RuntimeError("ranking failed")
+    monkeypatch.setattr(RecommendationService, "recommend", broken)
+
+    notifications = tasks.process_due_deadlines(session, DEADLINE + timedelta(minutes=1))
+    assert notifications[0].result_text == "Winner: **Too early** (3 votes)"
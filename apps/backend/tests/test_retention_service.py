@@ -0,0 +1,136 @@
+import pytest
+from datetime import datetime, timedelta
+from sqlmodel import Session, select
+from fastapi import HTTPException
+
+from models import Poll, PollOption, Vote, ArchivedPoll, ArchivedVote
+from services.poll_service import PollService
+from services.retention_service import RetentionService
+
+def create_poll_with_vote(session: Session, user, title: str, ended_days_ago: int) -> Poll:
+    end = datetime.utcnow() - timedelta(days=ended_days_ago)
+    poll = Poll(title=title, creator_id=user.id)
+    poll.options = [PollOption(label="Opt", start_time=end - timedelta(hours=1), end_time=end)]
+    session.add(poll)
+    session.commit()
+    session.refresh(poll)
+    session.add(Vote(poll_option_id=poll.options[0].id, user_id=user.id))
+    session.commit()
+    return poll
+
+def test_archive_moves_old_polls(session: Session, test_user):
+    old_poll = create_poll_with_vote(session, test_user, "Old", ended_days_ago=200)
+    recent_poll = create_poll_with_vote(session, test_user, "Recent", ended_days_ago=10)
+    old_poll_id = old_poll.id
+
+    archived = RetentionService(session).archive_polls(older_than_days=180)
+    session.expire_all()
+
+    assert archived == 1
+    assert session.get(Poll, old_poll_id) is None
+    assert session.get(Poll, recent_poll.id) is not None
+    assert session.exec(select(PollOption).where(PollOption.poll_id == old_poll_id)).all() == []
+
+    archived_poll = session.get(ArchivedPoll, old_poll_id)
+    assert archived_poll.title == "Old"
+    assert len(archived_poll.options) == 1
+    assert len(archived_poll.options[0].votes) == 1
+    assert len(session.exec(select(Vote)).all()) == 1
+
+def test_archive_in_batches(session: Session, test_user):
+    for i in range(5):
+        create_poll_with_vote(session, test_user, f"Old {i}", ended_days_ago=365)
+
+    archived = RetentionService(session).archive_polls(older_than_days=180, batch_size=2)
+
+    assert archived == 5
+    assert session.exec(select(Poll)).all() == []
+    assert len(session.exec(select(ArchivedVote)).all()) == 5
+
+def test_include_archived_reads(session: Session, test_user):
+    old_poll = create_poll_with_vote(session, test_user, "Old", ended_days_ago=200)
+    create_poll_with_vote(session, test_user, "Recent", ended_days_ago=1)
+    old_poll_id = old_poll.id
+    RetentionService(session).archive_polls(older_than_days=180)
+
+    service = PollService(session)
+    assert [p.title for p in service.list_polls()] == ["Recent"]
+    assert sorted(p.title for p in service.list_polls(include_archived=True)) == ["Old", "Recent"]
+
+    fetched = service.get_poll(old_poll_id, include_archived=True)
+    assert fetched.archived_at is not None
+    assert fetched.options[0].votes[0].user.id == test_user.id
+
+def test_delete_poll_is_soft(session: Session, test_user):
+    poll = create_poll_with_vote(session, test_user, "Doomed", ended_days_ago=-1)
+    service = PollService(session)
+
+    service.delete_poll(poll.id, test_user)
+    session.expire_all()
+
+    assert session.get(Poll, poll.id).deleted_at is not None
+    assert service.list_polls() == []
+    with pytest.raises(HTTPException) as exc:
+        service.get_poll(poll.id)
+    assert exc.value.status_code == 404
+
+def test_purge_deleted_polls_in_chunks(session: Session, test_user):
+    doomed = Poll(title="Doomed", creator_id=test_user.id)
+    start = datetime.utcnow() + timedelta(days=1)
+    doomed.options = [
+        PollOption(label=f"Opt {i}", start_time=start + timedelta(days=i), end_time=start + timedelta(days=i, hours=1))
+        for i in range(7)
+    ]
+    kept = create_poll_with_vote(session, test_user, "Kept", ended_days_ago=-1)
+    session.add(doomed)
+    session.commit()
+    for option in doomed.options:
+        session.add(Vote(poll_option_id=option.id, user_id=test_user.id))
+    session.commit()
+    PollService(session).delete_poll(doomed.id, test_user)
+
+    purged = RetentionService(session).purge_deleted_polls(chunk_size=3)
+    session.expire_all()
+
+    assert purged == 1
+    assert [p.id for p in session.exec(select(Poll)).all()] == [kept.id]
+    assert len(session.exec(select(PollOption)).all()) == 1
+    assert len(session.exec(select(Vote)).all()) == 1
+
+def test_archive_never_reuses_archived_ids(session: Session, test_user):
+    first = create_poll_with_vote(session, test_user, "First", ended_days_ago=200)
+    first_ids = (first.id, first.options[0].id)
+    assert RetentionService(session).archive_polls(older_than_days=180) == 1
+
+    # The highest ids now live only in the archive; new rows must not take them.
+    second = create_poll_with_vote(session, test_user, "Second", ended_days_ago=200)
+    assert (second.id, second.options[0].id) > first_ids
+    assert RetentionService(session).archive_polls(older_than_days=180) == 1
+
+    session.expire_all()
+    assert sorted(p.title for p in session.exec(select(ArchivedPoll)).all()) == ["First", "Second"]
+    assert len(session.exec(select(ArchivedVote)).all()) == 2
+
+def test_migration_adds_autoincrement_above_archived_ids(tmp_path):
+    from sqlalchemy import create_engine, text
+    from sqlmodel import SQLModel
+    from main import rebuild_with_autoincrement
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    SQLModel.metadata.create_all(engine)
+    with engine.connect() as conn:
+        # Recreate poll the way older versions did: a plain INTEGER PRIMARY KEY.
+        conn.execute(text("DROP TABLE poll"))
+        conn.execute(text("CREATE TABLE poll (id INTEGER NOT NULL PRIMARY KEY, title VARCHAR NOT NULL, creator_id INTEGER NOT NULL, created_at DATETIME NOT NULL, is_recurring BOOLEAN NOT NULL, deadline_mention_ids JSON, deadline_notification_sent BOOLEAN NOT NULL, updated_at DATETIME NOT NULL, version INTEGER NOT NULL)"))
+        conn.execute(text("INSERT INTO poll VALUES (3, 'Hot', 1, '2030-01-01', 0, '[]', 0, '2030-01-01', 1)"))
+        conn.execute(text("INSERT INTO archivedpoll (id, title, creator_id, created_at, is_recurring, deadline_mention_ids, deadline_notification_sent, archived_at) VALUES (7, 'Cold', 1, '2029-01-01', 0, '[]', 0, '2030-01-01')"))
+        conn.commit()
+
+        assert rebuild_with_autoincrement(conn, Poll.__table__, ArchivedPoll.__table__)
+        assert not rebuild_with_autoincrement(conn, Poll.__table__, ArchivedPoll.__table__)
+
+        conn.execute(text("INSERT INTO poll (title, creator_id, created_at, is_recurring, deadline_mention_ids, deadline_notification_sent, updated_at, version) VALUES ('New', 1, '2030-01-01', 0, '[]', 0, '2030-01-01', 1)"))
+        conn.commit()
+        assert conn.execute(text("SELECT id, title FROM poll ORDER BY id")).all() == [(3, "Hot"), (8, "New")]
+        indexes = conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'poll'")).scalars().all()
+        assert "ix_poll_updated_at" in indexes
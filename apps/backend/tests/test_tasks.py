@@ -0,0 +1,148 @@
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+from sqlmodel import Session, select
+
+import tasks
+from models import Poll, PollOption, User, Vote, OutboxMessage
+from services.outbox_service import outbox_service
+
+def create_recurring_poll(session: Session, user, starts_in: list) -> Poll:
+    now = datetime.utcnow()
+    poll = Poll(title="Weekly", creator_id=user.id, is_recurring=True, deadline_offset_minutes=60, deadline_channel_id="123")
+    poll.options = [
+        PollOption(label=f"Opt {i}", start_time=now + delta, end_time=now + delta + timedelta(hours=1))
+        for i, delta in enumerate(starts_in)
+    ]
+    session.add(poll)
+    session.commit()
+    session.refresh(poll)
+    return poll
+
+@pytest.fixture
+def processed(monkeypatch):
+    calls = []
+    monkeypatch.setattr(tasks, "process_recurring_instance", lambda poll, option: calls.append((poll.id, option.id)))
+    monkeypatch.setattr(tasks, "process_onetime_poll", lambda poll, results, recommendation_service: None)
+    return calls
+
+def test_recurring_scan_marks_stale_and_processes_due(session: Session, test_user, processed):
+    poll = create_recurring_poll(session, test_user, [
+        timedelta(hours=-10),    # trigger 11h ago: stale
+        timedelta(minutes=30),   # trigger 30 min ago: due
+        timedelta(days=2),       # not due yet
+    ])
+    stale, due, future = poll.options
+
+    tasks.process_due_deadlines(session, datetime.utcnow())
+    session.expire_all()
+
+    assert processed == [(poll.id, due.id)]
+    assert session.get(PollOption, stale.id).notification_sent is True
+    assert session.get(PollOption, due.id).notification_sent is False
+    assert session.get(PollOption, future.id).notification_sent is False
+
+def test_recurring_scan_query_count_is_constant(session: Session, test_user, processed, statement_counter):
+    def run_scan():
+        with statement_counter() as statements:
+            tasks.process_due_deadlines(session, datetime.utcnow())
+        return len(statements)
+
+    create_recurring_poll(session, test_user, [timedelta(days=3)])
+    baseline = run_scan()
+
+    for _ in range(10):
+        create_recurring_poll(session, test_user, [timedelta(days=3), timedelta(days=4)])
+
+    assert run_scan() == baseline
+
+def test_queue_deadline_notifications(session: Session, test_user):
+    poll = create_recurring_poll(session, test_user, [timedelta(minutes=30), timedelta(minutes=40)])
+    option_ids = [option.id for option in poll.options]
+    notifications = [
+        tasks.DeadlineNotification(
+            poll_id=poll.id,
+            option_id=option_id,
+            channel_id="123",
+            poll_title="Weekly",
+            event_url="http://example.com",
+            result_text="No participants yet."
+        )
+        for option_id in option_ids
+    ]
+
+    tasks.queue_deadline_notifications(session, notifications)
+    tasks.queue_deadline_notifications(session, notifications)
+    session.expire_all()
+
+    assert all(session.get(PollOption, option_id).notification_sent for option_id in option_ids)
+    assert session.get(Poll, poll.id).deadline_notification_sent is False
+    messages = session.exec(select(OutboxMessage)).all()
+    assert sorted(m.idempotency_key for m in messages) == [f"deadline:option:{option_id}" for option_id in option_ids]
+
+def test_process_due_deadlines_resolves_mentions(session: Session, test_user):
+    voter = User(discord_id="voter_discord", username="voter")
+    mentioned = User(discord_id="mentioned_discord", username="mentioned")
+    session.add(voter)
+    session.add(mentioned)
+    session.commit()
+
+    poll = create_recurring_poll(session, test_user, [timedelta(minutes=30)])
+    poll.deadline_mention_ids = [mentioned.id]
+    session.add(poll)
+    session.add(Vote(poll_option_id=poll.options[0].id, user_id=voter.id))
+    session.commit()
+
+    notifications = tasks.process_due_deadlines(session, datetime.utcnow())
+
+    assert len(notifications) == 1
+    assert notifications[0].result_text == "**Participants:** voter"
+    assert sorted(notifications[0].mention_discord_ids) == ["mentioned_discord", "voter_discord"]
+
+def test_onetime_deadline_uses_aggregated_results(session: Session, test_user):
+    voter = User(discord_id="voter_discord", username="voter")
+    session.add(voter)
+    now = datetime.utcnow()
+    poll = Poll(title="Once", creator_id=test_user.id, deadline_date=now - timedelta(minutes=1), deadline_channel_id="123")
+    poll.options = [
+        PollOption(label="Early", start_time=now + timedelta(days=1), end_time=now + timedelta(days=1, hours=1)),
+        PollOption(label="Late", start_time=now + timedelta(days=2), end_time=now + timedelta(days=2, hours=1)),
+    ]
+    session.add(poll)
+    session.commit()
+    session.add(Vote(poll_option_id=poll.options[1].id, user_id=voter.id))
+    session.commit()
+
+    notifications = tasks.process_due_deadlines(session, datetime.utcnow())
+
+    assert len(notifications) == 1
+    assert notifications[0].result_text == "Winner: **Late** (1 votes)"
+    assert notifications[0].mention_discord_ids == ["voter_discord"]
+
+def test_outbox_delivery_respects_concurrency_limit(session: Session, monkeypatch):
+    active = 0
+    peak = 0
+    sent = []
+
+    async def fake_post(channel_id, payload, nonce=None):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        sent.append(payload["content"])
+        active -= 1
+        return {"id": "discord"}
+
+    monkeypatch.setattr(tasks.discord_service, "post_message", fake_post)
+    monkeypatch.setattr(tasks.settings, "OUTBOX_CONCURRENCY", 3)
+    monkeypatch.setattr(tasks, "run_in_session", lambda func, *args: func(session, *args))
+    for i in range(10):
+        outbox_service.enqueue(session, f"deadline:poll:{i}", "123", {"content": f"Poll {i}"})
+    session.commit()
+
+    assert asyncio.run(tasks.deliver_outbox_batch()) == 10
+
+    assert sorted(sent) == sorted(f"Poll {i}" for i in range(10))
+    assert peak == 3
+    session.expire_all()
+    assert all(m.status == "sent" for m in session.exec(select(OutboxMessage)).all())
@@ -0,0 +1,41 @@
+from sqlmodel import Session
+
+from models import User
+from schemas import UserRead
+from services.member_sync_service import MemberSyncService
+from services.typeahead_index import TypeaheadIndex, typeahead_index
+
+def names(users):
+    return sorted(u.username for u in users)
+
+def test_search_matches_username_display_name_and_words(session: Session, test_user):
+    session.add_all([
+        User(discord_id="d1", username="frodo", display_name="Mr Underhill"),
+        User(discord_id="d2", username="merry"),
+    ])
+    session.commit()
+    index = TypeaheadIndex()
+    index.load(session)
+
+    assert names(index.search("FRO")) == ["frodo"]
+    assert names(index.search("mr")) == ["frodo"]
+    assert names(index.search("m")) == ["frodo", "merry"]
+    assert names(index.search("under")) == ["frodo"]
+    assert index.search("zz") == []
+
+def test_upsert_replaces_terms(session: Session, test_user):
+    index = TypeaheadIndex()
+    index.load(session)
+
+    index.upsert([UserRead(id=test_user.id, username="renamed", display_name=None)])
+
+    assert names(index.search("renamed")) == ["renamed"]
+    assert index.search("tester") == []
+    assert len(index) == 1
+
+def test_member_sync_updates_index(session: Session, test_user):
+    typeahead_index.load(session)
+
+    MemberSyncService(session).sync([{"id": "42", "username": "pippin", "display_name": "Fool of a Took", "avatar": None}])
+
+    assert names(typeahead_index.search("took")) == ["pippin"]
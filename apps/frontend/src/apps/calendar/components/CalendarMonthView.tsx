@@ -1,5 +1,5 @@
 import React, { useEffect } from 'react';
-import { format, startOfMonth, endOfMonth, eachDayOfInterval, isSameDay, addWeeks, subWeeks, isBefore, startOfDay } from 'date-fns';
+import { format, startOfMonth, endOfMonth, eachDayOfInterval, isSameDay, addWeeks, subWeeks, isBefore, startOfDay, startOfYear, addYears } from 'date-fns';
 import { parseUTCDate } from '../../../utils/dateUtils';
 import { clsx } from 'clsx';
 import { twMerge } from 'tailwind-merge';
@@ -42,6 +42,13 @@ interface Poll {
     options: PollOption[];
 }
 
+interface DensityBucket {
+    day: string; // yyyy-MM-dd in local time
+    events: number;
+    options: number;
+    votes: number;
+}
+
 interface CalendarMonthViewProps {
     polls: Poll[];
 }
@@ -51,6 +58,23 @@ const CalendarMonthView: React.FC<CalendarMonthViewProps> = ({ polls }) => {
     const [currentDate, setCurrentDate] = React.useState(today);
     const [viewMode, setViewMode] = React.useState<'month' | 'year' | 'week'>('month');
 
+    const [yearDensity, setYearDensity] = React.useState<DensityBucket[]>([]);
+
+    // The year heatmap only needs per-day counts, aggregated server-side.
+    useEffect(() => {
+        if (viewMode !== 'year') return;
+        const yearStart = startOfYear(currentDate);
+        const params = new URLSearchParams({
+            start: yearStart.toISOString(),
+            end: addYears(yearStart, 1).toISOString(),
+            tz_offset_minutes: String(-yearStart.getTimezoneOffset())
+        });
+        fetch(`/api/calendar/density?${params}`)
+            .then(res => res.ok ? res.json() : { buckets: [] })
+            .then(data => setYearDensity(data.buckets))
+            .catch(() => setYearDensity([]));
+    }, [viewMode, currentDate.getFullYear()]);
+
     // Handle initial wheel event for zoom out
     useEffect(() => {
         const handleWheel = (e: WheelEvent) => {
@@ -84,11 +108,10 @@ const CalendarMonthView: React.FC<CalendarMonthViewProps> = ({ polls }) => {
         return (
             <div className="relative">
                 <YearView
-                    events={polls.flatMap(p => p.options.map(o => ({
-                        date: parseUTCDate(o.start_time),
-                        value: 1, // Simple density
-                        color: 'bg-jade-500'
-                    })))}
+                    events={yearDensity.map(b => {
+                        const [year, month, day] = b.day.split('-').map(Number);
+                        return { date: new Date(year, month - 1, day), value: b.options };
+                    })}
                     currentDate={currentDate}
                     onMonthSelect={(date) => {
                         setCurrentDate(date);
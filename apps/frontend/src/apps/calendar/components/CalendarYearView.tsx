@@ -1,6 +1,5 @@
-import React from 'react';
-import { format, startOfYear, eachMonthOfInterval, endOfYear } from 'date-fns';
-import { parseUTCDate } from '../../../utils/dateUtils';
+import React, { useEffect, useState } from 'react';
+import { format, startOfYear, eachMonthOfInterval, endOfYear, addYears } from 'date-fns';
 import { clsx } from 'clsx';
 import { twMerge } from 'tailwind-merge';
 
@@ -8,42 +7,37 @@ function cn(...inputs: (string | undefined | null | false)[]) {
     return twMerge(clsx(inputs));
 }
 
-interface PollOption {
-    id: number;
-    label: string;
-    start_time: string;
-    end_time: string;
-}
-
-interface Poll {
-    id: number;
-    title: string;
-    options: PollOption[];
+interface DensityBucket {
+    day: string; // yyyy-MM-dd in local time
+    events: number;
+    options: number;
+    votes: number;
 }
 
 interface CalendarYearViewProps {
-    polls: Poll[];
     onMonthSelect: (date: Date) => void;
     currentDate: Date;
 }
 
-const CalendarYearView: React.FC<CalendarYearViewProps> = ({ polls, onMonthSelect, currentDate }) => {
+const CalendarYearView: React.FC<CalendarYearViewProps> = ({ onMonthSelect, currentDate }) => {
     const yearStart = startOfYear(currentDate);
     const yearEnd = endOfYear(currentDate);
     const months = eachMonthOfInterval({ start: yearStart, end: yearEnd });
 
-    // Calculate event density per day for the entire year
-    // Map: 'yyyy-MM-dd' -> count
-    const eventDensity = new Map<string, number>();
-    polls.forEach(poll => {
-        poll.options.forEach(opt => {
-            // Only count if option has start time
-            if (opt.start_time) {
-                const dateStr = format(parseUTCDate(opt.start_time), 'yyyy-MM-dd');
-                eventDensity.set(dateStr, (eventDensity.get(dateStr) || 0) + 1);
-            }
+    // Event density per day for the entire year, aggregated server-side
+    // Map: 'yyyy-MM-dd' -> option count
+    const [eventDensity, setEventDensity] = useState<Map<string, number>>(new Map());
+    useEffect(() => {
+        const params = new URLSearchParams({
+            start: yearStart.toISOString(),
+            end: addYears(yearStart, 1).toISOString(),
+            tz_offset_minutes: String(-yearStart.getTimezoneOffset())
         });
-    });
+        fetch(`/api/calendar/density?${params}`)
+            .then(res => res.ok ? res.json() : { buckets: [] })
+            .then(data => setEventDensity(new Map(data.buckets.map((b: DensityBucket) => [b.day, b.options]))))
+            .catch(() => setEventDensity(new Map()));
+    }, [yearStart.getFullYear()]);
 
     const getHeatmapColor = (count: number) => {
         if (count === 0) return 'bg-transparent';
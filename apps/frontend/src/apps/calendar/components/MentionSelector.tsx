@@ -23,34 +23,69 @@ export const MentionSelector: React.FC<MentionSelectorProps> = ({
 }) => {
   const [query, setQuery] = useState("");
   const [users, setUsers] = useState<User[]>([]);
+  // Every user seen so far, so selected tags still render when they drop out of the results
+  const [knownUsers, setKnownUsers] = useState<Record<number, User>>({});
 
   useEffect(() => {
-    // Fetch ranked users
+    // Fetch the top ranked matches for the current query
+    const controller = new AbortController();
     const fetchUsers = async () => {
       try {
-        const res = await fetch("/api/users/ranked");
+        const params = new URLSearchParams({ limit: "20" });
+        const normalizedQuery = query.startsWith('@') ? query.slice(1) : query;
+        if (normalizedQuery) params.set("q", normalizedQuery);
+        const res = await fetch(`/api/users/ranked?${params}`, { signal: controller.signal });
         if (res.ok) {
-          const data = await res.json();
+          const data: User[] = await res.json();
           setUsers(data);
+          setKnownUsers((prev) => {
+            const next = { ...prev };
+            data.forEach((u) => { next[u.id] = u; });
+            return next;
+          });
         }
       } catch (err) {
-        console.error("Failed to fetch users", err);
+        if ((err as Error).name !== "AbortError") {
+          console.error("Failed to fetch users", err);
+        }
       }
     };
-    fetchUsers();
-  }, []);
+    const timeout = setTimeout(fetchUsers, query ? 150 : 0);
+    return () => {
+      clearTimeout(timeout);
+      controller.abort();
+    };
+  }, [query]);
 
-  const filteredUsers =
-    query === ""
-      ? users
-      : users.filter((user) => {
-        const name = user.display_name || user.username;
-        const normalizedQuery = query.startsWith('@') ? query.slice(1) : query;
-        return name.toLowerCase().includes(normalizedQuery.toLowerCase());
+  // Selected ids can come from outside the ranked results (e.g. an edited
+  // poll's saved mentions); look those up so their tags render and can be removed.
+  useEffect(() => {
+    const missing = selectedUserIds.filter((id) => !knownUsers[id]);
+    if (missing.length === 0) return;
+    const controller = new AbortController();
+    const params = new URLSearchParams();
+    missing.forEach((id) => params.append("ids", String(id)));
+    fetch(`/api/users/ranked?${params}`, { signal: controller.signal })
+      .then((res) => (res.ok ? res.json() : []))
+      .then((data: User[]) => {
+        setKnownUsers((prev) => {
+          const next = { ...prev };
+          data.forEach((u) => { next[u.id] = u; });
+          return next;
+        });
+      })
+      .catch((err) => {
+        if ((err as Error).name !== "AbortError") {
+          console.error("Failed to fetch selected users", err);
+        }
       });
+    return () => controller.abort();
+  }, [selectedUserIds.join(",")]);
+
+  const filteredUsers = users;
 
   // Selected Users Objects
-  const selectedUsers = users.filter((u) => selectedUserIds.includes(u.id));
+  const selectedUsers = selectedUserIds.map((id) => knownUsers[id]).filter((u): u is User => Boolean(u));
 
   const toggleUser = (user: User) => {
     if (selectedUserIds.includes(user.id)) {
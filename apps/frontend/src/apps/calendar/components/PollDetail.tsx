@@ -61,6 +61,12 @@ interface PollWithVotes extends PollDetailData {
     options: OptionWithVotes[];
 }
 
+interface OptionUnavailability {
+    option_id: number;
+    unavailable_count: number;
+    unavailable_user_ids: number[];
+}
+
 const PollDetail: React.FC = () => {
     const { pollId } = useParams();
     const navigate = useNavigate();
@@ -69,6 +75,7 @@ const PollDetail: React.FC = () => {
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState<string | null>(null);
     const [togglingOptionId, setTogglingOptionId] = useState<number | null>(null);
+    const [unavailable, setUnavailable] = useState<Record<number, number[]>>({}); // option id -> user ids
     // Default view mode is now 'week' (Calendar)
     const [viewMode, setViewMode] = useState<'list' | 'month' | 'week'>('week');
     const [currentDate, setCurrentDate] = useState(new Date()); // For Calendar Views
@@ -105,6 +112,21 @@ const PollDetail: React.FC = () => {
             .catch(() => { }); // Ignore error, just wont highlight
     }, []);
 
+    // Which voters are unavailable for each option; served from a server-side
+    // cache, so it is cheap to refetch alongside the poll.
+    const fetchUnavailability = async () => {
+        try {
+            const res = await fetch(`/api/polls/${pollId}/unavailability`);
+            if (!res?.ok) return;
+            const data = await res.json();
+            const byOption: Record<number, number[]> = {};
+            data.options.forEach((o: OptionUnavailability) => { byOption[o.option_id] = o.unavailable_user_ids; });
+            setUnavailable(byOption);
+        } catch {
+            // Annotation only; the poll is usable without it.
+        }
+    };
+
     const fetchPoll = () => {
         if (!pollId) return;
         fetch(`/api/polls/${pollId}`)
@@ -114,6 +136,7 @@ const PollDetail: React.FC = () => {
             })
             .then(data => {
                 setPoll(data);
+                fetchUnavailability();
                 // If options exist, set currentDate to start of first option?
                 if (data.options.length > 0) {
                     // Check if there are future options?
@@ -517,8 +540,12 @@ const PollDetail: React.FC = () => {
 
                                 {poll.options.map(option => {
                                     const hasVoted = option.votes.some(v => v.user?.id === voter.id);
+                                    const isUnavailable = unavailable[option.id]?.includes(voter.id);
                                     return (
                                         <div key={option.id} className="w-32 shrink-0 border-l border-jade-100 p-2 flex items-center justify-center">
+                                            {!hasVoted && isUnavailable && (
+                                                <span className="text-[10px] uppercase tracking-wider text-ink/30" title="Unavailable">Away</span>
+                                            )}
                                             {hasVoted && (
                                                 <motion.div
                                                     initial={{ scale: 0 }}
@@ -540,13 +567,16 @@ const PollDetail: React.FC = () => {
                                 <span className="text-xs font-bold text-jade-400 uppercase tracking-wider">Total</span>
                             </div>
                             {poll.options.map(option => (
-                                <div key={option.id} className="w-32 shrink-0 border-l border-jade-100 p-3 flex items-center justify-center">
+                                <div key={option.id} className="w-32 shrink-0 border-l border-jade-100 p-3 flex flex-col items-center justify-center">
                                     <span className={cn(
                                         "text-lg font-bold font-serif",
                                         option.votes.length > 0 ? "text-jade-600" : "text-jade-300"
                                     )}>
                                         {option.votes.length}
                                     </span>
+                                    {unavailable[option.id]?.length > 0 && (
+                                        <span className="text-[10px] text-ink/40">{unavailable[option.id].length} away</span>
+                                    )}
                                 </div>
                             ))}
                         </div>
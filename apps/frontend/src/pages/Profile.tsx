@@ -1,5 +1,5 @@
 import React, { useEffect, useState } from 'react';
-import { addDays, addMonths, addWeeks, getDay } from 'date-fns';
+import { addDays, addMonths, addWeeks, endOfMonth, endOfWeek, endOfYear, getDay, startOfMonth, startOfWeek, startOfYear } from 'date-fns';
 import { parseUTCDate } from '../utils/dateUtils';
 import { Background } from '../components/Background';
 import { motion } from 'framer-motion';
@@ -69,15 +69,32 @@ const Profile: React.FC = () => {
                 console.error(e);
                 setLoading(false);
             });
+    }, []);
 
-        // Fetch Unavailability
+    useEffect(() => {
         fetchUnavailability();
-    }, []);
+    }, [currentDate, viewMode]);
 
+    // Only the blocks overlapping the visible range (plus a week either side),
+    // as compact [id, start, end] epoch-second triples.
     const fetchUnavailability = () => {
-        fetch('/api/profile/unavailability')
+        const [from, to] = viewMode === 'year'
+            ? [startOfYear(currentDate), endOfYear(currentDate)]
+            : viewMode === 'month'
+                ? [startOfMonth(currentDate), endOfMonth(currentDate)]
+                : [startOfWeek(currentDate), endOfWeek(currentDate)];
+        const params = new URLSearchParams({
+            from: addWeeks(from, -1).toISOString(),
+            to: addWeeks(to, 1).toISOString(),
+            format: 'compact'
+        });
+        fetch(`/api/profile/unavailability?${params}`)
             .then(res => res.json())
-            .then(data => setBlocks(data))
+            .then(data => setBlocks(data.blocks.map(([id, start, end]: [number, number, number]) => ({
+                id,
+                start_time: new Date(start * 1000).toISOString(),
+                end_time: new Date(end * 1000).toISOString()
+            }))))
             .catch(err => console.error(err));
     };
 
@@ -148,20 +165,22 @@ const Profile: React.FC = () => {
     const handleAddBlock = async (start: Date, end: Date) => {
         try {
             if (isRecurring && recurrenceType !== 'AI') {
-                // Create multiple blocks for recurring
+                // Create all recurring blocks in one request; the server merges them
                 const expandedDates = expandRecurringDates(start, end);
 
-                for (const { start: s, end: e } of expandedDates) {
-                    await fetch('/api/profile/unavailability', {
-                        method: 'POST',
-                        headers: { 'Content-Type': 'application/json' },
-                        body: JSON.stringify({
+                const res = await fetch('/api/profile/unavailability/bulk', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({
+                        blocks: expandedDates.map(({ start: s, end: e }) => ({
                             start_time: s.toISOString(),
                             end_time: e.toISOString()
-                        })
-                    });
+                        }))
+                    })
+                });
+                if (res.ok) {
+                    fetchUnavailability();
                 }
-                fetchUnavailability();
             } else {
                 // Single block
                 const res = await fetch('/api/profile/unavailability', {